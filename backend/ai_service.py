@@ -1,41 +1,34 @@
-import anthropic
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import os
+import threading
 import json
-from dotenv import load_dotenv
+import config  # noqa: F401  (loads .env)
+from cache_service import get_cached_entry_batch, cache_entry_batch
+from db import get_db_connection
+from models import KnowledgeEntryResponse
+from tag_service import get_tag_counts
+from metrics import anthropic_request_duration_seconds, anthropic_tokens_total
 
-load_dotenv()
+# Anthropic client, created on first use: importing the SDK costs more than
+# the rest of the app put together, and most requests never need it
+client = None
+_client_lock = threading.Lock()
+CHAT_MODEL = "claude-opus-4-5-20251101"
+MAX_ENTRIES_PER_FETCH = 20
 
-# Initialize Anthropic client
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-
-def get_db_connection():
-    """Create database connection"""
-    # Use DATABASE_URL from environment (Railway sets this)
-    database_url = os.getenv("DATABASE_URL")
-    if database_url:
-        # Railway/Production - use DATABASE_URL
-        conn = psycopg2.connect(
-            database_url,
-            cursor_factory=RealDictCursor
-        )
-    else:
-        # Local development - use individual params
-        conn = psycopg2.connect(
-            host="localhost",
-            database="knowledge_base",
-            user="",  # Your Mac username for local
-            password="",
-            cursor_factory=RealDictCursor
-        )
-    
-    return conn
+def get_client():
+    """Return the shared Anthropic client, creating it on first call"""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                import anthropic
+                client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    return client
 
 def get_user_entries(user_id: int) -> list:
     """Get all knowledge entries for a user"""
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True, user_id=user_id)
         cursor = conn.cursor()
         
         cursor.execute(
@@ -56,7 +49,7 @@ def get_user_entries(user_id: int) -> list:
 def search_entries(user_id: int, query: str) -> list:
     """Search knowledge entries by keyword"""
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True, user_id=user_id)
         cursor = conn.cursor()
         
         cursor.execute(
@@ -82,7 +75,7 @@ def search_entries(user_id: int, query: str) -> list:
 def search_by_tag(user_id: int, tag: str) -> list:
     """Search entries by tag"""
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True, user_id=user_id)
         cursor = conn.cursor()
         
         cursor.execute(
@@ -101,6 +94,43 @@ def search_by_tag(user_id: int, tag: str) -> list:
     except Exception as e:
         return []
 
+def get_entries_by_ids(user_id: int, entry_ids: list) -> list:
+    """
+    Get full entries by id, in the order asked: cached entries first, the rest
+    in one query (which refills their cache). Ids that don't exist or belong to
+    another user are left out.
+
+    Raises:
+        Exception: If the database can't be read, so a failure isn't reported as ids not found
+    """
+    entry_ids = list(dict.fromkeys(entry_ids))[:MAX_ENTRIES_PER_FETCH]
+    found, version = get_cached_entry_batch(user_id, entry_ids)
+    missing = [entry_id for entry_id in entry_ids if entry_id not in found]
+    if missing:
+        conn = get_db_connection(readonly=True, user_id=user_id)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT id, user_id, title, content, tags, created_at, updated_at
+                   FROM knowledge_entries
+                   WHERE user_id = %s AND id = ANY(%s)""",
+                (user_id, missing)
+            )
+            rows = [KnowledgeEntryResponse.from_row(row).model_dump() for row in cursor.fetchall()]
+            cursor.close()
+        finally:
+            conn.close()
+        cache_entry_batch(user_id, rows, version)
+        found.update((row['id'], row) for row in rows)
+    return [found[entry_id] for entry_id in entry_ids if entry_id in found]
+
+def get_user_tags(user_id: int, limit: int = 100) -> list:
+    """Get the user's tags with entry counts, most used first"""
+    try:
+        return get_tag_counts(user_id, limit)
+    except Exception as e:
+        return []
+
 # Define tools for Claude
 TOOLS = [
     {
@@ -119,15 +149,44 @@ TOOLS = [
     },
     {
         "name": "get_all_entries",
-        "description": "Get all knowledge base entries for the user - use this to get an overview of what the user knows",
+        "description": "Get all knowledge base entries for the user - use this to get an overview of what the user knows (content is cut to 200 characters; use get_entries_by_ids for the full text)",
         "input_schema": {
             "type": "object",
             "properties": {}
         }
     },
+    {
+        "name": "get_entries_by_ids",
+        "description": f"Get the full content of up to {MAX_ENTRIES_PER_FETCH} entries by id in one call - use this after get_all_entries or a search instead of fetching entries one at a time",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "ids": {
+                    "type": "array",
+                    "items": {"type": "integer"},
+                    "maxItems": MAX_ENTRIES_PER_FETCH,
+                    "description": "Entry ids to fetch"
+                }
+            },
+            "required": ["ids"]
+        }
+    },
+    {
+        "name": "list_tags",
+        "description": "List the tags the user has used, with how many entries have each, most used first - use this to pick an existing tag before calling search_by_tag",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of tags to return (default 100)"
+                }
+            }
+        }
+    },
     {
         "name": "search_by_tag",
-        "description": "Find knowledge entries that have a specific tag",
+        "description": "Find knowledge entries that have a specific tag (tags are lowercase; see list_tags for the ones that exist)",
         "input_schema": {
             "type": "object",
             "properties": {
@@ -175,6 +234,48 @@ def process_tool_call(tool_name: str, tool_input: dict, user_id: int) -> str:
             })
         return json.dumps({"total": len(results), "entries": results})
     
+    elif tool_name == "get_entries_by_ids":
+        try:
+            entry_ids = [int(entry_id) for entry_id in tool_input.get("ids") or []]
+        except (TypeError, ValueError):
+            return "ids must be a list of entry ids"
+        entry_ids = list(dict.fromkeys(entry_ids))
+        if not entry_ids:
+            return "No entry ids given"
+        if len(entry_ids) > MAX_ENTRIES_PER_FETCH:
+            return f"At most {MAX_ENTRIES_PER_FETCH} ids per call"
+        
+        try:
+            entries = get_entries_by_ids(user_id, entry_ids)
+        except Exception as e:
+            return f"Error fetching entries: {str(e)}"
+        found = {entry['id'] for entry in entries}
+        results = []
+        for entry in entries:
+            results.append({
+                "id": entry['id'],
+                "title": entry['title'],
+                "content": str(entry['content']),
+                "tags": entry['tags'] if entry['tags'] else [],
+                "created_at": str(entry['created_at']),
+                "updated_at": str(entry['updated_at'])
+            })
+        return json.dumps({
+            "found": len(results),
+            "entries": results,
+            "not_found": [entry_id for entry_id in entry_ids if entry_id not in found]
+        })
+    
+    elif tool_name == "list_tags":
+        try:
+            limit = int(tool_input.get("limit") or 100)
+        except (TypeError, ValueError):
+            return "limit must be a whole number of tags"
+        tags = get_user_tags(user_id, limit)
+        if not tags:
+            return "No tags found in knowledge base"
+        return json.dumps({"total": len(tags), "tags": tags})
+    
     elif tool_name == "search_by_tag":
         entries = search_by_tag(user_id, tool_input["tag"])
         if not entries:
@@ -202,16 +303,22 @@ def chat_with_knowledge_base(message: str, user_id: int) -> str:
     
     # Agentic loop - Claude may call multiple tools
     while True:
-        response = client.messages.create(
-            model="claude-opus-4-5-20251101",
-            max_tokens=1024,
-            system="""You are a helpful AI assistant with access to the user's personal knowledge base. 
+        with anthropic_request_duration_seconds.time(CHAT_MODEL):
+            response = get_client().messages.create(
+                model=CHAT_MODEL,
+                max_tokens=1024,
+                system="""You are a helpful AI assistant with access to the user's personal knowledge base. 
             Use the available tools to search and retrieve relevant information to answer questions.
             Always search the knowledge base before answering questions about what the user knows.
             Be concise and helpful in your responses.""",
-            tools=TOOLS,
-            messages=messages
-        )
+                tools=TOOLS,
+                messages=messages
+            )
+        
+        usage = getattr(response, "usage", None)
+        if usage:
+            anthropic_tokens_total.inc(CHAT_MODEL, "input", amount=usage.input_tokens)
+            anthropic_tokens_total.inc(CHAT_MODEL, "output", amount=usage.output_tokens)
         
         # If Claude is done, return the response
         if response.stop_reason == "end_turn":
@@ -0,0 +1,172 @@
+"""
+Audit Log Export
+Streams audit_logs rows in a time range as NDJSON or CSV (optionally gzipped)
+with constant memory. Backs /api/admin/audit-logs/export and works as a CLI:
+
+    python audit_export.py --since 2026-01-01 --until 2026-04-01 --format csv --gzip -o q1.csv.gz
+
+If an export is interrupted, the CLI prints the --after-timestamp/--after-id
+to resume with; resumed runs append to the same file.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import sys
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+from audit_service import audit_logger
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Rows per chunk handed to the response / file
+CHUNK_ROWS = 500
+
+
+def _csv_value(value):
+    """Flatten a value for a CSV cell"""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def format_chunks(rows: Iterable[dict], columns: List[str], fmt: str, include_header: bool = True) -> Iterator[tuple]:
+    """
+    Encode rows as NDJSON or CSV, CHUNK_ROWS rows per chunk
+
+    Args:
+        rows: Audit log rows
+        columns: Column order (used for the CSV header)
+        fmt: 'ndjson' or 'csv'
+        include_header: Write the CSV header row (off when resuming)
+
+    Yields:
+        (data, last_row, row_count) so callers know exactly which rows were written
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+
+    if writer and include_header:
+        writer.writerow(columns)
+
+    pending = 0
+    last_row = None
+    for row in rows:
+        if writer:
+            writer.writerow([_csv_value(row.get(c)) for c in columns])
+        else:
+            buffer.write(json.dumps(row, default=str))
+            buffer.write("\n")
+        pending += 1
+        last_row = row
+
+        if pending >= CHUNK_ROWS:
+            yield buffer.getvalue().encode(), last_row, pending
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode(), last_row, pending
+
+
+def format_rows(rows: Iterable[dict], columns: List[str], fmt: str, include_header: bool = True) -> Iterator[bytes]:
+    """Encode rows as NDJSON or CSV byte chunks"""
+    for data, _, _ in format_chunks(rows, columns, fmt, include_header):
+        yield data
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip a stream of chunks incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(
+    since: Optional[datetime],
+    until: Optional[datetime],
+    fmt: str = "ndjson",
+    compress: bool = False,
+    after: Optional[tuple] = None,
+    columns: Optional[List[str]] = None
+) -> Iterator[bytes]:
+    """
+    Stream an audit log export as bytes
+
+    Args:
+        since / until: Time range
+        fmt: 'ndjson' or 'csv'
+        compress: Gzip the output
+        after: (timestamp, id) of the last exported row, to resume
+        columns: Columns to export (defaults to every column)
+    """
+    selected = audit_logger.resolve_columns(columns or ["all"])
+    rows = audit_logger.iter_logs(since=since, until=until, after=after, columns=selected)
+    chunks = format_rows(rows, selected, fmt, include_header=after is None)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    return chunks
+
+
+def main():
+    """Command line export"""
+    parser = argparse.ArgumentParser(description="Export audit logs")
+    parser.add_argument("--since", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--fields", help="Comma-separated columns (default: all)")
+    parser.add_argument("--after-timestamp", type=datetime.fromisoformat)
+    parser.add_argument("--after-id", type=int)
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    after = None
+    if args.after_timestamp and args.after_id is not None:
+        after = (args.after_timestamp, args.after_id)
+
+    columns = audit_logger.resolve_columns(args.fields.split(",") if args.fields else ["all"])
+    rows = audit_logger.iter_logs(since=args.since, until=args.until, after=after, columns=columns)
+
+    # Resumed exports append; a second gzip member is still a valid .gz file
+    raw = open(args.output, "ab" if after else "wb") if args.output else sys.stdout.buffer
+    out = gzip.GzipFile(fileobj=raw, mode="wb") if args.gzip else raw
+
+    last_row = None
+    count = 0
+    try:
+        for data, chunk_last_row, chunk_rows in format_chunks(rows, columns, args.format, include_header=after is None):
+            out.write(data)
+            last_row = chunk_last_row
+            count += chunk_rows
+        print(f"✅ Exported {count} rows", file=sys.stderr)
+    except (Exception, KeyboardInterrupt) as e:
+        print(f"❌ Export interrupted after {count} rows: {e!r}", file=sys.stderr)
+        if last_row:
+            print(
+                f"   Resume with: --after-timestamp {last_row['timestamp'].isoformat()} --after-id {last_row['id']}",
+                file=sys.stderr
+            )
+        sys.exit(1)
+    finally:
+        # Closing the gzip stream writes its trailer, so partial exports stay readable
+        if args.gzip:
+            out.close()
+        if args.output:
+            raw.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,14 @@
 Audit Logging Service
 Tracks security events and user actions for monitoring and compliance
 """
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import os
-from dotenv import load_dotenv
-from typing import Optional, Dict, Any
+import config  # noqa: F401  (loads .env)
+from db import get_db_connection
+from typing import Optional, Dict, Any, List
 from datetime import datetime
+import base64
 import json
-
-load_dotenv()
+import uuid
 
 class AuditLogger:
     """Central audit logging service"""
@@ -40,6 +39,8 @@ class AuditLogger:
     AI_CHAT_REQUEST = "ai_chat_request"
     AI_LIMIT_EXCEEDED = "ai_limit_exceeded"
     
+    AUDIT_EXPORT = "audit_export"
+    
     # Categories
     CATEGORY_AUTH = "auth"
     CATEGORY_API = "api"
@@ -57,22 +58,29 @@ class AuditLogger:
     STATUS_FAILURE = "failure"
     STATUS_BLOCKED = "blocked"
     
+    # Rollup buckets
+    BUCKET_MINUTE = "minute"
+    BUCKET_HOUR = "hour"
+    MINUTE_ROLLUP_RETENTION_HOURS = 48
+    
+    # Queryable columns; details and user_agent are large, so opt-in only
+    LOG_COLUMNS = (
+        "id", "timestamp", "user_id", "user_email", "ip_address", "event_type",
+        "event_category", "severity", "resource", "action", "status",
+        "details", "user_agent", "created_at"
+    )
+    DEFAULT_LOG_COLUMNS = (
+        "id", "timestamp", "user_id", "user_email", "ip_address", "event_type",
+        "event_category", "severity", "resource", "action", "status"
+    )
+    
     def __init__(self):
-        """Initialize audit logger with database connection"""
-        self.database_url = os.getenv("DATABASE_URL")
+        """Initialize audit logger"""
+        self.retention_months = int(os.getenv("AUDIT_LOG_RETENTION_MONTHS", 12))
     
-    def _get_connection(self):
-        """Get database connection"""
-        if self.database_url:
-            return psycopg2.connect(self.database_url, cursor_factory=RealDictCursor)
-        else:
-            return psycopg2.connect(
-                host="localhost",
-                database="knowledge_base",
-                user="",
-                password="",
-                cursor_factory=RealDictCursor
-            )
+    def _get_connection(self, readonly: bool = False):
+        """Get database connection (readonly ones may be served by a replica)"""
+        return get_db_connection(readonly=readonly)
     
     def log(
         self,
@@ -209,67 +217,291 @@ class AuditLogger:
             ip_address=ip_address
         )
     
-    def get_recent_logs(self, limit: int = 100, user_id: Optional[int] = None, severity: Optional[str] = None):
+    @staticmethod
+    def encode_cursor(timestamp: datetime, log_id: int) -> str:
+        """Encode a (timestamp, id) position as an opaque page cursor"""
+        raw = json.dumps([timestamp.isoformat(), log_id])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple:
+        """
+        Decode a page cursor back into (timestamp, id)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            timestamp, log_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(timestamp), int(log_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+    
+    def resolve_columns(self, columns: Optional[List[str]] = None) -> List[str]:
+        """
+        Validate requested columns; id and timestamp are always included
+        because the page cursor is built from them
+        
+        Raises:
+            ValueError: If an unknown column is requested
+        """
+        if not columns:
+            columns = list(self.DEFAULT_LOG_COLUMNS)
+        elif columns == ["all"]:
+            columns = list(self.LOG_COLUMNS)
+        
+        unknown = [c for c in columns if c not in self.LOG_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown audit log columns: {', '.join(unknown)}")
+        
+        resolved = ["id", "timestamp"]
+        resolved += [c for c in columns if c not in resolved]
+        return resolved
+    
+    def get_logs_page(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        user_id: Optional[int] = None,
+        severity: Optional[str] = None,
+        event_type: Optional[str] = None,
+        event_category: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         """
-        Retrieve recent audit logs
+        Retrieve one page of audit logs, newest first, using keyset pagination
+        Every filter leads one of the (column, timestamp, id) indexes, so deep
+        pages cost the same as the first one
         
         Args:
             limit: Maximum number of logs to return
+            cursor: next_cursor from the previous page
+            columns: Columns to return (defaults to DEFAULT_LOG_COLUMNS, ["all"] for every column)
             user_id: Filter by user ID
             severity: Filter by severity level
+            event_type: Filter by event type
+            event_category: Filter by category
+            ip_address: Filter by client IP
+            since: Only logs at or after this time
+            until: Only logs before this time
         
         Returns:
-            List of audit log entries
+            Dict with logs and next_cursor (None on the last page)
+        
+        Raises:
+            ValueError: If the cursor or columns are invalid
         """
+        selected = self.resolve_columns(columns)
+        position = self.decode_cursor(cursor) if cursor else None
+        
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            conn = self._get_connection(readonly=True)
+            db_cursor = conn.cursor()
             
-            query = "SELECT * FROM audit_logs WHERE 1=1"
+            conditions = []
             params = []
             
-            if user_id:
-                query += " AND user_id = %s"
-                params.append(user_id)
+            filters = (
+                ("user_id", user_id),
+                ("severity", severity),
+                ("event_type", event_type),
+                ("event_category", event_category),
+                ("ip_address", ip_address),
+            )
+            for column, value in filters:
+                if value is not None:
+                    conditions.append(f"{column} = %s")
+                    params.append(value)
             
-            if severity:
-                query += " AND severity = %s"
-                params.append(severity)
+            if since:
+                conditions.append("timestamp >= %s")
+                params.append(since)
             
-            query += " ORDER BY timestamp DESC LIMIT %s"
-            params.append(limit)
+            if until:
+                conditions.append("timestamp < %s")
+                params.append(until)
             
-            cursor.execute(query, params)
-            logs = cursor.fetchall()
+            if position:
+                conditions.append("(timestamp, id) < (%s, %s)")
+                params.extend(position)
             
-            cursor.close()
+            query = f"SELECT {', '.join(selected)} FROM audit_logs"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            
+            # Fetch one extra row to know whether another page exists
+            query += " ORDER BY timestamp DESC, id DESC LIMIT %s"
+            params.append(limit + 1)
+            
+            db_cursor.execute(query, params)
+            logs = [dict(log) for log in db_cursor.fetchall()]
+            
+            db_cursor.close()
             conn.close()
             
-            return [dict(log) for log in logs]
+            next_cursor = None
+            if len(logs) > limit:
+                logs = logs[:limit]
+                next_cursor = self.encode_cursor(logs[-1]["timestamp"], logs[-1]["id"])
+            
+            return {"logs": logs, "next_cursor": next_cursor}
         except Exception as e:
             print(f"Error fetching audit logs: {e}")
+            return {"logs": [], "next_cursor": None}
+    
+    def iter_logs(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        after: Optional[tuple] = None,
+        columns: Optional[List[str]] = None,
+        batch_size: int = 2000
+    ):
+        """
+        Stream audit logs oldest first through a server-side cursor
+        Only batch_size rows are held in memory at a time. Unlike the other
+        readers, errors are raised so an export is never silently truncated.
+        
+        Args:
+            since: Only logs at or after this time
+            until: Only logs before this time
+            after: (timestamp, id) of the last row already exported, to resume
+            columns: Columns to return (defaults to every column)
+            batch_size: Rows fetched per round trip
+        
+        Yields:
+            Audit log rows as dicts
+        """
+        selected = self.resolve_columns(columns or ["all"])
+        
+        conditions = []
+        params = []
+        if since:
+            conditions.append("timestamp >= %s")
+            params.append(since)
+        if until:
+            conditions.append("timestamp < %s")
+            params.append(until)
+        if after:
+            conditions.append("(timestamp, id) > (%s, %s)")
+            params.extend(after)
+        
+        query = f"SELECT {', '.join(selected)} FROM audit_logs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY timestamp, id"
+        
+        conn = self._get_connection(readonly=True)
+        try:
+            conn.set_session(readonly=True)
+            cursor = conn.cursor(name=f"audit_export_{uuid.uuid4().hex}")
+            cursor.itersize = batch_size
+            cursor.execute(query, params)
+            for row in cursor:
+                yield dict(row)
+            cursor.close()
+        finally:
+            conn.rollback()
+            conn.close()
+    
+    def get_recent_logs(self, limit: int = 100, user_id: Optional[int] = None, severity: Optional[str] = None):
+        """
+        Retrieve recent audit logs (all columns, first page only)
+        
+        Args:
+            limit: Maximum number of logs to return
+            user_id: Filter by user ID
+            severity: Filter by severity level
+        
+        Returns:
+            List of audit log entries
+        """
+        page = self.get_logs_page(limit=limit, columns=["all"], user_id=user_id, severity=severity)
+        return page["logs"]
+    
+    def get_recently_active_users(self, hours: int = 72, limit: int = 500) -> List[int]:
+        """
+        Users with a successful login in the last N hours, most recent first
+        Uses idx_audit_logs_event_type_time_id and only scans recent partitions
+        
+        Returns:
+            List of user IDs
+        """
+        try:
+            conn = self._get_connection(readonly=True)
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT user_id, MAX(timestamp) AS last_login
+                   FROM audit_logs
+                   WHERE event_type = %s
+                   AND timestamp >= LOCALTIMESTAMP - make_interval(hours => %s)
+                   AND user_id IS NOT NULL
+                   GROUP BY user_id
+                   ORDER BY last_login DESC
+                   LIMIT %s""",
+                (self.LOGIN_SUCCESS, hours, limit)
+            )
+            user_ids = [row['user_id'] for row in cursor.fetchall()]
+            cursor.close()
+            conn.close()
+            return user_ids
+        except Exception as e:
+            print(f"Error fetching recently active users: {e}")
             return []
     
     def get_security_summary(self, hours: int = 24):
         """
         Get security event summary for the last N hours
+        Reads the pre-aggregated rollups: whole hours from hourly buckets and
+        the partial first hour from minute buckets, so the cost does not grow
+        with the size of audit_logs. Minute buckets are pruned after
+        MINUTE_ROLLUP_RETENTION_HOURS, so for longer windows that partial hour
+        (at most an hour of rows) is counted from audit_logs instead.
         
         Returns:
             Dict with counts of security events
         """
+        if hours <= self.MINUTE_ROLLUP_RETENTION_HOURS:
+            first_hour = """SELECT r.event_type, r.severity, r.count
+                    FROM audit_event_rollups r, window_start w
+                    WHERE r.bucket_size = 'minute'
+                    AND r.bucket >= date_trunc('minute', w.since)
+                    AND r.bucket < date_trunc('hour', w.since) + INTERVAL '1 hour'
+                    AND r.event_category IN ('auth', 'security')"""
+        else:
+            first_hour = """SELECT l.event_type, l.severity, 1 AS count
+                    FROM audit_logs l, window_start w
+                    WHERE l.timestamp >= w.since
+                    AND l.timestamp < date_trunc('hour', w.since) + INTERVAL '1 hour'
+                    AND l.event_category IN ('auth', 'security')"""
+        
         try:
-            conn = self._get_connection()
+            conn = self._get_connection(readonly=True)
             cursor = conn.cursor()
             
             cursor.execute(
-                """
+                f"""
+                WITH window_start AS (
+                    SELECT LOCALTIMESTAMP - make_interval(hours => %s) AS since
+                ),
+                buckets AS (
+                    SELECT r.event_type, r.severity, r.count
+                    FROM audit_event_rollups r, window_start w
+                    WHERE r.bucket_size = 'hour'
+                    AND r.bucket >= date_trunc('hour', w.since) + INTERVAL '1 hour'
+                    AND r.event_category IN ('auth', 'security')
+                    UNION ALL
+                    {first_hour}
+                )
                 SELECT 
                     event_type,
                     severity,
-                    COUNT(*) as count
-                FROM audit_logs
-                WHERE timestamp > NOW() - INTERVAL '%s hours'
-                AND event_category IN ('auth', 'security')
+                    SUM(count)::BIGINT as count
+                FROM buckets
                 GROUP BY event_type, severity
                 ORDER BY count DESC
                 """,
@@ -284,6 +516,95 @@ class AuditLogger:
         except Exception as e:
             print(f"Error fetching security summary: {e}")
             return []
+    
+    def get_event_histogram(
+        self,
+        hours: int = 24,
+        bucket_size: str = "hour",
+        event_category: Optional[str] = None,
+        event_type: Optional[str] = None,
+        severity: Optional[str] = None
+    ):
+        """
+        Get time-bucketed event counts from the rollups (for dashboards)
+        
+        Args:
+            hours: How far back to look
+            bucket_size: 'minute' or 'hour'
+            event_category: Filter by category
+            event_type: Filter by event type
+            severity: Filter by severity level
+        
+        Returns:
+            List of {bucket, event_type, severity, count} ordered by bucket
+        """
+        try:
+            conn = self._get_connection(readonly=True)
+            cursor = conn.cursor()
+            
+            query = """
+                SELECT bucket, event_type, severity, SUM(count)::BIGINT AS count
+                FROM audit_event_rollups
+                WHERE bucket_size = %s
+                AND bucket >= date_trunc(%s, LOCALTIMESTAMP - make_interval(hours => %s))
+            """
+            params = [bucket_size, bucket_size, hours]
+            
+            if event_category:
+                query += " AND event_category = %s"
+                params.append(event_category)
+            
+            if event_type:
+                query += " AND event_type = %s"
+                params.append(event_type)
+            
+            if severity:
+                query += " AND severity = %s"
+                params.append(severity)
+            
+            query += " GROUP BY bucket, event_type, severity ORDER BY bucket"
+            
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            
+            cursor.close()
+            conn.close()
+            
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Error fetching event histogram: {e}")
+            return []
+    
+    def maintain_partitions(self, months_ahead: int = 3):
+        """
+        Create upcoming monthly audit_logs partitions and drop expired ones
+        Old months are removed with DROP TABLE, never row-by-row DELETE.
+        Expired rollup buckets are pruned at the same time.
+        
+        Returns:
+            Dict with number of partitions created and dropped
+        """
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT audit_logs_create_partitions(%s) AS created", (months_ahead,))
+            created = cursor.fetchone()['created']
+            cursor.execute("SELECT audit_logs_drop_partitions(%s) AS dropped", (self.retention_months,))
+            dropped = cursor.fetchone()['dropped']
+            cursor.execute(
+                "SELECT audit_event_rollups_prune(%s, %s)",
+                (self.MINUTE_ROLLUP_RETENTION_HOURS, self.retention_months)
+            )
+            
+            conn.commit()
+            cursor.close()
+            conn.close()
+            
+            return {"created": created, "dropped": dropped}
+        except Exception as e:
+            print(f"Error maintaining audit log partitions: {e}")
+            return {"created": 0, "dropped": 0}
 
 # Global audit logger instance
 audit_logger = AuditLogger()
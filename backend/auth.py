@@ -1,12 +1,20 @@
-from passlib.context import CryptContext
-from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from functools import lru_cache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
+import config  # noqa: F401  (loads .env)
+from password_executor import password_executor
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing settings
+# Hashes made with a different cost are flagged for rehash on next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Password hashing context, built on first use to keep passlib out of startup"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # JWT settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
@@ -17,15 +25,23 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 security = HTTPBearer()
 
 def hash_password(password: str) -> str:
-    """Hash a password"""
-    return pwd_context.hash(password)
+    """Hash a password (runs on the bounded bcrypt pool)"""
+    return password_executor.run(get_pwd_context().hash, password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verify a password against a hash (runs on the bounded bcrypt pool)"""
+    return password_executor.run(get_pwd_context().verify, plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple:
+    """
+    Verify a password and rehash it if the configured cost has changed
+    Returns (valid, new_hash) where new_hash is None unless a rehash is needed
+    """
+    return password_executor.run(get_pwd_context().verify_and_update, plain_password, hashed_password)
 
 def create_access_token(data: dict) -> str:
     """Create a JWT token"""
+    from jose import jwt
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
@@ -34,6 +50,7 @@ def create_access_token(data: dict) -> str:
 
 def verify_token(token: str) -> dict:
     """Verify and decode a JWT token"""
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
@@ -0,0 +1,295 @@
+"""
+Autocomplete Service
+As-you-type suggestions for tags and entry titles from a per-user prefix
+index in Redis, so the editor never queries knowledge_entries per keystroke.
+
+The index is two sorted sets where every member has score 0, so Redis keeps
+them in byte order and ZRANGEBYLEX returns all members starting with a
+prefix. The member carries the ranking data after the search term:
+
+    tags    <tag>\\0<entry count>\\0<last used ts>
+    titles  <lowercased title>\\0<updated ts>\\0<entry id>\\0<title>
+
+A lookup reads at most MAX_CANDIDATES members per set. Short prefixes
+(up to SHORT_PREFIX_CHARS) that match more than that are ranked when the
+index is built and stored in a hash per set, prefix -> JSON suggestions, so
+typing "r" ranks every tag starting with r, not the first MAX_CANDIDATES in
+byte order. A longer prefix that fills the window reads all its matches.
+
+It is built in one pass from user_tag_counts (already-normalized tags) and
+entry titles, and tagged with the entry list version
+(cache_service.entry_list_keys). Every create/update/delete replaces that
+version, so the next lookup after a write rebuilds the index. One caller
+rebuilds at a time (a Redis lock); the others answer from the previous index
+meanwhile, or with no suggestions if there is none.
+
+While Redis is unreachable each process keeps its own copy of a user's index
+for LOCAL_INDEX_SECONDS, so typing doesn't query Postgres per keystroke.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+
+from cache_service import redis_client, entry_list_keys
+from db import get_db_connection
+
+AUTOCOMPLETE_TTL = 3600  # 1 hour
+# Members read per prefix before ranking; prefixes that match more are
+# ranked ahead of time (short ones) or read in full (longer ones)
+MAX_CANDIDATES = 200
+SHORT_PREFIX_CHARS = 3
+MAX_SUGGESTIONS = 20
+SUGGESTION_TYPES = ("tags", "titles")
+# Longest a rebuild may take before another caller can claim it
+REBUILD_LOCK_SECONDS = 10
+# In-process copies used while Redis is down
+LOCAL_INDEX_SECONDS = 30
+LOCAL_INDEX_MAX_USERS = 1000
+
+_SEP = "\0"
+
+# user_id -> (expires at, tags, titles); only filled while Redis is unreachable
+_local_indexes = {}
+_local_loading = {}  # user_id -> lock held by the caller loading that user's copy
+_local_lock = threading.Lock()
+
+
+def autocomplete_keys(user_id: int) -> tuple:
+    prefix = f"autocomplete:user:{user_id}"
+    return f"{prefix}:tags", f"{prefix}:titles", f"{prefix}:version"
+
+
+def rebuild_lock_key(user_id: int) -> str:
+    return f"autocomplete:user:{user_id}:rebuilding"
+
+
+def ranked_prefix_keys(user_id: int) -> tuple:
+    prefix = f"autocomplete:user:{user_id}"
+    return f"{prefix}:tags:ranked", f"{prefix}:titles:ranked"
+
+
+def normalize_prefix(text: str) -> str:
+    """Match the stored terms: tags are lowercase (normalize_tags), titles are indexed lowercased"""
+    return "".join(ch for ch in (text or "") if ch.isprintable()).lstrip().casefold()
+
+
+def _timestamp(value) -> int:
+    return int(value.timestamp()) if isinstance(value, datetime) else 0
+
+
+def _tag_member(tag: str, count: int, last_used) -> str:
+    return _SEP.join((tag, str(count), str(_timestamp(last_used))))
+
+
+def _title_member(entry_id: int, title: str, updated_at) -> str:
+    return _SEP.join((title.casefold(), str(_timestamp(updated_at)), str(entry_id), title))
+
+
+def _load_index(user_id: int) -> tuple:
+    """Read tag counts and titles from Postgres as index members"""
+    conn = get_db_connection(readonly=True, user_id=user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT tag, entry_count, last_used_at FROM user_tag_counts WHERE user_id = %s",
+            (user_id,)
+        )
+        tags = [_tag_member(row['tag'], row['entry_count'], row['last_used_at']) for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT id, title, updated_at FROM knowledge_entries WHERE user_id = %s",
+            (user_id,)
+        )
+        titles = [_title_member(row['id'], row['title'], row['updated_at'])
+                  for row in cursor.fetchall() if row['title']]
+        cursor.close()
+    finally:
+        conn.close()
+    return tags, titles
+
+
+def _fresh_local_index(user_id: int):
+    """(tags, titles) from this process's copy if it hasn't expired; caller holds _local_lock"""
+    cached = _local_indexes.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1], cached[2]
+    return None
+
+
+def _local_index(user_id: int) -> tuple:
+    """
+    A user's index from Postgres, kept in this process for LOCAL_INDEX_SECONDS
+    Used while Redis is down. Concurrent callers for one user wait for a
+    single load instead of each querying.
+    """
+    with _local_lock:
+        cached = _fresh_local_index(user_id)
+        if cached:
+            return cached
+        loading = _local_loading.setdefault(user_id, threading.Lock())
+    with loading:
+        with _local_lock:
+            cached = _fresh_local_index(user_id)
+            if cached:
+                return cached
+        tags, titles = _load_index(user_id)
+        with _local_lock:
+            if len(_local_indexes) >= LOCAL_INDEX_MAX_USERS:
+                now = time.monotonic()
+                for expired in [key for key, value in _local_indexes.items() if value[0] <= now]:
+                    del _local_indexes[expired]
+                if len(_local_indexes) >= LOCAL_INDEX_MAX_USERS:
+                    _local_indexes.clear()
+            _local_indexes[user_id] = (time.monotonic() + LOCAL_INDEX_SECONDS, tags, titles)
+            _local_loading.pop(user_id, None)
+        return tags, titles
+
+
+def _claim_rebuild(user_id: int) -> bool:
+    """True if this caller should rebuild the index (no one else is)"""
+    try:
+        return bool(redis_client.set(rebuild_lock_key(user_id), "1", ex=REBUILD_LOCK_SECONDS, nx=True))
+    except Exception:
+        return False
+
+
+def _release_rebuild(user_id: int):
+    try:
+        redis_client.delete(rebuild_lock_key(user_id))
+    except Exception:
+        pass  # expires after REBUILD_LOCK_SECONDS
+
+
+def _rank_short_prefixes(members: list, rank) -> dict:
+    """{prefix: JSON suggestions} for each short prefix matching at least MAX_CANDIDATES members"""
+    groups = {}
+    for member in members:
+        term = member.split(_SEP, 1)[0]
+        for length in range(min(SHORT_PREFIX_CHARS, len(term)) + 1):
+            groups.setdefault(term[:length], []).append(member)
+    return {
+        prefix: json.dumps(rank(group, prefix, MAX_SUGGESTIONS))
+        for prefix, group in groups.items() if len(group) >= MAX_CANDIDATES
+    }
+
+
+def _store_index(user_id: int, tags: list, titles: list, version: str):
+    tags_key, titles_key, version_key = autocomplete_keys(user_id)
+    ranked_keys = ranked_prefix_keys(user_id)
+    try:
+        pipe = redis_client.pipeline()
+        pipe.delete(tags_key, titles_key, *ranked_keys)
+        for key, ranked_key, members, rank in ((tags_key, ranked_keys[0], tags, _rank_tags),
+                                               (titles_key, ranked_keys[1], titles, _rank_titles)):
+            if not members:
+                continue
+            pipe.zadd(key, {member: 0 for member in members})
+            pipe.expire(key, AUTOCOMPLETE_TTL)
+            ranked = _rank_short_prefixes(members, rank)
+            if ranked:
+                pipe.hset(ranked_key, mapping=ranked)
+                pipe.expire(ranked_key, AUTOCOMPLETE_TTL)
+        # Expires first, so the sets are never read without their version
+        pipe.set(version_key, version, ex=AUTOCOMPLETE_TTL - 5)
+        pipe.execute()
+    except Exception:
+        pass  # served from Postgres until Redis takes writes again
+
+
+def _rank_tags(members: list, prefix: str, limit: int) -> list:
+    tags = []
+    for member in members:
+        tag, count, last_used = member.split(_SEP)
+        tags.append((tag != prefix, -int(count), -int(last_used), tag))
+    return [{"tag": tag, "count": -count} for _, count, _, tag in sorted(tags)[:limit]]
+
+
+def _rank_titles(members: list, prefix: str, limit: int) -> list:
+    # Entries sharing a title collapse into one suggestion (the newest), ranked by how many share it
+    titles = {}
+    for member in members:
+        key, updated, entry_id, title = member.split(_SEP, 3)
+        count, newest = titles.get(key, (0, None))
+        candidate = (int(updated), int(entry_id), title)
+        if newest is None or candidate[:2] > newest[:2]:
+            newest = candidate
+        titles[key] = (count + 1, newest)
+    # Newer ids break ties between titles updated in the same second
+    ranked = sorted(
+        titles.items(),
+        key=lambda item: (item[0] != prefix, -item[1][0], -item[1][1][0], -item[1][1][1])
+    )
+    return [{"title": title, "entry_id": entry_id} for _, (_, (_, entry_id, title)) in ranked[:limit]]
+
+
+def _matching(members: list, prefix: str) -> list:
+    return [member for member in members if member.startswith(prefix)]
+
+
+def _all_matching(key: str, low: bytes, high: bytes):
+    """Every member for a longer prefix that filled the candidate window; None if Redis fails"""
+    try:
+        return redis_client.zrangebylex(key, low, high)
+    except Exception:
+        return None
+
+
+def suggest(user_id: int, text: str, types=SUGGESTION_TYPES, limit: int = 10) -> dict:
+    """
+    Tags and titles starting with `text`: exact match first, then most used,
+    then most recent
+
+    Returns:
+        {"tags": [{"tag", "count"}], "titles": [{"title", "entry_id"}]} for the requested types
+    """
+    prefix = normalize_prefix(text)
+    limit = max(1, min(limit, MAX_SUGGESTIONS))
+    tags_key, titles_key, version_key = autocomplete_keys(user_id)
+    low, high = f"[{prefix}".encode(), f"[{prefix}".encode() + b"\xff"
+    short = len(prefix) <= SHORT_PREFIX_CHARS
+    ranked = (None, None)
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zrangebylex(tags_key, low, high, start=0, num=MAX_CANDIDATES)
+        pipe.zrangebylex(titles_key, low, high, start=0, num=MAX_CANDIDATES)
+        pipe.get(version_key)
+        pipe.get(entry_list_keys(user_id)[2])
+        if short:
+            for ranked_key in ranked_prefix_keys(user_id):
+                pipe.hget(ranked_key, prefix)
+        tags, titles, built, version, *read = pipe.execute()
+        reachable, fresh = True, built is not None and built == (version or "")
+        ranked = tuple(read) or ranked
+    except Exception:
+        reachable, fresh = False, False
+
+    # Fresh, or another caller is rebuilding: answer from the index as read
+    from_index = reachable
+    if not reachable:
+        all_tags, all_titles = _local_index(user_id)
+    elif not fresh and _claim_rebuild(user_id):
+        # Missing or older than the last write: rebuild, and answer from every match that was read
+        try:
+            all_tags, all_titles = _load_index(user_id)
+            _store_index(user_id, all_tags, all_titles, version or "")
+        finally:
+            _release_rebuild(user_id)
+        from_index = False
+
+    if not from_index:
+        tags, titles = _matching(all_tags, prefix), _matching(all_titles, prefix)
+        ranked = (None, None)
+
+    result = {}
+    for kind, key, members, ranked_value, rank in (("tags", tags_key, tags, ranked[0], _rank_tags),
+                                                   ("titles", titles_key, titles, ranked[1], _rank_titles)):
+        if kind not in types:
+            continue
+        if ranked_value:
+            result[kind] = json.loads(ranked_value)[:limit]
+            continue
+        if from_index and len(members) >= MAX_CANDIDATES:
+            members = _all_matching(key, low, high) or members
+        result[kind] = rank(members, prefix, limit)
+    return result
@@ -0,0 +1,159 @@
+"""
+Cache Codec Benchmark
+Bytes stored per cached entry list and time to decode a hit, for the
+previous plain-JSON values versus cache_codec (msgpack / JSON, with and
+without zlib).
+
+Entries are synthetic notes: words drawn from a skewed vocabulary so the text
+compresses roughly like prose, not like repeated filler.
+
+With --redis-url the lists are also written to a real Redis, reporting
+MEMORY USAGE of the entry hash and the median get_cached_entries() time
+(round trip + decode). Only the entries:user:bench:* keys are touched.
+
+Run from backend/:
+    python benchmarks/bench_cache_codec.py
+    python benchmarks/bench_cache_codec.py --sizes 50 500 2000 --redis-url redis://localhost:6379/15
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache_codec  # noqa: E402
+
+WORDS = (
+    "the a to of and in is for on with that this it as be are by from at or an not can use cache "
+    "redis query index latency request user entry note api token model python function database "
+    "postgres connection pool timeout retry server client response error value key list hash time "
+    "memory batch pipeline write read replica schema migration deploy config test benchmark profile"
+).split()
+
+# name -> (codec, compress threshold); None means the pre-codec json.dumps text
+VARIANTS = {
+    "json (before)": None,
+    "json": ("json", 10 ** 9),
+    "json+zlib": ("json", cache_codec.CACHE_COMPRESS_MIN_BYTES),
+    "msgpack": ("msgpack", 10 ** 9),
+    "msgpack+zlib": ("msgpack", cache_codec.CACHE_COMPRESS_MIN_BYTES),
+}
+
+
+def make_entries(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+
+    def text(words):
+        return " ".join(rng.choices(WORDS, weights, k=words))
+
+    return [
+        {
+            "id": count - i, "user_id": 1, "title": text(rng.randint(3, 8)),
+            "content": text(rng.randint(40, 600)), "tags": rng.sample(WORDS, rng.randint(0, 4)),
+            "created_at": "2026-01-01 00:00:00", "updated_at": "2026-01-01 00:00:00"
+        }
+        for i in range(count)
+    ]
+
+
+def encoder(variant):
+    if variant is None:
+        return lambda value: json.dumps(value, default=str)
+    codec, threshold = variant
+
+    def encode(value):
+        cache_codec.CACHE_CODEC = codec
+        return cache_codec.encode(value, compress_min_bytes=threshold)
+    return encode
+
+
+def median_seconds(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def measure(entries: list, variant, repeat: int) -> dict:
+    encode = encoder(variant)
+    fields = {str(entry["id"]): encode(entry) for entry in entries}
+    stored = sum(len(value) for value in fields.values())
+    decode_s = median_seconds(lambda: [cache_codec.decode(value) for value in fields.values()], repeat)
+    encode_s = median_seconds(lambda: [encode(entry) for entry in entries], repeat)
+    return {"fields": fields, "bytes": stored, "decode_ms": decode_s * 1000, "encode_ms": encode_s * 1000}
+
+
+def measure_redis(redis_url: str, entries: list, fields: dict, repeat: int) -> dict:
+    """Store one list in Redis the way cache_entries does; returns memory and hit time"""
+    import redis
+    import cache_service
+
+    client = redis.Redis.from_url(redis_url)
+    user_id = "bench"
+    ids_key, data_key, version_key = cache_service.entry_list_keys(user_id)
+    try:
+        pipe = client.pipeline()
+        pipe.delete(ids_key, data_key, version_key)
+        pipe.rpush(ids_key, *[str(entry["id"]) for entry in entries], cache_service.ENTRY_LIST_SENTINEL)
+        pipe.hset(data_key, mapping=fields)
+        pipe.execute()
+        memory = client.memory_usage(data_key, samples=0)
+
+        original = cache_service.redis_binary_client
+        cache_service.redis_binary_client = client
+        try:
+            hit_s = median_seconds(lambda: cache_service.get_cached_entries(user_id), repeat)
+        finally:
+            cache_service.redis_binary_client = original
+        return {"redis_bytes": memory, "hit_ms": hit_s * 1000}
+    finally:
+        client.delete(ids_key, data_key, version_key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cache value encodings for entry lists")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 2000], help="Entries per user")
+    parser.add_argument("--repeat", type=int, default=20, help="Timing samples per measurement")
+    parser.add_argument("--redis-url", help="Also measure MEMORY USAGE and hit time on this Redis")
+    args = parser.parse_args()
+
+    variants = dict(VARIANTS)
+    if cache_codec.msgpack is None:
+        print("msgpack is not installed; skipping the msgpack rows\n")
+        variants = {name: v for name, v in variants.items() if not name.startswith("msgpack")}
+
+    default_codec = cache_codec.CACHE_CODEC
+    for size in args.sizes:
+        entries = make_entries(size)
+        print(f"{size} entries per user")
+        header = f"  {'encoding':<14} {'stored':>10} {'per entry':>10} {'vs before':>10} {'encode':>9} {'decode':>9}"
+        if args.redis_url:
+            header += f" {'redis mem':>10} {'hit':>9}"
+        print(header)
+        baseline = None
+        for name, variant in variants.items():
+            result = measure(entries, variant, args.repeat)
+            baseline = baseline or result["bytes"]
+            row = (
+                f"  {name:<14} {result['bytes'] / 1024:>8.1f}KB {result['bytes'] / size:>9.0f}B"
+                f" {result['bytes'] / baseline:>9.0%} {result['encode_ms']:>7.2f}ms {result['decode_ms']:>7.2f}ms"
+            )
+            if args.redis_url:
+                stored = measure_redis(args.redis_url, entries, result["fields"], args.repeat)
+                row += f" {stored['redis_bytes'] / 1024:>8.1f}KB {stored['hit_ms']:>7.2f}ms"
+            print(row)
+        print()
+    cache_codec.CACHE_CODEC = default_codec
+    print(f"Compression threshold: {cache_codec.CACHE_COMPRESS_MIN_BYTES} bytes per value, "
+          f"zlib level {cache_codec.COMPRESSION_LEVEL}")
+
+
+if __name__ == "__main__":
+    main()
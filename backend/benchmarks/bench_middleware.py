@@ -0,0 +1,257 @@
+"""
+Middleware Benchmark
+Per-request overhead of the previous @app.middleware("http") security
+headers + global rate limit stack versus the pure ASGI replacements.
+
+Requests are sent straight to the ASGI app (no HTTP client) with in-memory
+Redis, so the numbers are the middleware cost alone.
+
+A second run sends concurrent requests to a sync endpoint, which runs on the
+anyio threadpool, with a simulated Redis round trip. It compares the limiter
+awaited on the asyncio client (what the middleware does) with the same check
+run on the threadpool, where it competes with the endpoints for workers.
+
+Run from backend/: python benchmarks/bench_middleware.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from starlette.concurrency import run_in_threadpool  # noqa: E402
+from testing import fakes  # noqa: E402
+
+REQUESTS = 5000
+UNLIMITED = 10 ** 9
+
+# Sync endpoint run: requests in flight, endpoint work, Redis round trip
+CONCURRENCY = 200
+CONCURRENT_REQUESTS = 2000
+ENDPOINT_SECONDS = 0.002
+REDIS_LATENCY_MS = 1
+
+
+def legacy_app(redis_client, limit):
+    """The previous BaseHTTPMiddleware stack from main.py"""
+    from audit_service import audit_logger
+
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def security_headers_middleware(request: Request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        response.headers["Content-Security-Policy"] = (
+            "default-src 'self'; "
+            "script-src 'self'; "
+            "style-src 'self' 'unsafe-inline'; "
+            "img-src 'self' data: https:; "
+            "font-src 'self'; "
+            "connect-src 'self'; "
+            "frame-ancestors 'none'"
+        )
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        response.headers["Permissions-Policy"] = (
+            "geolocation=(), "
+            "microphone=(), "
+            "camera=(), "
+            "payment=(), "
+            "usb=(), "
+            "magnetometer=(), "
+            "gyroscope=(), "
+            "accelerometer=()"
+        )
+        return response
+
+    @app.middleware("http")
+    async def global_rate_limit_middleware(request: Request, call_next):
+        if request.method == "OPTIONS":
+            return await call_next(request)
+        client_ip = request.client.host
+        if request.url.path in ["/", "/api/health", "/docs", "/openapi.json", "/metrics"]:
+            return await call_next(request)
+        key = f"global_rate_limit:ip:{client_ip}"
+        count = redis_client.get(key)
+        count = int(count) if count else 0
+        if count >= limit:
+            audit_logger.log_rate_limit(
+                event_type=audit_logger.RATE_LIMIT_EXCEEDED,
+                ip_address=client_ip,
+                details={"endpoint": str(request.url.path)}
+            )
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests. Please try again later."},
+                headers={"Retry-After": "3600"}
+            )
+        if count == 0:
+            redis_client.setex(key, 3600, 1)
+        else:
+            redis_client.incr(key)
+        return await call_next(request)
+
+    add_routes(app)
+    return app
+
+
+def asgi_app():
+    """The pure ASGI middleware now used by main.py"""
+    from middleware import GlobalRateLimitMiddleware, SecurityHeadersMiddleware
+
+    app = FastAPI()
+    app.add_middleware(GlobalRateLimitMiddleware)
+    app.add_middleware(SecurityHeadersMiddleware)
+    add_routes(app)
+    return app
+
+
+def bare_app():
+    app = FastAPI()
+    add_routes(app)
+    return app
+
+
+class ThreadpoolLimiter:
+    """The limiter check the middleware used to make: the sync client on the threadpool"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    async def check_rate_limit_async(self, identifier):
+        return await run_in_threadpool(self.limiter.check_rate_limit, identifier)
+
+
+def threadpool_app():
+    from middleware import GlobalRateLimitMiddleware, SecurityHeadersMiddleware
+    from rate_limiter import ip_rate_limiter
+
+    app = FastAPI()
+    app.add_middleware(GlobalRateLimitMiddleware, limiter=ThreadpoolLimiter(ip_rate_limiter))
+    app.add_middleware(SecurityHeadersMiddleware)
+    add_routes(app)
+    return app
+
+
+def add_routes(app):
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/api/work")
+    def work():
+        # Blocking work, like the API's sync endpoints waiting on Postgres
+        time.sleep(ENDPOINT_SECONDS)
+        return {"ok": True}
+
+
+async def drive(app, requests: int) -> float:
+    """Send `requests` GETs straight to the ASGI app; returns seconds per request"""
+    statuses = set()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.add(message["status"])
+
+    def scope(i):
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/api/ping", "raw_path": b"/api/ping",
+            "query_string": b"", "root_path": "", "headers": [(b"host", b"bench")],
+            "client": (f"10.0.{i % 250}.1", 50000), "server": ("bench", 80),
+        }
+
+    for i in range(200):  # warm up
+        await app(scope(i), receive, send)
+    start = time.perf_counter()
+    for i in range(requests):
+        await app(scope(i), receive, send)
+    elapsed = time.perf_counter() - start
+    assert len(statuses) == 1, statuses
+    return elapsed / requests
+
+
+async def drive_concurrent(app, requests: int, concurrency: int) -> float:
+    """Send `requests` GETs to the sync endpoint, `concurrency` at a time; returns requests/sec"""
+    statuses = set()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.add(message["status"])
+
+    async def one(i):
+        async with slots:
+            await app({
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+                "method": "GET", "scheme": "http", "path": "/api/work", "raw_path": b"/api/work",
+                "query_string": b"", "root_path": "", "headers": [(b"host", b"bench")],
+                "client": (f"10.1.{i % 250}.1", 50000), "server": ("bench", 80),
+            }, receive, send)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    assert statuses == {200}, statuses
+    return requests / elapsed
+
+
+def main():
+    backend = fakes.install(memory=True)
+    import rate_limiter
+    from audit_service import audit_logger
+
+    # Keep the 429 path free of DB writes so only the middleware is measured
+    audit_logger.log_rate_limit = lambda **kwargs: None
+
+    print(f"Time per request ({REQUESTS} requests, in-memory Redis)\n")
+    print(f"{'scenario':<16} {'bare app':>10} {'legacy':>10} {'asgi':>10} {'legacy overhead':>16} {'asgi overhead':>14}")
+
+    for scenario, limit in (("allowed", UNLIMITED), ("rejected (429)", 0)):
+        rate_limiter.ip_rate_limiter.max_requests = limit
+        bare = asyncio.run(drive(bare_app(), REQUESTS))
+        legacy = asyncio.run(drive(legacy_app(backend.redis, limit), REQUESTS))
+        asgi = asyncio.run(drive(asgi_app(), REQUESTS))
+        print(
+            f"{scenario:<16} {bare * 1e6:>8.1f}µs {legacy * 1e6:>8.1f}µs {asgi * 1e6:>8.1f}µs"
+            f" {(legacy - bare) * 1e6:>+14.1f}µs {(asgi - bare) * 1e6:>+12.1f}µs"
+        )
+
+    print("\nRejected requests never reach the endpoint, so they can be cheaper than the bare app.")
+    print("The ASGI limiter writes the audit row on the threadpool instead of blocking the event")
+    print("loop; that hop is the remaining cost on the 429 path (the audit write itself is stubbed).")
+
+    import anyio.to_thread
+
+    rate_limiter.ip_rate_limiter.max_requests = UNLIMITED
+    backend.redis.latency = REDIS_LATENCY_MS / 1000
+
+    async def run(app):
+        workers = anyio.to_thread.current_default_thread_limiter().total_tokens
+        return workers, await drive_concurrent(app, CONCURRENT_REQUESTS, CONCURRENCY)
+
+    print(f"\nSync endpoint ({ENDPOINT_SECONDS * 1000:.0f}ms of blocking work), {CONCURRENCY} requests in flight, "
+          f"{REDIS_LATENCY_MS}ms per Redis round trip\n")
+    print(f"{'limiter':<24} {'requests/sec':>12}")
+    for name, build in (("none", bare_app), ("async client", asgi_app), ("sync, on the threadpool", threadpool_app)):
+        workers, rate = asyncio.run(run(build()))
+        print(f"{name:<24} {rate:>12.0f}")
+    print(f"\nThe threadpool has {workers} workers. Each sync check holds one for its Redis round trips,")
+    print("so the endpoints get fewer of them; the async check doesn't take any.")
+    backend.uninstall()
+
+
+if __name__ == "__main__":
+    main()
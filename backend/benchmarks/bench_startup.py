@@ -0,0 +1,171 @@
+"""
+Startup Benchmark
+Cold start cost of the API: how long `import main` takes (with a
+`python -X importtime` breakdown of the slowest modules) and the time from
+launching uvicorn until the first request is answered.
+
+Each run is a fresh interpreter, so nothing is shared between samples. No
+Redis/Postgres/Anthropic connection is needed: startup doesn't open one and
+GET / doesn't touch them.
+
+Run from backend/:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --target-ms 1200 -o startup.json
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Time-to-first-request budget; the run fails (exit 1) when the median is over it
+DEFAULT_TARGET_MS = 1500
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> list:
+    """Parse `-X importtime` output into (module, self_us, cumulative_us, depth) rows"""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def top_level_packages(rows: list) -> dict:
+    """Cumulative import time per top-level package, counted once where it was first imported"""
+    packages = {}
+    for module, _, cumulative_us, _ in rows:
+        package = module.split(".", 1)[0]
+        if module == package:
+            packages[package] = packages.get(package, 0) + cumulative_us
+    return packages
+
+
+def measure_import(module: str = "main") -> tuple:
+    """Import `module` in a fresh interpreter; returns (total ms, importtime rows)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = parse_importtime(result.stderr)
+    total_us = next((cumulative for name, _, cumulative, _ in reversed(rows) if name == module), 0)
+    return total_us / 1000, rows
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_request(timeout: float = 30) -> float:
+    """Start uvicorn and poll GET / until it answers; returns ms from spawn to first 200"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited early:\n{server.stderr.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError(f"no response from {url} within {timeout}s")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def run(runs: int, top: int) -> dict:
+    import_ms = []
+    packages = {}
+    slowest = {}
+    for _ in range(runs):
+        total_ms, rows = measure_import()
+        import_ms.append(total_ms)
+        for package, us in top_level_packages(rows).items():
+            if package == "main":
+                continue
+            packages.setdefault(package, []).append(us / 1000)
+        for module, self_us, _, _ in rows:
+            slowest.setdefault(module, []).append(self_us / 1000)
+
+    first_request_ms = [measure_first_request() for _ in range(runs)]
+
+    median = statistics.median
+    return {
+        "runs": runs,
+        "python": sys.version.split()[0],
+        "import_main_ms": round(median(import_ms), 1),
+        "first_request_ms": round(median(first_request_ms), 1),
+        "first_request_ms_max": round(max(first_request_ms), 1),
+        "top_packages": [
+            {"package": name, "ms": round(median(values), 1)}
+            for name, values in sorted(packages.items(), key=lambda item: -median(item[1]))[:top]
+        ],
+        "top_modules_self": [
+            {"module": name, "ms": round(median(values), 1)}
+            for name, values in sorted(slowest.items(), key=lambda item: -median(item[1]))[:top]
+        ],
+    }
+
+
+def print_report(results: dict, target_ms: float):
+    print(f"Cold start (median of {results['runs']} fresh interpreters, Python {results['python']})\n")
+    print(f"  import main           {results['import_main_ms']:>8.1f} ms")
+    print(f"  time to first request {results['first_request_ms']:>8.1f} ms  (max {results['first_request_ms_max']:.1f} ms)")
+    verdict = "OK" if results["first_request_ms"] <= target_ms else "OVER TARGET"
+    print(f"  target                {target_ms:>8.1f} ms  {verdict}\n")
+
+    print(f"{'package (cumulative)':<32} {'ms':>8}")
+    for row in results["top_packages"]:
+        print(f"{row['package']:<32} {row['ms']:>8.1f}")
+    print(f"\n{'module (self time)':<48} {'ms':>8}")
+    for row in results["top_modules_self"]:
+        print(f"{row['module']:<48} {row['ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import time and time to first request")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="Rows in the import-time tables")
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS,
+                        help="Time-to-first-request budget (median)")
+    parser.add_argument("-o", "--output", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.runs, args.top)
+    results["target_ms"] = args.target_ms
+    print_report(results, args.target_ms)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if results["first_request_ms"] <= args.target_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
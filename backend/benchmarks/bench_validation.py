@@ -0,0 +1,95 @@
+"""
+Validation Benchmark
+Compares the shared single-pass validators against the previous inline
+validators on 50,000 character payloads
+
+Run from backend/: python benchmarks/bench_validation.py
+"""
+import html
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import KnowledgeEntryCreate  # noqa: E402
+from validation import clean_content, clean_title, normalize_tags  # noqa: E402
+
+ITERATIONS = 200
+
+PAYLOADS = {
+    "plain_50k": ("lorem ipsum dolor sit amet\n" * 1900)[:49990],
+    "markup_50k": ("<p>Use `a < b && c > d` in \"code\"</p>\n" * 1300)[:49990],
+    "padded_50k": "   " + ("x" * 49990) + "   ",
+}
+TAGS = ["Python", " FastAPI ", "redis", "python", "caching-strategy", "", "db_tuning"]
+
+
+def legacy_content(v):
+    """Previous KnowledgeEntryCreate.validate_content"""
+    if not v or len(v.strip()) < 1:
+        raise ValueError('Content cannot be empty')
+    if len(v) > 50000:
+        raise ValueError('Content cannot be longer than 50,000 characters')
+    return html.escape(v.strip())
+
+
+def legacy_title(v):
+    """Previous KnowledgeEntryCreate.validate_title"""
+    if not v or len(v.strip()) < 1:
+        raise ValueError('Title cannot be empty')
+    if len(v) > 500:
+        raise ValueError('Title cannot be longer than 500 characters')
+    v = html.escape(v.strip())
+    if re.search(r'[\x00-\x1F\x7F-\x9F]', v):
+        raise ValueError('Title contains invalid characters')
+    return v
+
+
+def legacy_tags(v):
+    """Previous KnowledgeEntryCreate.validate_tags"""
+    sanitized_tags = []
+    for tag in v:
+        if not tag or len(tag.strip()) == 0:
+            continue
+        clean_tag = html.escape(tag.strip().lower())
+        if not re.match(r'^[a-z0-9\s\-_]+$', clean_tag):
+            raise ValueError('invalid tag')
+        sanitized_tags.append(clean_tag)
+    return sanitized_tags
+
+
+def measure(fn, *args) -> float:
+    """Return mean microseconds per call"""
+    total = timeit.timeit(lambda: fn(*args), number=ITERATIONS)
+    return total / ITERATIONS * 1_000_000
+
+
+def report(name: str, legacy_us: float, shared_us: float):
+    speedup = legacy_us / shared_us if shared_us else float("inf")
+    print(f"  {name:<22} legacy {legacy_us:10.1f} µs   shared {shared_us:10.1f} µs   {speedup:5.2f}x")
+
+
+def run_benchmarks():
+    """Run all validation benchmarks"""
+    print(f"📏 Validation benchmark ({ITERATIONS} iterations each)\n")
+
+    print("Content:")
+    for name, payload in PAYLOADS.items():
+        assert legacy_content(payload) == clean_content(payload)
+        report(name, measure(legacy_content, payload), measure(clean_content, payload))
+
+    print("\nTitle + tags:")
+    title = "Notes on <FastAPI> & Redis caching"
+    report("title", measure(legacy_title, title), measure(clean_title, title))
+    report("tags", measure(legacy_tags, TAGS), measure(normalize_tags, TAGS))
+
+    print("\nFull model (50k content):")
+    body = {"title": title, "content": PAYLOADS["markup_50k"], "tags": TAGS}
+    model_us = measure(lambda: KnowledgeEntryCreate(**body))
+    print(f"  {'KnowledgeEntryCreate':<22} {model_us:10.1f} µs")
+
+
+if __name__ == "__main__":
+    run_benchmarks()
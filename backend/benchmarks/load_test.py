@@ -0,0 +1,402 @@
+"""
+Load Test
+Drives a realistic mix of auth, entry CRUD and chat requests at a fixed
+concurrency and reports requests/sec and p50/p95/p99 latency per endpoint.
+
+Each virtual user registers, logs in, seeds a few entries, then loops over
+the weighted mix until the run ends. By default the app runs in-process
+against in-memory Redis/PostgreSQL fakes with a stubbed Anthropic client, so
+no services or API keys are needed:
+
+    python benchmarks/load_test.py --duration 30 --concurrency 20
+    python benchmarks/load_test.py --backend local          # DATABASE_URL / REDIS_URL
+    python benchmarks/load_test.py --url http://localhost:8000
+    python benchmarks/load_test.py --compare before.json after.json
+
+Results are written to benchmarks/results/ as JSON (tagged with the git
+commit) so runs can be compared across commits with --compare.
+
+Run from backend/.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# Relative weights of each action once a user is logged in
+DEFAULT_MIX = {
+    "list": 35,
+    "summary": 0,  # dashboard list view; opt in with --mix summary=N
+    "autocomplete": 0,  # editor suggestions; opt in with --mix autocomplete=N
+    "get": 25,
+    "create": 12,
+    "update": 10,
+    "delete": 5,
+    "chat": 5,
+    "login": 3,
+    "me": 5,
+}
+
+# Effectively disables rate limiting while still running the limiter code
+UNLIMITED = 10 ** 9
+
+SEED_ENTRIES = 3
+
+# Users registering at once; more would overflow the bcrypt queue with 503s
+SETUP_CONCURRENCY = 8
+
+TOPICS = ["redis", "postgres", "fastapi", "caching", "indexes", "pydantic", "asyncio", "docker"]
+
+
+def parse_mix(spec: str) -> dict:
+    """Parse 'list=40,get=30,chat=0' on top of DEFAULT_MIX"""
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown action '{name}' (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values), math.ceil(pct / 100 * len(sorted_values))) - 1)
+    return sorted_values[rank]
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    """
+    Aggregate (endpoint, status, seconds) samples
+
+    Returns:
+        {"totals": {...}, "endpoints": {endpoint: {...}}}
+    """
+    def stats(rows):
+        latencies = sorted(seconds * 1000 for _, _, seconds in rows)
+        statuses = {}
+        errors = 0
+        for _, status, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == "error" or status >= 500:
+                errors += 1
+        return {
+            "requests": len(rows),
+            "rps": round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            "errors": errors,
+            "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+            "status": dict(sorted(statuses.items())),
+        }
+
+    by_endpoint = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+
+    return {
+        "totals": stats(samples),
+        "endpoints": {endpoint: stats(rows) for endpoint, rows in sorted(by_endpoint.items())},
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+class VirtualUser:
+    """One simulated user with its own client, token and entries"""
+
+    def __init__(self, index: int, run_id: str, client: httpx.AsyncClient, samples: list):
+        self.email = f"load-{run_id}-{index}@example.com"
+        self.password = f"Load-test-{run_id}-pw1!"
+        self.client = client
+        self.samples = samples
+        self.headers = {}
+        self.entry_ids = []
+        self.rng = random.Random(f"{run_id}-{index}")
+
+    async def request(self, method: str, path: str, endpoint: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=self.headers, **kwargs)
+            status = response.status_code
+        except Exception:
+            response, status = None, "error"
+        self.samples.append((f"{method} {endpoint}", status, time.perf_counter() - start))
+        return response
+
+    def entry_body(self) -> dict:
+        topic = self.rng.choice(TOPICS)
+        return {
+            "title": f"Notes on {topic} #{self.rng.randint(1, 10_000)}",
+            "content": f"How {topic} behaves under load. " * self.rng.randint(5, 60),
+            "tags": self.rng.sample(TOPICS, 2),
+        }
+
+    async def login(self) -> bool:
+        response = await self.request(
+            "POST", "/api/auth/login", "/api/auth/login",
+            json={"email": self.email, "password": self.password}
+        )
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            return True
+        return False
+
+    async def setup(self) -> bool:
+        await self.request(
+            "POST", "/api/auth/register", "/api/auth/register",
+            json={"email": self.email, "password": self.password}
+        )
+        if not await self.login():
+            return False
+        for _ in range(SEED_ENTRIES):
+            await self.create()
+        return True
+
+    async def create(self):
+        response = await self.request("POST", "/api/entries", "/api/entries", json=self.entry_body())
+        if response is not None and response.status_code == 201:
+            self.entry_ids.append(response.json()["id"])
+
+    async def run_action(self, action: str):
+        if action in ("get", "update", "delete") and not self.entry_ids:
+            action = "create"
+
+        if action == "list":
+            await self.request("GET", "/api/entries", "/api/entries")
+        elif action == "summary":
+            await self.request("GET", "/api/entries?view=summary", "/api/entries?view=summary")
+        elif action == "autocomplete":
+            prefix = self.rng.choice(TOPICS)[:self.rng.randint(1, 4)]
+            await self.request("GET", f"/api/autocomplete?q={prefix}", "/api/autocomplete")
+        elif action == "get":
+            entry_id = self.rng.choice(self.entry_ids)
+            await self.request("GET", f"/api/entries/{entry_id}", "/api/entries/{entry_id}")
+        elif action == "create":
+            await self.create()
+        elif action == "update":
+            entry_id = self.rng.choice(self.entry_ids)
+            await self.request(
+                "PUT", f"/api/entries/{entry_id}", "/api/entries/{entry_id}",
+                json={"content": self.entry_body()["content"]}
+            )
+        elif action == "delete":
+            entry_id = self.entry_ids.pop(self.rng.randrange(len(self.entry_ids)))
+            await self.request("DELETE", f"/api/entries/{entry_id}", "/api/entries/{entry_id}")
+        elif action == "chat":
+            await self.request(
+                "POST", "/api/chat", "/api/chat",
+                json={"message": f"What do I know about {self.rng.choice(TOPICS)}?"}
+            )
+        elif action == "login":
+            await self.login()
+        elif action == "me":
+            await self.request("GET", "/api/auth/me", "/api/auth/me")
+
+
+def load_app(args):
+    """Import the app in-process with stubbed Anthropic (and fakes for --backend memory)"""
+    os.environ["ENABLE_AI_CHAT"] = "true"
+    from testing import fakes
+
+    backend = fakes.install(
+        memory=args.backend == "memory",
+        ai_latency_ms=args.ai_latency_ms,
+        db_latency_ms=args.db_latency_ms,
+        redis_latency_ms=args.redis_latency_ms
+    )
+    import main
+    import rate_limiter
+
+    if not args.keep_limits:
+        # Measure the cost of the limiters, not their rejections
+        for limiter in (rate_limiter.rate_limiter, rate_limiter.auth_rate_limiter, rate_limiter.chat_rate_limiter,
+                        rate_limiter.ai_daily_limiter, rate_limiter.ip_rate_limiter,
+                        rate_limiter.autocomplete_rate_limiter):
+            backend._patch(limiter, "max_requests", UNLIMITED)
+    return main.app, backend
+
+
+async def run_load(args) -> dict:
+    """Run the load test and return the results document"""
+    mix = parse_mix(args.mix)
+    actions, weights = list(mix), list(mix.values())
+    run_id = uuid.uuid4().hex[:8]
+    samples = []
+    backend = None
+
+    if args.url:
+        def make_client(index):
+            return httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        target = args.url
+    else:
+        app, backend = load_app(args)
+
+        def make_client(index):
+            # One client address per user, like real traffic, so per-IP limits apply per user
+            transport = httpx.ASGITransport(app=app, client=(f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}", 50000))
+            return httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout)
+        target = f"in-process ({args.backend})"
+
+    clients = [make_client(i) for i in range(args.concurrency)]
+    users = [VirtualUser(i, run_id, client, samples) for i, client in enumerate(clients)]
+
+    try:
+        print(f"🔧 Setting up {len(users)} users against {target}...", file=sys.stderr)
+        setup_slots = asyncio.Semaphore(SETUP_CONCURRENCY)
+
+        async def setup(user):
+            async with setup_slots:
+                return await user.setup()
+
+        ready = await asyncio.gather(*(setup(user) for user in users))
+        users = [user for user, ok in zip(users, ready) if ok]
+        if not users:
+            raise RuntimeError("No virtual user could log in; check the target and its logs")
+        setup_samples = len(samples)
+
+        print(f"🚀 Running for {args.duration}s at concurrency {len(users)}...", file=sys.stderr)
+        deadline = time.perf_counter() + args.duration
+        budget = [args.requests or float("inf")]
+
+        async def worker(user):
+            while time.perf_counter() < deadline and budget[0] > 0:
+                budget[0] -= 1
+                await user.run_action(user.rng.choices(actions, weights)[0])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(user) for user in users))
+        elapsed = time.perf_counter() - start
+    finally:
+        for client in clients:
+            await client.aclose()
+        if backend:
+            backend.uninstall()
+
+    results = {
+        "run": {
+            "id": run_id,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "target": target,
+            "concurrency": len(users),
+            "duration_s": round(elapsed, 2),
+            "mix": mix,
+            "limits": "kept" if args.keep_limits or args.url else "raised",
+            "ai_latency_ms": args.ai_latency_ms,
+            "python": platform.python_version(),
+        },
+        # Setup traffic (register/login/seed) is reported separately from the timed run
+        "setup": summarize(samples[:setup_samples], 0)["endpoints"],
+        **summarize(samples[setup_samples:], elapsed),
+    }
+    if backend and backend.db and backend.db.unsupported:
+        results["unsupported_sql"] = sorted(backend.db.unsupported)
+    return results
+
+
+def print_report(results: dict):
+    run = results["run"]
+    print(f"\n📊 {run['target']} @ {run['commit']}: concurrency {run['concurrency']}, {run['duration_s']}s, limits {run['limits']}")
+    print(f"{'endpoint':<32} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>6}  status")
+    rows = list(results["endpoints"].items()) + [("TOTAL", results["totals"])]
+    for endpoint, stats in rows:
+        statuses = " ".join(f"{status}:{count}" for status, count in stats["status"].items())
+        print(
+            f"{endpoint:<32} {stats['requests']:>7} {stats['rps']:>8.1f} {stats['p50_ms']:>8.1f}"
+            f" {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['errors']:>6}  {statuses}"
+        )
+    if results.get("unsupported_sql"):
+        print("\n⚠️  Statements the fake database could not run:")
+        for sql in results["unsupported_sql"]:
+            print(f"   {sql}")
+
+
+def compare(before_path: str, after_path: str):
+    """Print per-endpoint rps and latency changes between two result files"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def change(old, new):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"📊 {before['run']['commit']} -> {after['run']['commit']}")
+    print(f"{'endpoint':<32} {'rps':>18} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18}")
+    endpoints = sorted(set(before["endpoints"]) | set(after["endpoints"])) + ["TOTAL"]
+    for endpoint in endpoints:
+        old = before["totals"] if endpoint == "TOTAL" else before["endpoints"].get(endpoint)
+        new = after["totals"] if endpoint == "TOTAL" else after["endpoints"].get(endpoint)
+        if not old or not new:
+            print(f"{endpoint:<32} (only in {'after' if new else 'before'})")
+            continue
+        cells = [
+            f"{new[key]:.1f} ({change(old[key], new[key])})"
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms")
+        ]
+        print(f"{endpoint:<32} " + " ".join(f"{cell:>18}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API")
+    parser.add_argument("--backend", choices=["memory", "local"], default="memory",
+                        help="memory: in-process fakes; local: real DATABASE_URL/REDIS_URL")
+    parser.add_argument("--url", help="Test a running server instead of the in-process app")
+    parser.add_argument("--concurrency", type=int, default=20, help="Virtual users (default 20)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run (default 30)")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--mix", help=f"Action weights, e.g. 'list=50,chat=0' (default {DEFAULT_MIX})")
+    parser.add_argument("--ai-latency-ms", type=float, default=800, help="Stubbed Anthropic latency")
+    parser.add_argument("--db-latency-ms", type=float, default=0, help="Simulated DB round trip (memory backend)")
+    parser.add_argument("--redis-latency-ms", type=float, default=0, help="Simulated Redis round trip (memory backend)")
+    parser.add_argument("--keep-limits", action="store_true", help="Keep production rate limits")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("-o", "--output", help="Results file (default benchmarks/results/load-<commit>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = asyncio.run(run_load(args))
+    print_report(results)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load-{results['run']['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,201 @@
 import redis
-import json
+import redis.asyncio
+from redis.asyncio.retry import Retry as AsyncRetry
+from redis.backoff import ExponentialBackoff
+from redis.client import Pipeline
+from redis.retry import Retry
 import os
-from dotenv import load_dotenv
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+import config  # noqa: F401  (loads .env)
+from cache_codec import encode, decode
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from metrics import redis_command_duration_seconds, redis_errors_total, cache_requests_total
 
-load_dotenv()
+# Errors that mean Redis itself is unreachable (as opposed to a bad command)
+REDIS_DOWN_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)
+
+# Shared by every Redis call in the process: once Redis is failing, calls
+# raise CircuitOpenError immediately instead of waiting on the socket
+redis_breaker = CircuitBreaker(
+    "redis",
+    failure_threshold=int(os.getenv("REDIS_BREAKER_FAILURES", 5)),
+    reset_timeout=float(os.getenv("REDIS_BREAKER_RESET_SECONDS", 10))
+)
+
+class TimedPipeline(Pipeline):
+    """Pipeline that records one round trip per execute()"""
+    
+    def execute(self, raise_on_error: bool = True):
+        redis_breaker.before_call()
+        start = time.perf_counter()
+        try:
+            result = super().execute(raise_on_error)
+        except REDIS_DOWN_ERRORS:
+            redis_errors_total.inc("PIPELINE")
+            redis_breaker.record_failure()
+            raise
+        except Exception:
+            redis_errors_total.inc("PIPELINE")
+            redis_breaker.record_success()
+            raise
+        finally:
+            redis_command_duration_seconds.observe(time.perf_counter() - start, "PIPELINE")
+        redis_breaker.record_success()
+        return result
+
+class TimedRedis(redis.Redis):
+    """Redis client that records latency and errors per command, behind redis_breaker"""
+    
+    def execute_command(self, *args, **options):
+        redis_breaker.before_call()
+        command = str(args[0]).upper() if args else "UNKNOWN"
+        start = time.perf_counter()
+        try:
+            result = super().execute_command(*args, **options)
+        except REDIS_DOWN_ERRORS:
+            redis_errors_total.inc(command)
+            redis_breaker.record_failure()
+            raise
+        except Exception:
+            # Redis answered (e.g. WRONGTYPE), so it is up
+            redis_errors_total.inc(command)
+            redis_breaker.record_success()
+            raise
+        finally:
+            redis_command_duration_seconds.observe(time.perf_counter() - start, command)
+        redis_breaker.record_success()
+        return result
+    
+    def pipeline(self, transaction=True, shard_hint=None):
+        return TimedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+class AsyncTimedPipeline(redis.asyncio.client.Pipeline):
+    """TimedPipeline for the asyncio client"""
+    
+    async def execute(self, raise_on_error: bool = True):
+        redis_breaker.before_call()
+        start = time.perf_counter()
+        try:
+            result = await super().execute(raise_on_error)
+        except REDIS_DOWN_ERRORS:
+            redis_errors_total.inc("PIPELINE")
+            redis_breaker.record_failure()
+            raise
+        except Exception:
+            redis_errors_total.inc("PIPELINE")
+            redis_breaker.record_success()
+            raise
+        finally:
+            redis_command_duration_seconds.observe(time.perf_counter() - start, "PIPELINE")
+        redis_breaker.record_success()
+        return result
+
+class AsyncTimedRedis(redis.asyncio.Redis):
+    """TimedRedis for the asyncio client, behind the same redis_breaker"""
+    
+    async def execute_command(self, *args, **options):
+        redis_breaker.before_call()
+        command = str(args[0]).upper() if args else "UNKNOWN"
+        start = time.perf_counter()
+        try:
+            result = await super().execute_command(*args, **options)
+        except REDIS_DOWN_ERRORS:
+            redis_errors_total.inc(command)
+            redis_breaker.record_failure()
+            raise
+        except Exception:
+            redis_errors_total.inc(command)
+            redis_breaker.record_success()
+            raise
+        finally:
+            redis_command_duration_seconds.observe(time.perf_counter() - start, command)
+        redis_breaker.record_success()
+        return result
+    
+    def pipeline(self, transaction=True, shard_hint=None):
+        return AsyncTimedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
 
 # Initialize Redis client
 # Railway provides REDIS_URL or individual host/port
 redis_url = os.getenv("REDIS_URL")
 
+# Bound how long one call can hang on a dead or unreachable server. redis-py's
+# default is 3 retries with backoff up to 10s per call; one quick retry covers a
+# dropped connection and leaves longer outages to redis_breaker
+REDIS_CONNECTION_OPTIONS = {
+    "socket_connect_timeout": float(os.getenv("REDIS_CONNECT_TIMEOUT", 1)),
+    "socket_timeout": float(os.getenv("REDIS_SOCKET_TIMEOUT", 2)),
+    "retry": Retry(ExponentialBackoff(cap=0.1, base=0.01), int(os.getenv("REDIS_RETRIES", 1))),
+}
+
+def cache_namespace(key: str) -> str:
+    """Key prefix used to group cache metrics (entries, entry, chat, ...)"""
+    return key.split(":", 1)[0]
+
 def get_cache(key: str):
-    """Get value from cache"""
+    """Get value from cache (a miss while Redis is unavailable)"""
+    _flush_if_dirty()
     try:
-        value = redis_client.get(key)
+        value = redis_binary_client.get(key)
         if value:
-            return json.loads(value)
+            cache_requests_total.inc(cache_namespace(key), "hit")
+            return decode(value)
+        cache_requests_total.inc(cache_namespace(key), "miss")
+        return None
+    except CircuitOpenError:
+        cache_requests_total.inc(cache_namespace(key), "skipped")
         return None
     except Exception as e:
+        cache_requests_total.inc(cache_namespace(key), "error")
         return None
 
 if redis_url:
     # Use connection URL (Railway format)
-    redis_client = redis.from_url(redis_url, decode_responses=True)
+    redis_client = TimedRedis.from_url(redis_url, decode_responses=True, **REDIS_CONNECTION_OPTIONS)
 else:
     # Use individual params (fallback for local dev)
-    redis_client = redis.Redis(
+    redis_client = TimedRedis(
+        host=os.getenv("REDISHOST", "localhost"),
+        port=int(os.getenv("REDISPORT", 6379)),
+        db=0,
+        decode_responses=True,
+        **REDIS_CONNECTION_OPTIONS
+    )
+
+# Cached values are binary (see cache_codec), so they are read on a client that
+# returns raw bytes; writes can go through either client
+if redis_url:
+    redis_binary_client = TimedRedis.from_url(redis_url, **REDIS_CONNECTION_OPTIONS)
+else:
+    redis_binary_client = TimedRedis(
+        host=os.getenv("REDISHOST", "localhost"),
+        port=int(os.getenv("REDISPORT", 6379)),
+        db=0,
+        **REDIS_CONNECTION_OPTIONS
+    )
+
+# For code on the event loop (GlobalRateLimitMiddleware), so a Redis round trip
+# doesn't need a threadpool worker. Connections belong to the loop that opened them.
+ASYNC_REDIS_CONNECTION_OPTIONS = {
+    **REDIS_CONNECTION_OPTIONS,
+    "retry": AsyncRetry(ExponentialBackoff(cap=0.1, base=0.01), int(os.getenv("REDIS_RETRIES", 1))),
+}
+if redis_url:
+    async_redis_client = AsyncTimedRedis.from_url(redis_url, decode_responses=True, **ASYNC_REDIS_CONNECTION_OPTIONS)
+else:
+    async_redis_client = AsyncTimedRedis(
         host=os.getenv("REDISHOST", "localhost"),
         port=int(os.getenv("REDISPORT", 6379)),
         db=0,
-        decode_responses=True
+        decode_responses=True,
+        **ASYNC_REDIS_CONNECTION_OPTIONS
     )
 
 def set_cache(key: str, value: any, ttl: int = 900):
@@ -37,11 +204,7 @@ def set_cache(key: str, value: any, ttl: int = 900):
     Default TTL: 900 seconds (15 minutes)
     """
     try:
-        redis_client.setex(
-            key,
-            ttl,
-            json.dumps(value, default=str)  # default=str handles datetime
-        )
+        redis_client.setex(key, ttl, encode(value))
         return True
     except Exception as e:
         return False
@@ -69,11 +232,357 @@ def clear_user_cache(user_id: int):
     patterns = [
         f"entries:user:{user_id}:*",
         f"entry:*:user:{user_id}",
-        f"chat:user:{user_id}:*"
+        f"chat:user:{user_id}:*",
+        f"search:user:{user_id}:*",
+        f"mcp:user:{user_id}:*"
     ]
     for pattern in patterns:
         delete_cache_pattern(pattern)
 
+# ============ ENTRY LIST CACHE ============
+#
+# A user's entry list is cached as three keys so single writes can patch it
+# in place instead of forcing a rebuild from Postgres:
+#   entries:user:{id}:ids      list of entry ids, newest first, ending in a
+#                              "_:<version>" sentinel (so an empty list can be cached)
+#   entries:user:{id}:data     hash of entry id -> entry JSON
+#   entries:user:{id}:version  token replaced on every write
+#
+# Writes run as one MULTI: LPUSHX only touches a list that is already cached.
+# A rebuild records the version it read before querying Postgres; if a write
+# lands between that read and the rebuild being stored, the sentinel no longer
+# matches the version and readers treat the list as a miss.
+#
+# Saves run as SAVE_ENTRY_SCRIPT so two concurrent updates can't land out of
+# order: entries:user:{id}:stamps maps entry id -> updated_at (microseconds),
+# or "deleted". A save older than the stamp, or for a deleted entry, drops
+# the cached copies instead of writing them.
+
+ENTRY_LIST_TTL = 900  # 15 minutes
+ENTRY_TTL = 300
+ENTRY_LIST_SENTINEL = "_:"
+
+ENTRY_DELETED = "deleted"
+
+def entry_list_keys(user_id: int) -> tuple:
+    prefix = f"entries:user:{user_id}"
+    return f"{prefix}:ids", f"{prefix}:data", f"{prefix}:version"
+
+def entry_stamps_key(user_id: int) -> str:
+    return f"entries:user:{user_id}:stamps"
+
+def entry_cache_key(user_id: int, entry_id: int) -> str:
+    return f"entry:{entry_id}:user:{user_id}"
+
+def _text(value) -> str:
+    """Ids and versions come back as bytes from redis_binary_client"""
+    return value.decode() if isinstance(value, bytes) else value
+
+def get_cached_entries(user_id: int) -> tuple:
+    """
+    Read the cached entry list in one round trip
+    Returns (entries or None on a miss, version token to pass to cache_entries)
+    """
+    _flush_if_dirty()
+    ids_key, data_key, version_key = entry_list_keys(user_id)
+    try:
+        pipe = redis_binary_client.pipeline(transaction=False)
+        pipe.lrange(ids_key, 0, -1)
+        pipe.hgetall(data_key)
+        pipe.get(version_key)
+        ids, data, version = pipe.execute()
+    except Exception:
+        cache_requests_total.inc("entries", "error")
+        return None, None
+
+    ids = [_text(entry_id) for entry_id in ids]
+    data = {_text(entry_id): value for entry_id, value in data.items()}
+    version = _text(version or "")
+    if not ids or ids[-1] != ENTRY_LIST_SENTINEL + version or any(entry_id not in data for entry_id in ids[:-1]):
+        # Not cached, or a write raced the rebuild that stored it
+        cache_requests_total.inc("entries", "miss")
+        return None, version
+    cache_requests_total.inc("entries", "hit")
+    try:
+        return [decode(data[entry_id]) for entry_id in ids[:-1]], version
+    except Exception:
+        cache_requests_total.inc("entries", "error")
+        return None, version
+
+def cache_entries(user_id: int, entries: list, version: str, ttl: int = ENTRY_LIST_TTL):
+    """Store a freshly built entry list (newest first), tagged with the version read before the query"""
+    ids_key, data_key, _ = entry_list_keys(user_id)
+    try:
+        pipe = redis_client.pipeline()
+        pipe.delete(ids_key, data_key)
+        pipe.rpush(ids_key, *[str(entry["id"]) for entry in entries], ENTRY_LIST_SENTINEL + (version or ""))
+        if entries:
+            pipe.hset(data_key, mapping={str(entry["id"]): encode(entry) for entry in entries})
+        pipe.expire(ids_key, ttl)
+        pipe.expire(data_key, ttl)
+        pipe.execute()
+        return True
+    except Exception:
+        return False
+
+# KEYS: ids, data, version, stamps, entry
+# ARGV: entry id, value, updated_at stamp, new version, created (0/1),
+#       list TTL, entry TTL, sentinel prefix
+# testing/fakes.py mirrors this script; keep the two in step.
+SAVE_ENTRY_SCRIPT = """-- save_entry
+redis.call('SET', KEYS[3], ARGV[4], 'EX', tonumber(ARGV[6]) * 2)
+local stamp = redis.call('HGET', KEYS[4], ARGV[1])
+if stamp and (stamp == 'deleted' or tonumber(stamp) > tonumber(ARGV[3])) then
+  redis.call('HDEL', KEYS[2], ARGV[1])
+  redis.call('DEL', KEYS[5])
+  return 0
+end
+redis.call('HSET', KEYS[4], ARGV[1], ARGV[3])
+redis.call('EXPIRE', KEYS[4], tonumber(ARGV[6]) * 2)
+if ARGV[5] == '1' then
+  redis.call('LREM', KEYS[1], 0, ARGV[1])
+  redis.call('LPUSHX', KEYS[1], ARGV[1])
+end
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+if redis.call('EXISTS', KEYS[1]) == 1 then
+  redis.call('LSET', KEYS[1], -1, ARGV[8] .. ARGV[4])
+end
+redis.call('SET', KEYS[5], ARGV[2], 'EX', ARGV[7])
+return 1
+"""
+
+_save_entry = redis.commands.core.Script(None, SAVE_ENTRY_SCRIPT.encode())
+
+def _stamp(updated_at) -> int:
+    """updated_at as microseconds since the epoch (0 if unknown), for ordering saves"""
+    try:
+        value = updated_at if isinstance(updated_at, datetime) else datetime.fromisoformat(str(updated_at))
+    except ValueError:
+        return 0
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+
+def cache_entry_saved(user_id: int, entry: dict, created: bool = False):
+    """
+    Write-through after a create or update: patch the cached list (prepend a
+    new entry, replace an existing one) and refresh the single-entry cache.
+    A save older than one already cached invalidates the entry instead.
+    """
+    ids_key, data_key, version_key = entry_list_keys(user_id)
+    keys = [ids_key, data_key, version_key, entry_stamps_key(user_id), entry_cache_key(user_id, entry["id"])]
+    args = [
+        str(entry["id"]), encode(entry), _stamp(entry.get("updated_at")), uuid.uuid4().hex,
+        1 if created else 0, ENTRY_LIST_TTL, ENTRY_TTL, ENTRY_LIST_SENTINEL,
+    ]
+    try:
+        if not _save_entry(keys, args, client=redis_client):
+            print(f"⚠️  Out-of-order save of entry {entry['id']} for user {user_id}; invalidated its cache")
+        return True
+    except Exception:
+        return invalidate_entries(user_id, entry["id"])
+
+def cache_entry_deleted(user_id: int, entry_id: int):
+    """Write-through after a delete: drop the entry from the cached list and its own cache key"""
+    ids_key, data_key, version_key = entry_list_keys(user_id)
+    stamps_key = entry_stamps_key(user_id)
+    version = uuid.uuid4().hex
+    try:
+        pipe = redis_client.pipeline()
+        pipe.set(version_key, version, ex=ENTRY_LIST_TTL * 2)
+        # A save that lands after the delete must not bring the entry back
+        pipe.hset(stamps_key, str(entry_id), ENTRY_DELETED)
+        pipe.expire(stamps_key, ENTRY_LIST_TTL * 2)
+        pipe.lrem(ids_key, 0, str(entry_id))
+        pipe.hdel(data_key, str(entry_id))
+        pipe.lset(ids_key, -1, ENTRY_LIST_SENTINEL + version)
+        pipe.delete(entry_cache_key(user_id, entry_id))
+        pipe.execute(raise_on_error=False)
+        return True
+    except Exception:
+        return invalidate_entries(user_id, entry_id)
+
+def get_cached_entry_batch(user_id: int, entry_ids: list) -> tuple:
+    """
+    Read single-entry caches for several ids in one round trip
+    Returns ({entry_id: entry} for the hits, version token to pass to cache_entry_batch)
+    """
+    _flush_if_dirty()
+    if not entry_ids:
+        return {}, None
+    try:
+        pipe = redis_binary_client.pipeline(transaction=False)
+        pipe.mget([entry_cache_key(user_id, entry_id) for entry_id in entry_ids])
+        pipe.get(entry_list_keys(user_id)[2])
+        values, version = pipe.execute()
+    except Exception:
+        cache_requests_total.inc("entry", "error")
+        return {}, None
+    found = {}
+    for entry_id, value in zip(entry_ids, values):
+        try:
+            if value:
+                found[entry_id] = decode(value)
+        except Exception:
+            pass  # unreadable: refetched and overwritten
+    cache_requests_total.inc("entry", "hit", amount=len(found))
+    cache_requests_total.inc("entry", "miss", amount=len(entry_ids) - len(found))
+    return found, _text(version) or ""
+
+# KEYS: entries version, then one entry key per value
+# ARGV: version read before the query, TTL, values
+# Same script as mcp-server/cache.py; testing/fakes.py mirrors it.
+FILL_ENTRIES_SCRIPT = """-- fill_entries
+if (redis.call('GET', KEYS[1]) or '') ~= ARGV[1] then
+  return 0
+end
+for i = 2, #KEYS do
+  redis.call('SET', KEYS[i], ARGV[i + 1], 'EX', ARGV[2])
+end
+return 1
+"""
+
+_fill_entries = redis.commands.core.Script(None, FILL_ENTRIES_SCRIPT.encode())
+
+def cache_entry_batch(user_id: int, entries: list, version: str, ttl: int = ENTRY_TTL):
+    """
+    Fill the single-entry caches for entries read from Postgres, in one round trip,
+    unless a write replaced `version` (read before the query) in the meantime
+    """
+    if not entries or version is None:
+        return True
+    try:
+        keys = [entry_list_keys(user_id)[2]] + [entry_cache_key(user_id, entry["id"]) for entry in entries]
+        _fill_entries(keys, [version, ttl] + [encode(entry) for entry in entries], client=redis_client)
+        return True
+    except Exception:
+        return False
+
+def entry_projection_key(user_id: int, fields: list) -> str:
+    return f"entries:user:{user_id}:fields:{','.join(fields)}"
+
+def get_versioned_cache(user_id: int, key: str) -> tuple:
+    """
+    Read a value derived from the user's entries (a projection, search results)
+    These aren't patched on write; they are stored with the list version and
+    are a miss once any write has replaced it.
+    Returns (value or None on a miss, version token to pass to set_versioned_cache)
+    """
+    _flush_if_dirty()
+    namespace = cache_namespace(key)
+    try:
+        pipe = redis_binary_client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.get(entry_list_keys(user_id)[2])
+        value, version = pipe.execute()
+        cached = decode(value) if value else None
+    except Exception:
+        cache_requests_total.inc(namespace, "error")
+        return None, None
+
+    version = _text(version or "")
+    if not cached or cached.get("version") != version or "value" not in cached:
+        cache_requests_total.inc(namespace, "miss")
+        return None, version
+    cache_requests_total.inc(namespace, "hit")
+    return cached["value"], version
+
+def set_versioned_cache(user_id: int, key: str, value, version: str, ttl: int = ENTRY_LIST_TTL):
+    """Store a value built from Postgres, tagged with the version read before the query"""
+    return set_cache(key, {"version": version or "", "value": value}, ttl=ttl)
+
+def get_cached_projection(user_id: int, fields: list) -> tuple:
+    """Read a cached field projection of the entry list (e.g. the summary view)"""
+    return get_versioned_cache(user_id, entry_projection_key(user_id, fields))
+
+def cache_projection(user_id: int, fields: list, entries: list, version: str, ttl: int = ENTRY_LIST_TTL):
+    """Store a projection built from Postgres, tagged with the version read before the query"""
+    return set_versioned_cache(user_id, entry_projection_key(user_id, fields), entries, version, ttl=ttl)
+
+def _invalidate(pipe, user_id: int, entry_ids):
+    ids_key, data_key, version_key = entry_list_keys(user_id)
+    pipe.delete(ids_key, data_key, *[entry_cache_key(user_id, entry_id) for entry_id in entry_ids])
+    pipe.set(version_key, uuid.uuid4().hex, ex=ENTRY_LIST_TTL * 2)
+
+def invalidate_entries(user_id: int, entry_id: int = None):
+    """
+    Fallback when a write-through fails: drop the cached list (and entry), retire projections
+    If that fails too (Redis down, breaker open) this process remembers the
+    user and invalidates them once Redis answers again (see _dirty_users).
+    """
+    try:
+        pipe = redis_client.pipeline()
+        _invalidate(pipe, user_id, [entry_id] if entry_id is not None else [])
+        pipe.execute()
+        return True
+    except Exception:
+        _mark_dirty(user_id, entry_id)
+        return False
+
+# user_id -> entry ids whose cache couldn't be invalidated after a write.
+# Per process: each worker repairs what it failed to write, so until it does,
+# other workers can still read those entries as cached before the outage.
+# A timer retries the flush so an idle worker doesn't leave them there.
+_dirty_users = {}
+_dirty_lock = threading.Lock()
+_dirty_timer = None
+DIRTY_RETRY_SECONDS = redis_breaker.reset_timeout
+
+def _mark_dirty(user_id: int, entry_id: int = None):
+    global _dirty_timer
+    with _dirty_lock:
+        entry_ids = _dirty_users.setdefault(user_id, set())
+        if entry_id is not None:
+            entry_ids.add(entry_id)
+        if _dirty_timer is None:
+            _dirty_timer = threading.Timer(DIRTY_RETRY_SECONDS, _retry_flush)
+            _dirty_timer.daemon = True
+            _dirty_timer.start()
+
+def _retry_flush():
+    """Timer callback: flush without waiting for a request; a failed flush schedules the next try"""
+    global _dirty_timer
+    with _dirty_lock:
+        _dirty_timer = None
+    flush_dirty_users()
+
+def _cancel_retry():
+    """Stop the retry timer once nothing is left to flush"""
+    global _dirty_timer
+    with _dirty_lock:
+        if _dirty_timer is not None and not _dirty_users:
+            _dirty_timer.cancel()
+            _dirty_timer = None
+
+def flush_dirty_users() -> bool:
+    """Invalidate every user whose write-through failed; runs when redis_breaker closes and on a timer"""
+    with _dirty_lock:
+        pending = dict(_dirty_users)
+        _dirty_users.clear()
+    if not pending:
+        return True
+    try:
+        pipe = redis_client.pipeline()
+        for user_id, entry_ids in pending.items():
+            _invalidate(pipe, user_id, sorted(entry_ids))
+        pipe.execute()
+        print(f"🧹 Invalidated cached entries for {len(pending)} user(s) written during a Redis outage")
+        _cancel_retry()
+        return True
+    except Exception:
+        for user_id, entry_ids in pending.items():
+            for entry_id in entry_ids or [None]:
+                _mark_dirty(user_id, entry_id)
+        return False
+
+def _flush_if_dirty():
+    """Before serving cached entries, drop any this process failed to invalidate"""
+    if _dirty_users:
+        flush_dirty_users()
+
+redis_breaker.on_close(flush_dirty_users)
+
 def get_cache_stats():
     """Get Redis stats for monitoring"""
     try:
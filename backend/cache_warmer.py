@@ -0,0 +1,129 @@
+"""
+Cache Warmer
+Fills the per-user caches the dashboard reads first (entry list and
+profile), either on a cache miss, in the background right after login, or
+for recently active users in a deploy-time job after a restart or a Redis
+flush.
+
+Deploy job, run from backend/:
+    python cache_warmer.py --hours 72 --users 500 --rate 20
+"""
+import argparse
+import time
+
+from audit_service import audit_logger
+from cache_service import get_cache, set_cache, get_cached_entries, cache_entries
+from db import get_db_connection
+from models import KnowledgeEntryResponse
+
+PROFILE_TTL = 900  # 15 minutes
+
+
+def profile_cache_key(user_id: int) -> str:
+    return f"user:{user_id}:profile"
+
+
+def load_entry_list(user_id: int, version: str) -> list:
+    """Read a user's entries from Postgres and cache them; `version` comes from get_cached_entries"""
+    conn = get_db_connection(readonly=True, user_id=user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT id, user_id, title, content, tags, created_at, updated_at
+               FROM knowledge_entries
+               WHERE user_id = %s
+               ORDER BY created_at DESC""",
+            (user_id,)
+        )
+        entries = [KnowledgeEntryResponse.from_row(row).model_dump() for row in cursor.fetchall()]
+        cursor.close()
+    finally:
+        conn.close()
+
+    cache_entries(user_id, entries, version)
+    return entries
+
+
+def cache_profile(user: dict):
+    """Cache the /api/auth/me response for a user row (id, email, created_at)"""
+    profile = {"id": user['id'], "email": user['email'], "created_at": str(user['created_at'])}
+    set_cache(profile_cache_key(user['id']), profile, ttl=PROFILE_TTL)
+    return profile
+
+
+def load_user_profile(user_id: int):
+    """Read a user's profile from Postgres and cache it; None if the user doesn't exist"""
+    conn = get_db_connection(readonly=True, user_id=user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, email, created_at FROM users WHERE id = %s", (user_id,))
+        user = cursor.fetchone()
+        cursor.close()
+    finally:
+        conn.close()
+    return cache_profile(user) if user else None
+
+
+def warm_user(user_id: int, user: dict = None) -> bool:
+    """
+    Make sure a user's entry list and profile are cached
+    Pass the user row when the caller already has it (login) to skip that query.
+    Returns True if anything had to be loaded.
+    """
+    loaded = False
+    try:
+        if user is not None:
+            cache_profile(user)
+        elif get_cache(profile_cache_key(user_id)) is None:
+            load_user_profile(user_id)
+            loaded = True
+
+        cached, version = get_cached_entries(user_id)
+        if cached is None:
+            load_entry_list(user_id, version)
+            loaded = True
+    except Exception as e:
+        # Warming is best effort; the request path will load it on a miss
+        print(f"⚠️  Cache warm failed for user {user_id}: {e}")
+    return loaded
+
+
+def warm_recent_users(hours: int = 72, limit: int = 500, rate: float = 20) -> dict:
+    """
+    Warm users with a login in the last `hours`, most recent first, at no more
+    than `rate` users per second so a deploy doesn't stampede Postgres
+    """
+    user_ids = audit_logger.get_recently_active_users(hours=hours, limit=limit)
+    interval = 1 / rate if rate > 0 else 0
+    loaded = 0
+    start = time.monotonic()
+    for i, user_id in enumerate(user_ids):
+        # Pace against the schedule rather than sleeping a fixed amount per user
+        delay = start + i * interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if warm_user(user_id):
+            loaded += 1
+    return {
+        "users": len(user_ids),
+        "loaded": loaded,
+        "already_cached": len(user_ids) - loaded,
+        "seconds": round(time.monotonic() - start, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preload caches for recently active users")
+    parser.add_argument("--hours", type=int, default=72, help="Users who logged in within this many hours")
+    parser.add_argument("--users", type=int, default=500, help="Maximum users to warm")
+    parser.add_argument("--rate", type=float, default=20, help="Users per second (0 = unlimited)")
+    args = parser.parse_args()
+
+    print(f"🔥 Warming caches for up to {args.users} users active in the last {args.hours}h at {args.rate}/s...")
+    result = warm_recent_users(hours=args.hours, limit=args.users, rate=args.rate)
+    print(f"✅ {result['users']} users: {result['loaded']} loaded, "
+          f"{result['already_cached']} already cached ({result['seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
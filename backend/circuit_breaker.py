@@ -0,0 +1,118 @@
+"""
+Circuit Breaker
+Stops calling a dependency that keeps failing so requests fail fast instead
+of each waiting out a socket timeout.
+
+closed     calls go through; `failure_threshold` consecutive failures open it
+open       calls fail immediately with CircuitOpenError for `reset_timeout` seconds
+half-open  up to `half_open_max_calls` probe calls go through; a success closes
+           the circuit again, a failure re-opens it for another `reset_timeout`
+
+Callbacks registered with on_close() run when the circuit closes again, e.g.
+to repair state that couldn't be written while the dependency was down.
+"""
+import threading
+import time
+
+from metrics import circuit_breaker_state, circuit_breaker_rejections_total
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the dependency while the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Shared failure tracker for one dependency
+
+    Args:
+        name: Label for metrics and log lines
+        failure_threshold: Consecutive failures that open the circuit
+        reset_timeout: Seconds to stay open before letting a probe through
+        half_open_max_calls: Concurrent probe calls allowed while half-open
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 10,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self._close_callbacks = []
+        circuit_breaker_state.set(_STATE_VALUES[CLOSED], name)
+
+    def on_close(self, callback):
+        """Call `callback()` after every open/half-open -> closed transition"""
+        self._close_callbacks.append(callback)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """Raise CircuitOpenError unless the call may go ahead"""
+        # Closed is the common case; checked without the lock
+        if self._state == CLOSED:
+            return
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    circuit_breaker_rejections_total.inc(self.name)
+                    raise CircuitOpenError(f"{self.name} circuit is open")
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    circuit_breaker_rejections_total.inc(self.name)
+                    raise CircuitOpenError(f"{self.name} circuit is half-open, probe in flight")
+                self._probes += 1
+
+    def record_success(self):
+        if self._state == CLOSED and self._failures == 0:
+            return
+        with self._lock:
+            self._failures = 0
+            recovered = self._state != CLOSED
+            if recovered:
+                self._transition(CLOSED)
+        if recovered:
+            # Outside the lock: callbacks usually call the dependency again
+            for callback in self._close_callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"⚠️  {self.name} circuit close callback failed: {e}")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self._state != OPEN:
+                    self._transition(OPEN)
+                    print(f"⚡ {self.name} circuit opened after {self._failures} failure(s); "
+                          f"failing fast for {self.reset_timeout}s")
+
+    def reset(self):
+        with self._lock:
+            self._failures = 0
+            self._transition(CLOSED)
+
+    def _transition(self, state: str):
+        """Change state; caller holds the lock"""
+        self._state = state
+        self._probes = 0
+        circuit_breaker_state.set(_STATE_VALUES[state], self.name)
@@ -0,0 +1,8 @@
+"""
+Configuration
+Loads .env into the environment exactly once. Modules that read settings
+at import time import this first instead of calling load_dotenv() themselves.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
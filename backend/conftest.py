@@ -0,0 +1,73 @@
+"""
+Shared fixtures: the API on testing/fakes.py, and a scratch Postgres
+schema and Redis database for tests that check SQL and Lua the fakes only
+mirror
+"""
+import os
+import uuid
+import psycopg2
+import pytest
+import cache_service
+from fastapi.testclient import TestClient
+from psycopg2.extras import RealDictCursor
+from testing import fakes
+from testing.fakes import FakeRedis
+from testing.helpers import BASE_SCHEMA, auth_headers, scratch_redis
+from main import app  # noqa: F401  (imported before fakes.install() patches its modules)
+
+
+@pytest.fixture
+def api():
+    """
+    The app on in-memory Redis and Postgres, signed in as user 1
+    Yields (client, headers, backend); fails if the fake database met SQL it doesn't support.
+    """
+    backend = fakes.install(memory=True)
+    try:
+        yield TestClient(app), auth_headers(1), backend
+        assert backend.db.unsupported == set()
+    finally:
+        backend.uninstall()
+
+
+@pytest.fixture(params=["fake", "real"])
+def redis(request, monkeypatch):
+    """
+    cache_service on in-memory Redis, then on TEST_REDIS_URL
+    The second run executes the Lua scripts the fake only copies in Python;
+    it is skipped when TEST_REDIS_URL isn't set. Yields a binary client.
+    """
+    if request.param == "fake":
+        text = client = FakeRedis()
+    else:
+        text, client = scratch_redis()
+    monkeypatch.setattr(cache_service, "redis_client", text)
+    monkeypatch.setattr(cache_service, "redis_binary_client", client)
+    yield client
+    if request.param == "real":
+        client.flushdb()
+        text.close()
+        client.close()
+
+
+@pytest.fixture
+def postgres():
+    """
+    A cursor on TEST_DATABASE_URL in a new schema holding BASE_SCHEMA
+    Everything runs in one transaction that is rolled back, so the database
+    is left as it was. Skipped when TEST_DATABASE_URL isn't set.
+    """
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL not set")
+    conn = psycopg2.connect(url, cursor_factory=RealDictCursor)
+    try:
+        cursor = conn.cursor()
+        schema = f"test_{uuid.uuid4().hex[:12]}"
+        cursor.execute(f"CREATE SCHEMA {schema}")
+        cursor.execute(f"SET LOCAL search_path TO {schema}")
+        cursor.execute(BASE_SCHEMA)
+        yield cursor
+    finally:
+        conn.rollback()
+        conn.close()
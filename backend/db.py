@@ -0,0 +1,288 @@
+"""
+Database Connections
+Single place that opens PostgreSQL connections for the API, AI tools and
+audit logger. Connections and cursors are instrumented so every statement
+is timed, grouped by query shape in the query log, and open connections
+are tracked in metrics.
+
+Read-only connections can be served by read replicas (DATABASE_REPLICA_URLS).
+After a user's own write commits they are pinned to the primary for
+REPLICA_PIN_SECONDS, and replicas lagging further behind than that are
+skipped, so users always read their own writes.
+"""
+import math
+import os
+import threading
+import time
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor
+import config  # noqa: F401  (loads .env)
+from cache_service import redis_client
+from metrics import (
+    db_query_duration_seconds, db_connections_opened_total, db_connections_in_use, db_reads_routed_total
+)
+from query_log import query_log
+
+# Comma-separated replica DSNs; without any, every connection goes to the primary
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# How long a user's reads stay on the primary after they write; also the max replica lag tolerated
+REPLICA_PIN_SECONDS = float(os.getenv("REPLICA_PIN_SECONDS", 5))
+# How often each replica's lag is re-checked, and how long a failed replica is skipped
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", 5))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", 2))
+
+_WRITES = frozenset({"INSERT", "UPDATE", "DELETE"})
+
+# Seconds the replica is behind; 0 when it has replayed everything it received
+# (replay_timestamp alone keeps growing while the primary is idle)
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag
+"""
+
+
+def _operation(query) -> str:
+    """Statement type used as the metric label (SELECT, INSERT, ...)"""
+    if isinstance(query, bytes):
+        query = query.decode(errors="ignore")
+    head = str(query).lstrip().split(None, 1)
+    return head[0].upper() if head else "UNKNOWN"
+
+
+class TimedCursor(RealDictCursor):
+    """RealDictCursor that records how long each statement takes"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        succeeded = False
+        try:
+            result = super().execute(query, vars)
+            succeeded = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            operation = _operation(query)
+            db_query_duration_seconds.observe(elapsed, operation)
+            if operation in _WRITES:
+                self.connection._wrote = True
+            # Failed statements are counted but never EXPLAINed (the transaction is aborted)
+            query_log.record(self, query, vars, elapsed, can_explain=succeeded)
+
+
+class TrackedConnection(psycopg2.extensions.connection):
+    """
+    Connection that keeps the open-connections gauge accurate
+    and pins `pin_user_id` to the primary when it commits a write
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tracked = True
+        self._wrote = False
+        self.pin_user_id = None
+        db_connections_opened_total.inc()
+        db_connections_in_use.inc()
+
+    def commit(self):
+        result = super().commit()
+        if self._wrote:
+            self._wrote = False
+            if self.pin_user_id is not None:
+                replica_router.pin(self.pin_user_id)
+        return result
+
+    def rollback(self):
+        self._wrote = False
+        return super().rollback()
+
+    def _untrack(self):
+        if getattr(self, "_tracked", False):
+            self._tracked = False
+            db_connections_in_use.dec()
+
+    def close(self):
+        self._untrack()
+        return super().close()
+
+    def __del__(self):
+        # Some error paths drop connections without closing them
+        self._untrack()
+
+
+class Replica:
+    """One replica DSN and what we last learned about it"""
+
+    __slots__ = ("url", "down_until", "checked_at", "lag")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.down_until = 0.0
+        self.checked_at = 0.0
+        self.lag = None
+
+
+class ReplicaRouter:
+    """
+    Round-robin over healthy replicas, with read-your-writes pinning
+
+    A replica is skipped for REPLICA_RETRY_SECONDS after a failed connect, and
+    for REPLICA_HEALTH_INTERVAL when its lag exceeds the pin window. Pins live
+    in Redis so they hold across workers; if Redis can't answer, the user is
+    treated as pinned (the primary is always up to date).
+    """
+
+    PIN_KEY = "db_pin:user:{user_id}"
+
+    def __init__(self, urls: list, pin_seconds: float = 5, health_interval: float = 5,
+                 retry_seconds: float = 30, connect_timeout: int = 2):
+        self.replicas = [Replica(url) for url in urls]
+        self.pin_seconds = pin_seconds
+        self.health_interval = health_interval
+        self.retry_seconds = retry_seconds
+        self.connect_timeout = connect_timeout
+        self._next = 0
+        self._lock = threading.Lock()
+        self._local_pins = {}  # user_id -> monotonic expiry, saves the Redis read in this worker
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def pin(self, user_id: int):
+        """Send this user's reads to the primary for the next pin_seconds"""
+        if not self.enabled:
+            return
+        self._local_pins[user_id] = time.monotonic() + self.pin_seconds
+        try:
+            redis_client.setex(self.PIN_KEY.format(user_id=user_id), max(1, math.ceil(self.pin_seconds)), 1)
+        except Exception:
+            pass  # while Redis is down every worker treats every user as pinned anyway
+
+    def is_pinned(self, user_id: int) -> bool:
+        expires = self._local_pins.get(user_id)
+        if expires is not None:
+            if expires > time.monotonic():
+                return True
+            self._local_pins.pop(user_id, None)
+        try:
+            return redis_client.get(self.PIN_KEY.format(user_id=user_id)) is not None
+        except Exception:
+            return True
+
+    def connect(self):
+        """Open a read-only connection to the next healthy replica, or None if there isn't one"""
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = self.replicas[self._next % len(self.replicas)]
+                self._next += 1
+            now = time.monotonic()
+            if replica.down_until > now:
+                continue
+            try:
+                conn = psycopg2.connect(
+                    replica.url,
+                    connection_factory=TrackedConnection,
+                    cursor_factory=TimedCursor,
+                    connect_timeout=self.connect_timeout
+                )
+            except psycopg2.OperationalError as e:
+                replica.down_until = now + self.retry_seconds
+                print(f"⚠️  Replica unavailable, skipping for {self.retry_seconds}s: {e}")
+                continue
+            if now - replica.checked_at >= self.health_interval and not self._check_lag(replica, conn, now):
+                conn.close()
+                continue
+            conn.set_session(readonly=True)
+            return conn
+        return None
+
+    def _check_lag(self, replica: Replica, conn, now: float) -> bool:
+        """Measure replication lag; False (and skip the replica a while) when it's too far behind"""
+        try:
+            cursor = conn.cursor()
+            cursor.execute(REPLICA_LAG_QUERY)
+            replica.lag = float(cursor.fetchone()["lag"])
+            cursor.close()
+            conn.rollback()
+        except psycopg2.Error as e:
+            replica.down_until = now + self.retry_seconds
+            print(f"⚠️  Replica health check failed: {e}")
+            return False
+        replica.checked_at = now
+        if replica.lag > self.pin_seconds:
+            replica.down_until = now + self.health_interval
+            return False
+        return True
+
+    def status(self) -> list:
+        """Replica health for the admin endpoint (DSNs are not included)"""
+        now = time.monotonic()
+        return [
+            {
+                "replica": i,
+                "healthy": replica.down_until <= now,
+                "lag_seconds": replica.lag,
+                "checked_seconds_ago": round(now - replica.checked_at, 1) if replica.checked_at else None
+            }
+            for i, replica in enumerate(self.replicas)
+        ]
+
+
+replica_router = ReplicaRouter(
+    REPLICA_URLS,
+    pin_seconds=REPLICA_PIN_SECONDS,
+    health_interval=REPLICA_HEALTH_INTERVAL,
+    retry_seconds=REPLICA_RETRY_SECONDS,
+    connect_timeout=REPLICA_CONNECT_TIMEOUT
+)
+
+
+def _connect_primary():
+    # Use DATABASE_URL from environment (Railway sets this automatically)
+    database_url = os.getenv("DATABASE_URL")
+
+    if database_url:
+        # Railway/Production - use DATABASE_URL
+        return psycopg2.connect(
+            database_url,
+            connection_factory=TrackedConnection,
+            cursor_factory=TimedCursor
+        )
+    # Local development - use individual params
+    return psycopg2.connect(
+        host="localhost",
+        database="knowledge_base",
+        user="",  # Your Mac username for local
+        password="",
+        connection_factory=TrackedConnection,
+        cursor_factory=TimedCursor
+    )
+
+
+def get_db_connection(readonly: bool = False, user_id: int = None):
+    """
+    Create a database connection
+
+    Args:
+        readonly: The caller only reads, so a replica may serve it
+        user_id: Whose data this is. Read-only connections stay on the primary
+            while the user is pinned; primary connections pin the user when
+            they commit a write.
+    """
+    if readonly and replica_router.enabled:
+        if user_id is not None and replica_router.is_pinned(user_id):
+            db_reads_routed_total.inc("primary_pinned")
+        else:
+            conn = replica_router.connect()
+            if conn is not None:
+                db_reads_routed_total.inc("replica")
+                return conn
+            db_reads_routed_total.inc("primary_fallback")
+
+    conn = _connect_primary()
+    conn.pin_user_id = user_id
+    return conn
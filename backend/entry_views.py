@@ -0,0 +1,125 @@
+"""
+Entry Views
+The projections GET /api/entries serves (`fields` / `view`), the snippet
+shown in summaries and search results, and how a projection is built on a
+cache miss: from the cached full list when it's there, else from Postgres.
+"""
+from cache_service import get_cached_entries, get_cached_projection, cache_projection
+from db import get_db_connection
+
+SNIPPET_CHARS = 200
+
+# Fields GET /api/entries can project, in response order. content_length reads
+# the size from the TOAST header and the snippet only the leading slice, so a
+# projection without `content` never detoasts whole notes.
+ENTRY_FIELDS = {
+    "id": "id",
+    "user_id": "user_id",
+    "title": "title",
+    "content": "content",
+    "tags": "tags",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "content_length": "octet_length(content) AS content_length",  # bytes
+    # One extra character tells make_snippet whether the note was cut
+    "snippet": f"left(content, {SNIPPET_CHARS + 1}) AS snippet",
+}
+FULL_FIELDS = ("id", "user_id", "title", "content", "tags", "created_at", "updated_at")
+SUMMARY_FIELDS = ("id", "title", "tags", "created_at", "updated_at", "content_length", "snippet")
+VIEWS = {"full": FULL_FIELDS, "summary": SUMMARY_FIELDS}
+
+
+def resolve_entry_fields(fields: list = None, view: str = "full") -> list:
+    """
+    Validate a projection; `fields` wins over `view`. id is always included
+    Returns the fields in ENTRY_FIELDS order, so equal projections share a cache key.
+
+    Raises:
+        ValueError: If the view or a field is unknown
+    """
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view: {view} (use {' or '.join(VIEWS)})")
+    requested = fields or VIEWS[view]
+    unknown = [field for field in requested if field not in ENTRY_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown entry fields: {', '.join(unknown)}")
+    return [field for field in ENTRY_FIELDS if field == "id" or field in requested]
+
+
+def make_snippet(text: str) -> str:
+    """Whitespace-collapsed preview of at most SNIPPET_CHARS, cut at a word boundary"""
+    if not text:
+        return ""
+    truncated = len(text) > SNIPPET_CHARS
+    snippet = " ".join(text[:SNIPPET_CHARS].split())
+    if truncated:
+        cut = snippet.rfind(" ")
+        snippet = (snippet[:cut] if cut > len(snippet) // 2 else snippet).rstrip() + "…"
+    return snippet
+
+
+def load_entry_projection(user_id: int, fields: list, version: str) -> list:
+    """
+    Read only the projected columns of a user's entries and cache them
+    `fields` comes from resolve_entry_fields, `version` from get_cached_projection.
+    """
+    conn = get_db_connection(readonly=True, user_id=user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""SELECT {', '.join(ENTRY_FIELDS[field] for field in fields)}
+               FROM knowledge_entries
+               WHERE user_id = %s
+               ORDER BY created_at DESC""",
+            (user_id,)
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+
+    entries = []
+    for row in rows:
+        entry = {field: row[field] for field in fields}
+        for field in ("created_at", "updated_at"):
+            if field in entry:
+                entry[field] = str(entry[field])
+        if "tags" in entry:
+            entry["tags"] = entry["tags"] or []
+        if "snippet" in entry:
+            entry["snippet"] = make_snippet(entry["snippet"])
+        entries.append(entry)
+
+    cache_projection(user_id, fields, entries, version)
+    return entries
+
+
+def project_entries(entries: list, fields: list) -> list:
+    """Build a projection from full entries (as cached), matching what ENTRY_FIELDS selects"""
+    projected = []
+    for entry in entries:
+        content = entry.get("content") or ""
+        derived = {
+            "content_length": len(content.encode()),
+            "snippet": make_snippet(content[:SNIPPET_CHARS + 1]),
+        }
+        projected.append({field: derived[field] if field in derived else entry[field] for field in fields})
+    return projected
+
+
+def get_entry_projection(user_id: int, fields: list) -> list:
+    """
+    A projection of a user's entries
+    Projections are a miss after every write, but the full list is patched in
+    place, so a miss is rebuilt from that list when it is cached at the same
+    version. Postgres is read only when it isn't.
+    """
+    cached, version = get_cached_projection(user_id, fields)
+    if cached is not None:
+        return cached
+    entries, list_version = get_cached_entries(user_id)
+    if entries is not None and list_version == version:
+        projected = project_entries(entries, fields)
+        cache_projection(user_id, fields, projected, version)
+        return projected
+    return load_entry_projection(user_id, fields, version)
@@ -1,122 +1,75 @@
-from fastapi import FastAPI, HTTPException, status, Depends, Request
-from fastapi.responses import JSONResponse
-from rate_limiter import check_rate_limit, rate_limiter, check_daily_ai_limit, check_auth_rate_limit
+import config  # noqa: F401  (loads .env before anything reads settings)
+from fastapi import FastAPI, HTTPException, status, Depends, Request, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse, Response
+from rate_limiter import (
+    check_rate_limit, rate_limiter, check_daily_ai_limit, check_auth_rate_limit,
+    chat_rate_limiter, ai_daily_limiter, ip_rate_limiter, autocomplete_rate_limiter, get_limit_status
+)
 import time
+import threading
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 import psycopg2
-from psycopg2.extras import RealDictCursor
 import os
-from dotenv import load_dotenv
 from typing import List
+from datetime import datetime
 from cache_service import (
     get_cache, set_cache, delete_cache, 
     delete_cache_pattern, clear_user_cache, get_cache_stats,
-    redis_client
+    redis_breaker, get_cached_entries, cache_entries, cache_entry_saved, cache_entry_deleted,
+    get_cached_entry_batch, cache_entry_batch
 )
 
 # Import new modules
 from models import (
     UserRegister, UserLogin, TokenResponse, UserResponse,
-    KnowledgeEntryCreate, KnowledgeEntryUpdate, KnowledgeEntryResponse,
+    KnowledgeEntryCreate, KnowledgeEntryUpdate, KnowledgeEntryResponse, KnowledgeEntryProjection,
+    TagCount,
     ChatMessage
 
 )
-from auth import hash_password, verify_password, create_access_token, get_current_user
-from ai_service import chat_with_knowledge_base
+from auth import hash_password, verify_and_update_password, create_access_token, get_current_user, get_pwd_context
+from password_executor import password_executor
+from ai_service import chat_with_knowledge_base, get_client as get_ai_client
 from audit_service import audit_logger
+from db import get_db_connection, replica_router
+from tag_service import get_tag_counts
+from autocomplete_service import suggest, SUGGESTION_TYPES
+from search_service import normalize_search, search_entries
+from cache_warmer import warm_user, load_entry_list, load_user_profile, profile_cache_key
+from entry_views import get_entry_projection, resolve_entry_fields, FULL_FIELDS
+from query_log import query_log, SORT_KEYS as QUERY_SORT_KEYS
+from metrics import MetricsMiddleware, Counter, Gauge, REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from audit_export import export_stream, FORMATS as EXPORT_FORMATS
+from middleware import SecurityHeadersMiddleware, GlobalRateLimitMiddleware
+from profiling import (
+    ProfilingMiddleware, ProfiledRoute, list_profiles, load_profile,
+    FORMATS as PROFILE_FORMATS
+)
 
-# Load environment vars
-load_dotenv()
-
-# Initialize app
-app = FastAPI(title="AI Knowledge Base API")
+def warm_up():
+    """Build the lazily created clients so the first chat/login doesn't pay for the imports"""
+    get_ai_client()
+    get_pwd_context()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hooks"""
+    # Keep audit log partitions ahead of time without delaying startup
+    threading.Thread(target=audit_logger.maintain_partitions, daemon=True).start()
+    # Heavy SDKs load after the server is accepting requests, not before
+    threading.Thread(target=warm_up, daemon=True).start()
+    yield
 
-# Security headers middleware
-@app.middleware("http")
-async def security_headers_middleware(request: Request, call_next):
-    """Add security headers to all responses"""
-    response = await call_next(request)
-    
-    # Prevent MIME type sniffing
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    
-    # Prevent clickjacking
-    response.headers["X-Frame-Options"] = "DENY"
-    
-    # Enable XSS protection
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    
-    # Strict Transport Security (HTTPS only)
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    
-    # Content Security Policy
-    response.headers["Content-Security-Policy"] = (
-        "default-src 'self'; "
-        "script-src 'self'; "
-        "style-src 'self' 'unsafe-inline'; "
-        "img-src 'self' data: https:; "
-        "font-src 'self'; "
-        "connect-src 'self'; "
-        "frame-ancestors 'none'"
-    )
-    
-    # Referrer Policy
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    
-    # Permissions Policy (formerly Feature Policy)
-    response.headers["Permissions-Policy"] = (
-        "geolocation=(), "
-        "microphone=(), "
-        "camera=(), "
-        "payment=(), "
-        "usb=(), "
-        "magnetometer=(), "
-        "gyroscope=(), "
-        "accelerometer=()"
-    )
-    
-    return response
+# Initialize app
+app = FastAPI(title="AI Knowledge Base API", lifespan=lifespan)
 
-# Add middleware to track rate limits on all requests
-@app.middleware("http")
-async def global_rate_limit_middleware(request: Request, call_next):
-    """Rate limit by IP address globally"""
+# Lets the profiler sample the worker thread running each sync endpoint
+app.router.route_class = ProfiledRoute
 
-    # ALWAYS allow OPTIONS requests (CORS preflight)
-    if request.method == "OPTIONS":
-        return await call_next(request)
-    
-    client_ip = request.client.host
-    
-    # Skip for health check
-    if request.url.path in ["/", "/api/health", "/docs", "/openapi.json"]:
-        return await call_next(request)
-    
-    # Rate limit: 300 requests per hour per IP
-    key = f"global_rate_limit:ip:{client_ip}"
-    count = redis_client.get(key)
-    count = int(count) if count else 0
-    
-    if count >= 300:
-        # Log rate limit violation
-        audit_logger.log_rate_limit(
-            event_type=audit_logger.RATE_LIMIT_EXCEEDED,
-            ip_address=client_ip,
-            details={"endpoint": str(request.url.path)}
-        )
-        return JSONResponse(
-            status_code=429,
-            content={"detail": "Too many requests. Please try again later."},
-            headers={"Retry-After": "3600"}
-        )
-    
-    if count == 0:
-        redis_client.setex(key, 3600, 1)
-    else:
-        redis_client.incr(key)
-    
-    return await call_next(request)
+# Pure ASGI middleware: rate limit first, security headers on every response (429s included)
+app.add_middleware(GlobalRateLimitMiddleware)
+app.add_middleware(SecurityHeadersMiddleware)
 
 # Create dependency for rate limiting
 def rate_limit_dependency(current_user: dict = Depends(get_current_user)):
@@ -142,30 +95,29 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-# Database connection helper
-def get_db_connection():
-    """Create a database connection"""
+# Opt-in per-request profiling (X-Profile header or PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware)
 
-    # Use DATABASE_URL from environment (Railway sets this automatically)
-    database_url = os.getenv("DATABASE_URL")
+# Outermost layer so every response (including 429s) is counted
+app.add_middleware(MetricsMiddleware)
 
-    if database_url:
-        # Railway/Production - use DATABASE_URL
-        conn = psycopg2.connect(
-            database_url,
-            cursor_factory=RealDictCursor
-        )
-    else:
-        # Local development - use individual params
-        conn = psycopg2.connect(
-            host="localhost",
-            database="knowledge_base",
-            user="",  # Your Mac username for local
-            password="",
-            cursor_factory=RealDictCursor
-        )
-    
-    return conn
+# bcrypt pool gauges, read at scrape time
+Gauge(
+    "password_hash_queue_depth", "Password hashes waiting for a bcrypt worker",
+    callback=lambda: password_executor.get_stats()["queue_depth"]
+)
+Gauge(
+    "password_hash_in_flight", "Password hashes running or queued",
+    callback=lambda: password_executor.get_stats()["in_flight"]
+)
+Gauge(
+    "password_hash_avg_seconds", "Average bcrypt hash/verify time",
+    callback=lambda: password_executor.get_stats()["avg_hash_ms"] / 1000
+)
+Counter(
+    "password_hash_rejected_total", "Password hashes rejected because the pool was full",
+    callback=lambda: password_executor.get_stats()["rejected"]
+)
 
 # Health check endpoint
 @app.get("/")
@@ -188,14 +140,28 @@ def health_check():
         conn.close()
         return {
             "status": "healthy",
-            "database": "connected"
+            "database": "connected",
+            "redis_circuit": redis_breaker.state,
+            "replicas": replica_router.status()
         }
     except Exception as e:
         return {
             "status": "unhealthy",
-            "database": f"error: {str(e)}"
+            "database": f"error: {str(e)}",
+            "redis_circuit": redis_breaker.state
         }
 
+@app.get("/metrics")
+def metrics_endpoint(request: Request):
+    """
+    Prometheus scrape endpoint
+    Set METRICS_TOKEN to require 'Authorization: Bearer <token>'
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
 # Auth Endpoints
 
 @app.post("/api/auth/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -285,7 +251,7 @@ def register(user: UserRegister, request: Request):
         )
 
 @app.post("/api/auth/login", response_model=TokenResponse)
-def login(user: UserLogin, request: Request):
+def login(user: UserLogin, request: Request, background_tasks: BackgroundTasks):
     """Login and get access token"""
     # Rate limit by IP + email to prevent brute force
     client_ip = request.client.host
@@ -307,7 +273,23 @@ def login(user: UserLogin, request: Request):
         conn.close()
         
         # Verify user exists and password is correct
-        if not db_user or not verify_password(user.password, db_user['password_hash']):
+        valid, new_hash = (False, None)
+        if db_user:
+            valid, new_hash = verify_and_update_password(user.password, db_user['password_hash'])
+        
+        # Rehash with the current bcrypt cost if it has changed
+        if valid and new_hash:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE users SET password_hash = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                (new_hash, db_user['id'])
+            )
+            conn.commit()
+            cursor.close()
+            conn.close()
+        
+        if not valid:
             # Log failed login
             audit_logger.log_auth_failure(
                 user_email=user.email,
@@ -333,6 +315,9 @@ def login(user: UserLogin, request: Request):
             user_agent=request.headers.get("user-agent")
         )
         
+        # The dashboard loads entries and profile next; fill the cache after the response is sent
+        background_tasks.add_task(warm_user, db_user['id'], db_user)
+        
         return TokenResponse(
             access_token=access_token,
             token_type="bearer",
@@ -357,19 +342,13 @@ def get_me(current_user: dict = Depends(get_current_user)):
     Get current authenticated user
     This endpoint is PROTECTED - requires valid JWT token
     """
+    cached = get_cache(profile_cache_key(current_user['user_id']))
+    if cached:
+        return UserResponse(**cached)
+    
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get user from database using user_id from token
-        cursor.execute(
-            "SELECT id, email, created_at FROM users WHERE id = %s",
-            (current_user['user_id'],)
-        )
-        user = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        # Get user from database using user_id from token (and cache it)
+        user = load_user_profile(current_user['user_id'])
         
         if not user:
             raise HTTPException(
@@ -377,11 +356,7 @@ def get_me(current_user: dict = Depends(get_current_user)):
                 detail="User not found"
             )
         
-        return UserResponse(
-            id=user['id'],
-            email=user['email'],
-            created_at=str(user['created_at'])
-        )
+        return UserResponse(**user)
     
     except HTTPException:
         raise
@@ -393,65 +368,37 @@ def get_me(current_user: dict = Depends(get_current_user)):
 
 # Protected endpoint, entries
 # Update get_entries endpoint with caching
-@app.get("/api/entries", response_model=List[KnowledgeEntryResponse])
-def get_entries(current_user: dict = Depends(rate_limit_dependency)):
-    """Get all knowledge entries (cached + rate limited)"""
+@app.get("/api/entries", response_model=List[KnowledgeEntryProjection], response_model_exclude_unset=True)
+def get_entries(
+    current_user: dict = Depends(rate_limit_dependency),
+    fields: str = None,
+    view: str = "full"
+):
+    """
+    Get all knowledge entries (cached + rate limited)
     
-    # Check cache first
-    cache_key = f"entries:user:{current_user['user_id']}:all"
-    cached = get_cache(cache_key)
-    if cached:
-        return cached
+    Query params:
+        - view: 'full' (default) or 'summary' (title, tags, timestamps, content_length, snippet)
+        - fields: Comma-separated fields instead of a view; content is only read when listed
     
-    # Cache miss - fetch from database
+    Load full content per entry with GET /api/entries/{id}.
+    """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            """SELECT id, user_id, title, content, tags, created_at, updated_at 
-               FROM knowledge_entries 
-               WHERE user_id = %s 
-               ORDER BY created_at DESC""",
-            (current_user['user_id'],)
-        )
-        entries = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        result = []
-        for entry in entries:
-            tags = entry['tags'] if entry['tags'] else []
-            
-            result.append(KnowledgeEntryResponse(
-                id=entry['id'],
-                user_id=entry['user_id'],
-                title=entry['title'],
-                content=entry['content'],
-                tags=tags,
-                created_at=str(entry['created_at']),
-                updated_at=str(entry['updated_at'])
-            ))
-        
-        # Convert to dict for caching
-        result_dict = [
-            {
-                "id": e.id,
-                "user_id": e.user_id,
-                "title": e.title,
-                "content": e.content,
-                "tags": e.tags,
-                "created_at": e.created_at,
-                "updated_at": e.updated_at
-            }
-            for e in result
-        ]
-        
-        # Cache for 15 minutes
-        set_cache(cache_key, result_dict, ttl=900)
-        
-        return result
+        selected = resolve_entry_fields(parse_fields(fields), view)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    user_id = current_user['user_id']
+    
+    try:
+        if selected == list(FULL_FIELDS):
+            # Check cache first; on a miss it is cached for 15 minutes and writes patch it in place
+            cached, version = get_cached_entries(user_id)
+            if cached is not None:
+                return cached
+            return load_entry_list(user_id, version)
         
+        # Each projection is cached separately until the next write, then rebuilt from the cached list
+        return get_entry_projection(user_id, selected)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -460,15 +407,14 @@ def get_entries(current_user: dict = Depends(rate_limit_dependency)):
 
 # Knowledge entries endpoints
 
-# Update create_entry to invalidate cache
 @app.post("/api/entries", response_model=KnowledgeEntryResponse, status_code=status.HTTP_201_CREATED)
 def create_entry(
     entry: KnowledgeEntryCreate,
     current_user: dict = Depends(rate_limit_dependency)
 ):
-    """Create a new knowledge entry (invalidates cache)"""
+    """Create a new knowledge entry (write-through to cache)"""
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(user_id=current_user['user_id'])
         cursor = conn.cursor()
         
         cursor.execute(
@@ -483,18 +429,11 @@ def create_entry(
         cursor.close()
         conn.close()
         
-        # Invalidate cache for this user
-        clear_user_cache(current_user['user_id'])
+        # Prepend to the cached list instead of invalidating it
+        result = KnowledgeEntryResponse.from_row(new_entry)
+        cache_entry_saved(current_user['user_id'], result.model_dump(), created=True)
         
-        return KnowledgeEntryResponse(
-            id=new_entry['id'],
-            user_id=new_entry['user_id'],
-            title=new_entry['title'],
-            content=new_entry['content'],
-            tags=new_entry['tags'] or [],
-            created_at=str(new_entry['created_at']),
-            updated_at=str(new_entry['updated_at'])
-        )
+        return result
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -506,13 +445,12 @@ def create_entry(
 def get_entry(entry_id: int, current_user: dict = Depends(rate_limit_dependency)):
     """Get a specific knowledge entry"""
     
-    cache_key = f"entry:{entry_id}:user:{current_user['user_id']}"
-    cached = get_cache(cache_key)
-    if cached:
-        return cached
+    cached, version = get_cached_entry_batch(current_user['user_id'], [entry_id])
+    if entry_id in cached:
+        return cached[entry_id]
 
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True, user_id=current_user['user_id'])
         cursor = conn.cursor()
         cursor.execute(
             """SELECT id, user_id, title, content, tags, created_at, updated_at
@@ -527,17 +465,10 @@ def get_entry(entry_id: int, current_user: dict = Depends(rate_limit_dependency)
         if not entry:
             raise HTTPException(status_code=404, detail="Entry not found")
         
-        result = KnowledgeEntryResponse(
-            id=entry['id'],
-            user_id=entry['user_id'],
-            title=entry['title'],
-            content=entry['content'],
-            tags=entry['tags'] or [],
-            created_at=str(entry['created_at']),
-            updated_at=str(entry['updated_at'])
-        )
+        result = KnowledgeEntryResponse.from_row(entry)
         
-        set_cache(cache_key, result.model_dump(), ttl=300)
+        # Skipped if the entry was written while we read it; that write cached the newer row
+        cache_entry_batch(current_user['user_id'], [result.model_dump()], version)
         return result
 
     except HTTPException:
@@ -545,16 +476,15 @@ def get_entry(entry_id: int, current_user: dict = Depends(rate_limit_dependency)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Update update_entry to invalidate cache
 @app.put("/api/entries/{entry_id}", response_model=KnowledgeEntryResponse)
 def update_entry(
     entry_id: int,
     entry_update: KnowledgeEntryUpdate,
     current_user: dict = Depends(rate_limit_dependency)
 ):
-    """Update a knowledge entry (invalidates cache)"""
+    """Update a knowledge entry (write-through to cache)"""
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(user_id=current_user['user_id'])
         cursor = conn.cursor()
         
         cursor.execute(
@@ -601,8 +531,9 @@ def update_entry(
         cursor.close()
         conn.close()
         
-        # Invalidate cache for this user
-        clear_user_cache(current_user['user_id'])
+        # Replace the entry in the cached list and entry cache
+        result = KnowledgeEntryResponse.from_row(updated_entry)
+        cache_entry_saved(current_user['user_id'], result.model_dump())
         
         # Log entry update
         audit_logger.log_resource_action(
@@ -612,15 +543,7 @@ def update_entry(
             ip_address="system"
         )
         
-        return KnowledgeEntryResponse(
-            id=updated_entry['id'],
-            user_id=updated_entry['user_id'],
-            title=updated_entry['title'],
-            content=updated_entry['content'],
-            tags=updated_entry['tags'] or [],
-            created_at=str(updated_entry['created_at']),
-            updated_at=str(updated_entry['updated_at'])
-        )
+        return result
     except HTTPException:
         raise
     except Exception as e:
@@ -629,12 +552,11 @@ def update_entry(
             detail=str(e)
         )
 
-# Update delete_entry to invalidate cache
 @app.delete("/api/entries/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_entry(entry_id: int, current_user: dict = Depends(rate_limit_dependency)):
-    """Delete a knowledge entry (invalidates cache)"""
+    """Delete a knowledge entry (write-through to cache)"""
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(user_id=current_user['user_id'])
         cursor = conn.cursor()
         
         cursor.execute(
@@ -653,8 +575,8 @@ def delete_entry(entry_id: int, current_user: dict = Depends(rate_limit_dependen
                 detail="Entry not found"
             )
         
-        # Invalidate cache for this user
-        clear_user_cache(current_user['user_id'])
+        # Remove it from the cached list and entry cache
+        cache_entry_deleted(current_user['user_id'], entry_id)
         
         # Log entry deletion
         audit_logger.log_resource_action(
@@ -673,6 +595,97 @@ def delete_entry(entry_id: int, current_user: dict = Depends(rate_limit_dependen
             detail=str(e)
         )
 
+@app.get("/api/tags", response_model=List[TagCount])
+def get_tags(current_user: dict = Depends(rate_limit_dependency), limit: int = 100):
+    """
+    Get the user's tags with entry counts, most used first
+    Counts are kept by a trigger on every write (migrations/create_tag_counts.sql)
+    
+    Query params:
+        - limit: Number of tags to return (default 100, max 500)
+    """
+    try:
+        return get_tag_counts(current_user['user_id'], limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch tags"
+        )
+
+@app.get("/api/autocomplete")
+def autocomplete(
+    q: str = "",
+    suggest_type: str = Query("all", alias="type"),
+    limit: int = 10,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    As-you-type tag and title suggestions from a per-user prefix index
+    Has its own rate limit (600/min) and skips the per-IP limit.
+    
+    Query params:
+        - q: What has been typed so far (case-insensitive prefix)
+        - type: 'tags', 'titles' or 'all' (default)
+        - limit: Suggestions per type (default 10, max 20)
+    """
+    if suggest_type != "all" and suggest_type not in SUGGESTION_TYPES:
+        raise HTTPException(status_code=400, detail="type must be 'tags', 'titles' or 'all'")
+    check_rate_limit(current_user['user_id'], autocomplete_rate_limiter)
+    
+    types = SUGGESTION_TYPES if suggest_type == "all" else (suggest_type,)
+    try:
+        return {"query": q, **suggest(current_user['user_id'], q, types, limit)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch suggestions"
+        )
+
+@app.get("/api/search")
+def search(
+    q: str = "",
+    tags: str = None,
+    any_tags: str = None,
+    exclude_tags: str = None,
+    created_after: datetime = None,
+    created_before: datetime = None,
+    updated_after: datetime = None,
+    updated_before: datetime = None,
+    sort: str = None,
+    page: int = 1,
+    limit: int = 20,
+    current_user: dict = Depends(rate_limit_dependency)
+):
+    """
+    Search entries by text, tags and dates; ranked, paginated, with highlighted snippets
+    One query per page; results are cached until the user's next write.
+    
+    Query params:
+        - q: Search text; supports "quoted phrases", OR and -word
+        - tags: Comma-separated tags the entry must all have (AND)
+        - any_tags: Comma-separated tags, at least one required (OR)
+        - exclude_tags: Comma-separated tags the entry must not have (NOT)
+        - created_after / created_before / updated_after / updated_before: ISO datetimes (after is inclusive)
+        - sort: 'relevance' (default with q), 'updated' (default without) or 'created'
+        - page: 1-based page number
+        - limit: Results per page (default 20, max 50)
+    """
+    try:
+        params = normalize_search(
+            q, parse_fields(tags), parse_fields(any_tags), parse_fields(exclude_tags),
+            created_after, created_before, updated_after, updated_before, sort, page, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        return {"query": params["q"], **search_entries(current_user['user_id'], params)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Search failed"
+        )
+
 # Add cache stats endpoint
 @app.get("/api/cache/stats")
 def cache_stats(current_user: dict = Depends(get_current_user)):
@@ -696,14 +709,11 @@ def chat(
     
     # Apply strict rate limiting for AI chat (expensive operation)
     # Daily limit: 7 requests per day
-    check_daily_ai_limit(current_user['user_id'], limit=7)
+    daily_result = check_daily_ai_limit(current_user['user_id'])
     
     # Hourly limit: 10 requests per hour (prevents rapid-fire abuse)
-    from rate_limiter import chat_rate_limiter
     client_ip = request.client.host
-    chat_limit_key = f"chat:user:{current_user['user_id']}"
-    
-    chat_result = chat_rate_limiter.check_rate_limit(chat_limit_key)
+    chat_result = chat_rate_limiter.check_rate_limit(current_user['user_id'])
     if not chat_result["allowed"]:
         minutes_remaining = (chat_result["reset_time"] - int(time.time())) // 60
         
@@ -717,7 +727,7 @@ def chat(
         
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"AI chat rate limit exceeded (10 per hour). Try again in {minutes_remaining} minutes.",
+            detail=f"AI chat rate limit exceeded ({chat_result['limit']} per hour). Try again in {minutes_remaining} minutes.",
             headers={
                 "X-RateLimit-Limit": str(chat_result["limit"]),
                 "X-RateLimit-Remaining": "0",
@@ -737,7 +747,7 @@ def chat(
             ip_address=client_ip,
             details={
                 "message_length": len(chat_message.message),
-                "requests_remaining_daily": 7 - int(redis_client.get(f"ai_limit:user:{current_user['user_id']}:daily") or 0),
+                "requests_remaining_daily": daily_result["remaining"],
                 "requests_remaining_hourly": chat_result["remaining"]
             },
             user_agent=request.headers.get("user-agent")
@@ -768,109 +778,342 @@ def chat(
             detail="AI service temporarily unavailable"
         )
 
+@app.get("/api/limits")
+def limits_status(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Current state of every limiter that applies to this user, read in one
+    Redis round trip. Polling this doesn't count against any limit.
+    """
+    user_id = current_user['user_id']
+    limits = get_limit_status([
+        (rate_limiter, user_id),
+        (chat_rate_limiter, user_id),
+        (ai_daily_limiter, user_id),
+        (autocomplete_rate_limiter, user_id),
+        (ip_rate_limiter, request.client.host),
+    ])
+    return {
+        "user_id": user_id,
+        "limits": limits,
+        "can_chat": all(limits[name]["remaining"] > 0 for name in (chat_rate_limiter.name, ai_daily_limiter.name))
+    }
+
 @app.get("/api/rate-limit/status")
 def rate_limit_status(current_user: dict = Depends(get_current_user)):
     """Get current rate limit status for user"""
-    result = rate_limiter.check_rate_limit(current_user['user_id'])
+    result = get_limit_status([(rate_limiter, current_user['user_id'])])[rate_limiter.name]
     return {
         "user_id": current_user['user_id'],
         "requests_remaining": result['remaining'],
         "requests_limit": result['limit'],
         "reset_time": result['reset_time'],
-        "reset_in_seconds": result['reset_time'] - int(time.time())
+        "reset_in_seconds": result['resets_in_seconds']
     }
 
 @app.get("/api/ai-limit/status")
 def ai_limit_status(current_user: dict = Depends(get_current_user)):
     """Get current AI request limit status for user"""
-    from cache_service import redis_client
-    
-    # Daily limit
-    daily_key = f"ai_limit:user:{current_user['user_id']}:daily"
-    daily_count = redis_client.get(daily_key)
-    daily_ttl = redis_client.ttl(daily_key)
-    daily_count = int(daily_count) if daily_count else 0
-    daily_limit = 7
-    daily_remaining = max(0, daily_limit - daily_count)
-    
-    # Hourly limit
-    hourly_key = f"rate_limit:user:chat:user:{current_user['user_id']}"
-    hourly_count = redis_client.get(hourly_key)
-    hourly_ttl = redis_client.ttl(hourly_key)
-    hourly_count = int(hourly_count) if hourly_count else 0
-    hourly_limit = 10
-    hourly_remaining = max(0, hourly_limit - hourly_count)
+    limits = get_limit_status([
+        (ai_daily_limiter, current_user['user_id']),
+        (chat_rate_limiter, current_user['user_id']),
+    ])
+    daily = limits[ai_daily_limiter.name]
+    hourly = limits[chat_rate_limiter.name]
     
     return {
         "user_id": current_user['user_id'],
         "daily": {
-            "used": daily_count,
-            "remaining": daily_remaining,
-            "limit": daily_limit,
-            "resets_in_seconds": daily_ttl if daily_ttl > 0 else 86400,
-            "resets_in_hours": (daily_ttl // 3600) if daily_ttl > 0 else 24
+            "used": daily["used"],
+            "remaining": daily["remaining"],
+            "limit": daily["limit"],
+            "resets_in_seconds": daily["resets_in_seconds"],
+            "resets_in_hours": daily["resets_in_seconds"] // 3600
         },
         "hourly": {
-            "used": hourly_count,
-            "remaining": hourly_remaining,
-            "limit": hourly_limit,
-            "resets_in_seconds": hourly_ttl if hourly_ttl > 0 else 3600,
-            "resets_in_minutes": (hourly_ttl // 60) if hourly_ttl > 0 else 60
+            "used": hourly["used"],
+            "remaining": hourly["remaining"],
+            "limit": hourly["limit"],
+            "resets_in_seconds": hourly["resets_in_seconds"],
+            "resets_in_minutes": hourly["resets_in_seconds"] // 60
         },
-        "can_chat": daily_remaining > 0 and hourly_remaining > 0
+        "can_chat": daily["remaining"] > 0 and hourly["remaining"] > 0
+    }
+
+def get_usage_estimates(cursor) -> dict:
+    """Approximate row counts from planner statistics (no table scans)"""
+    cursor.execute(
+        """SELECT relname, GREATEST(reltuples, 0)::BIGINT AS estimate
+           FROM pg_class
+           WHERE oid IN ('users'::regclass, 'knowledge_entries'::regclass)"""
+    )
+    estimates = {row['relname']: row['estimate'] for row in cursor.fetchall()}
+    return {
+        "total_users": estimates.get("users", 0),
+        "total_entries": estimates.get("knowledge_entries", 0)
     }
 
 @app.get("/api/admin/usage")
-def admin_usage(current_user: dict = Depends(get_current_user)):
-    """Get usage stats"""
-    
-    # Count total users
-    conn = get_db_connection()
+def admin_usage(current_user: dict = Depends(get_current_user), estimate: bool = False):
+    """
+    Get usage stats
+    Totals come from trigger-maintained counters (see migrations/create_usage_counters.sql).
+    Pass estimate=true to use pg_class.reltuples instead.
+    """
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM users")
-    user_count = cursor.fetchone()[0]
     
-    cursor.execute("SELECT COUNT(*) FROM knowledge_entries")
-    entry_count = cursor.fetchone()[0]
+    try:
+        if estimate:
+            totals = get_usage_estimates(cursor)
+            source = "estimate"
+        else:
+            cursor.execute(
+                """SELECT name, SUM(value)::BIGINT AS value
+                   FROM usage_counters
+                   WHERE name IN ('users', 'entries')
+                   GROUP BY name"""
+            )
+            counters = {row['name']: row['value'] for row in cursor.fetchall()}
+            totals = {
+                "total_users": counters.get("users", 0),
+                "total_entries": counters.get("entries", 0)
+            }
+            source = "counters"
+        
+        # Heaviest users by stored bytes (index-backed)
+        cursor.execute(
+            """SELECT user_id, entry_count, content_bytes
+               FROM user_usage
+               ORDER BY content_bytes DESC
+               LIMIT 10"""
+        )
+        top_users = [dict(row) for row in cursor.fetchall()]
+    except psycopg2.Error:
+        # Counters not migrated yet - fall back to planner estimates
+        conn.rollback()
+        totals = get_usage_estimates(cursor)
+        source = "estimate"
+        top_users = []
+    finally:
+        cursor.close()
+        conn.close()
     
+    return {
+        **totals,
+        "source": source,
+        "top_users_by_bytes": top_users,
+        "cache_stats": get_cache_stats()
+    }
+
+@app.get("/api/my/usage")
+def my_usage(current_user: dict = Depends(get_current_user)):
+    """Get your own entry count and stored bytes (quota dashboard)"""
+    conn = get_db_connection(readonly=True, user_id=current_user['user_id'])
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT entry_count, content_bytes FROM user_usage WHERE user_id = %s",
+        (current_user['user_id'],)
+    )
+    usage = cursor.fetchone()
     cursor.close()
     conn.close()
     
     return {
-        "total_users": user_count,
-        "total_entries": entry_count,
-        "cache_stats": get_cache_stats()
+        "user_id": current_user['user_id'],
+        "entry_count": usage['entry_count'] if usage else 0,
+        "content_bytes": usage['content_bytes'] if usage else 0
     }
 
+@app.get("/api/admin/password-hashing")
+def password_hashing_stats(current_user: dict = Depends(get_current_user)):
+    """Get bcrypt pool queue depth and hash latency (admin endpoint)"""
+    return password_executor.get_stats()
+
+@app.get("/api/admin/queries")
+def get_query_stats(
+    current_user: dict = Depends(get_current_user),
+    limit: int = 20,
+    sort: str = "total"
+):
+    """
+    Most expensive query shapes in this worker (admin endpoint)
+    
+    Query params:
+        - limit: Number of shapes to return (default 20, max 100)
+        - sort: 'total' (default), 'mean', 'max' or 'calls'
+    """
+    if sort not in QUERY_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(QUERY_SORT_KEYS)}")
+    
+    return {
+        "slow_threshold_ms": query_log.slow_seconds * 1000,
+        "queries": query_log.top_queries(min(limit, 100), sort)
+    }
+
+@app.get("/api/admin/queries/slow")
+def get_slow_queries(current_user: dict = Depends(get_current_user), limit: int = 50):
+    """Recent statements over SLOW_QUERY_MS, with sampled EXPLAIN plans (admin endpoint)"""
+    queries = query_log.recent_slow(min(limit, 100))
+    return {"count": len(queries), "queries": queries}
+
+@app.get("/api/admin/profiles")
+def get_profiles(current_user: dict = Depends(get_current_user), limit: int = 50):
+    """
+    List recent request profiles with their time breakdown (admin endpoint)
+    Profile a request by sending 'X-Profile: <PROFILING_TOKEN>'; the response
+    carries the profile ID in 'X-Profile-Id'.
+    """
+    try:
+        profiles = list_profiles(min(limit, 100))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Profile store unavailable: {str(e)}")
+    return {"count": len(profiles), "profiles": profiles}
+
+@app.get("/api/admin/profiles/{profile_id}")
+def download_profile(
+    profile_id: str,
+    profile_format: str = Query("speedscope", alias="format"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Download a request profile (admin endpoint)
+    
+    Query params:
+        - format: 'speedscope' (default, open at speedscope.app) or 'collapsed' (flamegraph.pl)
+    """
+    if profile_format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'speedscope' or 'collapsed'")
+    
+    try:
+        content = load_profile(profile_id, profile_format)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Profile store unavailable: {str(e)}")
+    if content is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+    
+    extension = "speedscope.json" if profile_format == "speedscope" else "collapsed.txt"
+    return Response(
+        content=content,
+        media_type=PROFILE_FORMATS[profile_format],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.{extension}"'}
+    )
+
+def parse_fields(fields: str = None) -> list:
+    """Split a comma-separated fields query param"""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
 @app.get("/api/admin/audit-logs")
 def get_audit_logs(
     current_user: dict = Depends(get_current_user),
     limit: int = 100,
     severity: str = None,
-    user_id: int = None
+    user_id: int = None,
+    event_type: str = None,
+    category: str = None,
+    ip_address: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    cursor: str = None,
+    fields: str = None
 ):
     """
-    Get recent audit logs (admin endpoint)
+    Get audit logs, newest first (admin endpoint)
     
     Query params:
         - limit: Number of logs to return (default 100, max 500)
         - severity: Filter by severity (info, warning, error, critical)
         - user_id: Filter by user ID
+        - event_type / category / ip_address: Optional filters
+        - since / until: ISO timestamps bounding the time range
+        - cursor: next_cursor from the previous page
+        - fields: Comma-separated columns (default omits details and user_agent, 'all' for everything)
     """
     # Limit the limit to prevent abuse
     limit = min(limit, 500)
     
-    logs = audit_logger.get_recent_logs(
-        limit=limit,
-        user_id=user_id,
-        severity=severity
-    )
+    try:
+        page = audit_logger.get_logs_page(
+            limit=limit,
+            cursor=cursor,
+            columns=parse_fields(fields),
+            user_id=user_id,
+            severity=severity,
+            event_type=event_type,
+            event_category=category,
+            ip_address=ip_address,
+            since=since,
+            until=until
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
-        "count": len(logs),
-        "logs": logs
+        "count": len(page["logs"]),
+        "logs": page["logs"],
+        "next_cursor": page["next_cursor"]
     }
 
+@app.get("/api/admin/audit-logs/export")
+def export_audit_logs(
+    request: Request,
+    since: datetime,
+    until: datetime = None,
+    export_format: str = Query("ndjson", alias="format"),
+    gzip: bool = False,
+    after_timestamp: datetime = None,
+    after_id: int = None,
+    fields: str = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream audit logs in a time range for compliance pulls (admin endpoint)
+    Rows come oldest first through a server-side cursor, so memory use stays
+    flat no matter how many rows are exported.
+    
+    Query params:
+        - since / until: ISO timestamps bounding the export
+        - format: 'ndjson' (default) or 'csv'
+        - gzip: Compress the download
+        - after_timestamp / after_id: Last row received, to resume an interrupted export
+        - fields: Comma-separated columns (default: all)
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    
+    columns = parse_fields(fields) or ["all"]
+    try:
+        audit_logger.resolve_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    after = None
+    if after_timestamp and after_id is not None:
+        after = (after_timestamp, after_id)
+    
+    audit_logger.log(
+        event_type=audit_logger.AUDIT_EXPORT,
+        event_category=audit_logger.CATEGORY_SECURITY,
+        severity=audit_logger.SEVERITY_INFO,
+        status=audit_logger.STATUS_SUCCESS,
+        user_id=current_user['user_id'],
+        ip_address=request.client.host,
+        details={
+            "since": since.isoformat(),
+            "until": until.isoformat() if until else None,
+            "format": export_format,
+            "resumed": after is not None
+        }
+    )
+    
+    filename = f"audit_logs_{since:%Y%m%d}.{export_format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_stream(since, until, export_format, gzip, after, columns),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @app.get("/api/admin/security-summary")
 def get_security_summary(
     current_user: dict = Depends(get_current_user),
@@ -889,23 +1132,76 @@ def get_security_summary(
         "events": summary
     }
 
+@app.get("/api/admin/security-histogram")
+def get_security_histogram(
+    current_user: dict = Depends(get_current_user),
+    hours: int = 24,
+    bucket: str = "hour",
+    category: str = None,
+    event_type: str = None,
+    severity: str = None
+):
+    """
+    Get time-bucketed event counts for dashboards
+    
+    Query params:
+        - hours: Window size (max 168 for hourly, 48 for minute buckets)
+        - bucket: 'hour' or 'minute'
+        - category / event_type / severity: Optional filters
+    """
+    if bucket not in (audit_logger.BUCKET_HOUR, audit_logger.BUCKET_MINUTE):
+        raise HTTPException(status_code=400, detail="bucket must be 'hour' or 'minute'")
+    
+    max_hours = audit_logger.MINUTE_ROLLUP_RETENTION_HOURS if bucket == audit_logger.BUCKET_MINUTE else 168
+    hours = min(hours, max_hours)
+    
+    buckets = audit_logger.get_event_histogram(
+        hours=hours,
+        bucket_size=bucket,
+        event_category=category,
+        event_type=event_type,
+        severity=severity
+    )
+    
+    return {
+        "period_hours": hours,
+        "bucket": bucket,
+        "buckets": buckets
+    }
+
 @app.get("/api/my/audit-logs")
 def get_my_audit_logs(
     current_user: dict = Depends(get_current_user),
-    limit: int = 50
+    limit: int = 50,
+    event_type: str = None,
+    category: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    cursor: str = None,
+    fields: str = None
 ):
     """
     Get your own audit logs (user endpoint)
-    Allows users to see their own activity history
+    Allows users to see their own activity history, paged with next_cursor
     """
     limit = min(limit, 100)
     
-    logs = audit_logger.get_recent_logs(
-        limit=limit,
-        user_id=current_user['user_id']
-    )
+    try:
+        page = audit_logger.get_logs_page(
+            limit=limit,
+            cursor=cursor,
+            columns=parse_fields(fields),
+            user_id=current_user['user_id'],
+            event_type=event_type,
+            event_category=category,
+            since=since,
+            until=until
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
-        "count": len(logs),
-        "logs": logs
-    }
\ No newline at end of file
+        "count": len(page["logs"]),
+        "logs": page["logs"],
+        "next_cursor": page["next_cursor"]
+    }
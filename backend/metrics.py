@@ -0,0 +1,257 @@
+"""
+Metrics
+Minimal in-process Prometheus-style metrics: counters, gauges and
+histograms rendered in the text exposition format at /metrics.
+
+Recording is a dict lookup, a bisect and a locked add, cheap enough to
+leave on in production. Each worker process keeps its own registry, so
+scrape every worker (or run one worker per container).
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+
+# Latency buckets in seconds (5ms .. 10s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(ABC):
+    """Base class: a named family of time series keyed by label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    @abstractmethod
+    def _samples(self):
+        """Yield one exposition line per time series"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _ValueMetric(Metric):
+    """
+    One number per label set: set by the app, or read at scrape time
+    Pass `callback` to compute the value(s) at scrape time instead of recording them
+    """
+
+    def __init__(self, name: str, description: str, labelnames: tuple = (), callback=None):
+        super().__init__(name, description, labelnames)
+        self.callback = callback
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def _samples(self):
+        if self.callback:
+            try:
+                result = self.callback()
+            except Exception:
+                return
+            items = result.items() if isinstance(result, dict) else [((), result)]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for labelvalues, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {value}"
+
+
+class Counter(_ValueMetric):
+    """
+    Monotonically increasing count
+    A `callback` must return a running total that never goes down
+    """
+
+    kind = "counter"
+
+
+class Gauge(_ValueMetric):
+    """Value that goes up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(Metric):
+    """Distribution of observations in fixed cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labelvalues)
+            if series is None:
+                # [per-bucket counts..., +Inf count, sum]
+                series = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labelvalues):
+        """Context manager that observes the elapsed time of its block"""
+        return _Timer(self, labelvalues)
+
+    def _samples(self):
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._values.items()]
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _format_labels(self.labelnames, labelvalues, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            labels = _format_labels(self.labelnames, labelvalues)
+            inf = _format_labels(self.labelnames, labelvalues, 'le="+Inf"')
+            yield f"{self.name}_bucket{inf} {cumulative}"
+            yield f"{self.name}_sum{labels} {series[-1]}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+        return False
+
+
+class Registry:
+    """Holds every metric and renders them for scraping"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ============ APPLICATION METRICS ============
+
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")
+)
+
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds", "Database statement latency by statement type", ("operation",)
+)
+db_connections_opened_total = Counter("db_connections_opened_total", "Database connections opened")
+db_connections_in_use = Gauge("db_connections_in_use", "Database connections currently open")
+db_reads_routed_total = Counter(
+    "db_reads_routed_total", "Read-only connections by where they went (replica, primary_pinned, primary_fallback)",
+    ("target",)
+)
+
+redis_command_duration_seconds = Histogram(
+    "redis_command_duration_seconds", "Redis round-trip latency by command", ("command",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+redis_errors_total = Counter("redis_errors_total", "Redis commands that raised", ("command",))
+
+cache_requests_total = Counter(
+    "cache_requests_total", "Application cache lookups by key namespace", ("namespace", "result")
+)
+
+rate_limit_rejections_total = Counter(
+    "rate_limit_rejections_total", "Requests rejected by each rate limiter", ("limiter",)
+)
+rate_limit_fallbacks_total = Counter(
+    "rate_limit_fallbacks_total", "Rate limit checks served by in-process counters while Redis is down", ("limiter",)
+)
+
+circuit_breaker_state = Gauge(
+    "circuit_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("name",)
+)
+circuit_breaker_rejections_total = Counter(
+    "circuit_breaker_rejections_total", "Calls failed fast by an open circuit breaker", ("name",)
+)
+
+anthropic_request_duration_seconds = Histogram(
+    "anthropic_request_duration_seconds", "Anthropic messages.create latency", ("model",),
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+anthropic_tokens_total = Counter("anthropic_tokens_total", "Anthropic tokens used", ("model", "type"))
+
+
+# ============ ASGI MIDDLEWARE ============
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request count and latency per route
+    Routes are labelled by template (/api/entries/{entry_id}), never by raw path
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_request_duration_seconds.observe(time.perf_counter() - start, method, route_path)
+            http_requests_total.inc(method, route_path, str(status_holder[0]))
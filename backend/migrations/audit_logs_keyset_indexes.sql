@@ -0,0 +1,23 @@
+-- Audit Logs Keyset Indexes
+-- Paging is ordered by (timestamp DESC, id DESC). Every filter column leads a
+-- composite index ending in (timestamp, id), so each filter (with or without
+-- a time range) is one index range scan that resumes directly at the cursor.
+-- Combined filters use the most selective leading index and check the rest
+-- on the already time-ordered rows.
+
+DROP INDEX IF EXISTS idx_audit_logs_timestamp;
+DROP INDEX IF EXISTS idx_audit_logs_user_time;
+DROP INDEX IF EXISTS idx_audit_logs_category_time;
+DROP INDEX IF EXISTS idx_audit_logs_event_type_time;
+DROP INDEX IF EXISTS idx_audit_logs_ip_time;
+
+CREATE INDEX IF NOT EXISTS idx_audit_logs_time_id ON audit_logs(timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_user_time_id ON audit_logs(user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_event_type_time_id ON audit_logs(event_type, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_category_time_id ON audit_logs(event_category, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_ip_time_id ON audit_logs(ip_address, timestamp DESC, id DESC);
+
+-- Most rows are 'info', so only the rarer severities get an index
+-- ('info' filters walk idx_audit_logs_time_id and match almost every row)
+CREATE INDEX IF NOT EXISTS idx_audit_logs_severity_time_id ON audit_logs(severity, timestamp DESC, id DESC)
+    WHERE severity <> 'info';
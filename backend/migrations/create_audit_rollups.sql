@@ -0,0 +1,98 @@
+-- Audit Event Rollups
+-- Per-minute and per-hour event counters, kept current by a trigger on audit_logs.
+-- Security summaries and dashboards read these instead of scanning raw rows.
+--
+-- Each counter is split over 8 shard rows, picked by the writing backend's
+-- pid, so concurrent sessions auditing the same event in the same minute
+-- don't all queue on one row lock until commit. Readers SUM over shards.
+
+CREATE TABLE IF NOT EXISTS audit_event_rollups (
+    bucket_size VARCHAR(6) NOT NULL,  -- 'minute' or 'hour'
+    bucket TIMESTAMP NOT NULL,  -- start of the minute/hour
+    event_type VARCHAR(50) NOT NULL,
+    event_category VARCHAR(20) NOT NULL,
+    severity VARCHAR(10) NOT NULL,
+    shard SMALLINT NOT NULL DEFAULT 0,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_size, bucket, event_type, event_category, severity, shard)
+);
+
+-- Tables created before sharding: add the column and widen the primary key
+ALTER TABLE audit_event_rollups ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0;
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = 'audit_event_rollups'::regclass AND i.indisprimary AND a.attname = 'shard'
+    ) THEN
+        ALTER TABLE audit_event_rollups DROP CONSTRAINT audit_event_rollups_pkey;
+        ALTER TABLE audit_event_rollups
+            ADD PRIMARY KEY (bucket_size, bucket, event_type, event_category, severity, shard);
+    END IF;
+END;
+$$;
+
+COMMENT ON TABLE audit_event_rollups IS 'Incrementally maintained audit event counts by minute and hour';
+
+-- Backfill from existing logs (only on first run)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM audit_event_rollups) THEN
+        INSERT INTO audit_event_rollups (bucket_size, bucket, event_type, event_category, severity, count)
+        SELECT 'hour', date_trunc('hour', timestamp), event_type, event_category, severity, COUNT(*)
+        FROM audit_logs
+        WHERE timestamp IS NOT NULL
+        GROUP BY 2, 3, 4, 5;
+
+        INSERT INTO audit_event_rollups (bucket_size, bucket, event_type, event_category, severity, count)
+        SELECT 'minute', date_trunc('minute', timestamp), event_type, event_category, severity, COUNT(*)
+        FROM audit_logs
+        WHERE timestamp >= LOCALTIMESTAMP - INTERVAL '48 hours'
+        GROUP BY 2, 3, 4, 5;
+    END IF;
+END;
+$$;
+
+-- Bump the minute and hour counters for every new audit event, in this
+-- session's shard
+CREATE OR REPLACE FUNCTION audit_logs_rollup()
+RETURNS TRIGGER AS $$
+DECLARE
+    shard SMALLINT := pg_backend_pid() % 8;
+BEGIN
+    INSERT INTO audit_event_rollups (bucket_size, bucket, event_type, event_category, severity, shard, count)
+    VALUES
+        ('minute', date_trunc('minute', NEW.timestamp), NEW.event_type, NEW.event_category, NEW.severity, shard, 1),
+        ('hour', date_trunc('hour', NEW.timestamp), NEW.event_type, NEW.event_category, NEW.severity, shard, 1)
+    ON CONFLICT (bucket_size, bucket, event_type, event_category, severity, shard)
+    DO UPDATE SET count = audit_event_rollups.count + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_audit_logs_rollup ON audit_logs;
+CREATE TRIGGER trg_audit_logs_rollup
+    AFTER INSERT ON audit_logs
+    FOR EACH ROW EXECUTE FUNCTION audit_logs_rollup();
+
+-- Minute buckets are only needed for recent, fine-grained views
+CREATE OR REPLACE FUNCTION audit_event_rollups_prune(minute_retention_hours INTEGER DEFAULT 48, hour_retention_months INTEGER DEFAULT 12)
+RETURNS INTEGER AS $$
+DECLARE
+    removed INTEGER;
+    removed_hours INTEGER;
+BEGIN
+    DELETE FROM audit_event_rollups
+    WHERE bucket_size = 'minute'
+    AND bucket < LOCALTIMESTAMP - make_interval(hours => minute_retention_hours);
+    GET DIAGNOSTICS removed = ROW_COUNT;
+
+    DELETE FROM audit_event_rollups
+    WHERE bucket_size = 'hour'
+    AND bucket < date_trunc('month', LOCALTIMESTAMP) - make_interval(months => hour_retention_months);
+    GET DIAGNOSTICS removed_hours = ROW_COUNT;
+
+    RETURN removed + removed_hours;
+END;
+$$ LANGUAGE plpgsql;
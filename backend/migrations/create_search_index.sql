@@ -0,0 +1,19 @@
+-- Full-text search
+-- A generated tsvector over title (weight A) and content (weight B) with a
+-- GIN index, used by GET /api/search. Postgres keeps the column current on
+-- every insert/update, so nothing in the application writes it.
+-- Adding a stored column rewrites knowledge_entries once; run it off-peak.
+
+ALTER TABLE knowledge_entries
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(content, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_knowledge_entries_search ON knowledge_entries USING GIN(search_vector);
+
+-- Tag filters (@>, &&) need a GIN index on tags
+CREATE INDEX IF NOT EXISTS idx_knowledge_entries_tags ON knowledge_entries USING GIN(tags);
+
+ANALYZE knowledge_entries;
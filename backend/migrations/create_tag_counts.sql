@@ -0,0 +1,76 @@
+-- Tag Counts
+-- Per-user entry count for every tag, kept current by a trigger on
+-- knowledge_entries, so /api/tags and the AI list_tags tool never unnest
+-- the tags of every entry.
+-- Re-running this file re-syncs every count from knowledge_entries.
+
+CREATE TABLE IF NOT EXISTS user_tag_counts (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, tag)
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_tag_counts_user_count ON user_tag_counts(user_id, entry_count DESC, tag);
+
+-- Tags are applied in sorted order so concurrent writers lock rows in the
+-- same order and can't deadlock; rows that reach zero are removed.
+-- A tag listed twice counts once and NULL elements are ignored.
+CREATE OR REPLACE FUNCTION entries_tag_counter()
+RETURNS TRIGGER AS $$
+DECLARE
+    added TEXT[] := '{}';
+    removed TEXT[] := '{}';
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        added := ARRAY(SELECT DISTINCT t FROM unnest(NEW.tags) AS t WHERE t IS NOT NULL ORDER BY t);
+    ELSIF TG_OP = 'DELETE' THEN
+        removed := ARRAY(SELECT DISTINCT t FROM unnest(OLD.tags) AS t WHERE t IS NOT NULL ORDER BY t);
+    ELSE
+        -- array_remove: t = ANY() of an array holding NULL is NULL, not false
+        added := ARRAY(
+            SELECT DISTINCT t FROM unnest(NEW.tags) AS t
+            WHERE t IS NOT NULL AND NOT t = ANY(array_remove(COALESCE(OLD.tags, '{}'), NULL)) ORDER BY t
+        );
+        removed := ARRAY(
+            SELECT DISTINCT t FROM unnest(OLD.tags) AS t
+            WHERE t IS NOT NULL AND NOT t = ANY(array_remove(COALESCE(NEW.tags, '{}'), NULL)) ORDER BY t
+        );
+    END IF;
+
+    -- knowledge_entries.user_id is nullable; such entries have no per-user counts
+    IF cardinality(added) > 0 AND NEW.user_id IS NOT NULL THEN
+        INSERT INTO user_tag_counts (user_id, tag, entry_count)
+        SELECT NEW.user_id, t, 1 FROM unnest(added) AS t
+        ON CONFLICT (user_id, tag) DO UPDATE SET
+            entry_count = user_tag_counts.entry_count + 1,
+            last_used_at = CURRENT_TIMESTAMP;
+    END IF;
+    IF cardinality(removed) > 0 AND OLD.user_id IS NOT NULL THEN
+        -- Plain UPDATE: during a user cascade delete the rows are already gone
+        UPDATE user_tag_counts SET entry_count = entry_count - 1
+        WHERE user_id = OLD.user_id AND tag = ANY(removed);
+        DELETE FROM user_tag_counts
+        WHERE user_id = OLD.user_id AND tag = ANY(removed) AND entry_count <= 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Block writers while counts are (re)built so nothing is missed
+LOCK TABLE knowledge_entries IN SHARE MODE;
+
+DROP TRIGGER IF EXISTS trg_entries_tag_counter ON knowledge_entries;
+CREATE TRIGGER trg_entries_tag_counter
+    AFTER INSERT OR UPDATE OF tags OR DELETE ON knowledge_entries
+    FOR EACH ROW EXECUTE FUNCTION entries_tag_counter();
+
+DELETE FROM user_tag_counts;
+INSERT INTO user_tag_counts (user_id, tag, entry_count, last_used_at)
+SELECT user_id, tag, COUNT(*), MAX(updated_at)
+FROM knowledge_entries, unnest(tags) AS tag
+WHERE user_id IS NOT NULL AND tag IS NOT NULL
+GROUP BY user_id, tag;
+
+COMMENT ON TABLE user_tag_counts IS 'Trigger-maintained per-user entry count for each tag';
@@ -0,0 +1,131 @@
+-- Usage Counters
+-- Totals and per-user entry counts/bytes kept current by triggers, so usage
+-- and quota dashboards never COUNT(*) over users or knowledge_entries.
+-- Re-running this file re-syncs every counter from the source tables.
+--
+-- Each global counter is split over 16 shard rows, picked by the writing
+-- backend's pid, so concurrent signups and entry writes don't all queue on
+-- one row lock until commit. Read a total with SUM(value) ... GROUP BY name.
+
+CREATE TABLE IF NOT EXISTS usage_counters (
+    name VARCHAR(50) NOT NULL,  -- 'users', 'entries'
+    shard SMALLINT NOT NULL DEFAULT 0,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, shard)
+);
+
+-- Tables created before sharding: add the column and widen the primary key
+ALTER TABLE usage_counters ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0;
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = 'usage_counters'::regclass AND i.indisprimary AND a.attname = 'shard'
+    ) THEN
+        ALTER TABLE usage_counters DROP CONSTRAINT usage_counters_pkey;
+        ALTER TABLE usage_counters ADD PRIMARY KEY (name, shard);
+    END IF;
+END;
+$$;
+
+-- Add delta to this session's shard of a global counter
+CREATE OR REPLACE FUNCTION usage_counter_add(counter_name VARCHAR, delta BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO usage_counters (name, shard, value)
+    VALUES (counter_name, pg_backend_pid() % 16, delta)
+    ON CONFLICT (name, shard) DO UPDATE SET value = usage_counters.value + EXCLUDED.value;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TABLE IF NOT EXISTS user_usage (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    content_bytes BIGINT NOT NULL DEFAULT 0,  -- title + content, in bytes
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_usage_bytes ON user_usage(content_bytes DESC);
+
+-- Users: global count
+CREATE OR REPLACE FUNCTION users_usage_counter()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM usage_counter_add('users', 1);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM usage_counter_add('users', -1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Entries: global count plus per-user count and bytes
+-- octet_length reads the stored size, so TOASTed content is not decompressed
+CREATE OR REPLACE FUNCTION entries_usage_counter()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- knowledge_entries.user_id is nullable: such rows count globally but belong to no user
+    IF TG_OP = 'INSERT' THEN
+        PERFORM usage_counter_add('entries', 1);
+        IF NEW.user_id IS NOT NULL THEN
+            INSERT INTO user_usage (user_id, entry_count, content_bytes)
+            VALUES (NEW.user_id, 1, octet_length(NEW.title) + octet_length(NEW.content))
+            ON CONFLICT (user_id) DO UPDATE SET
+                entry_count = user_usage.entry_count + 1,
+                content_bytes = user_usage.content_bytes + EXCLUDED.content_bytes,
+                updated_at = CURRENT_TIMESTAMP;
+        END IF;
+    ELSIF TG_OP = 'UPDATE' THEN
+        IF NEW.user_id IS NOT NULL THEN
+            UPDATE user_usage SET
+                content_bytes = content_bytes
+                    - (octet_length(OLD.title) + octet_length(OLD.content))
+                    + (octet_length(NEW.title) + octet_length(NEW.content)),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = NEW.user_id;
+        END IF;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM usage_counter_add('entries', -1);
+        IF OLD.user_id IS NOT NULL THEN
+            -- Plain UPDATE: during a user cascade delete the row is already gone
+            UPDATE user_usage SET
+                entry_count = entry_count - 1,
+                content_bytes = content_bytes - (octet_length(OLD.title) + octet_length(OLD.content)),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = OLD.user_id;
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Block writers while counters are (re)built so nothing is missed
+LOCK TABLE users, knowledge_entries IN SHARE MODE;
+
+DROP TRIGGER IF EXISTS trg_users_usage_counter ON users;
+CREATE TRIGGER trg_users_usage_counter
+    AFTER INSERT OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION users_usage_counter();
+
+DROP TRIGGER IF EXISTS trg_entries_usage_counter ON knowledge_entries;
+CREATE TRIGGER trg_entries_usage_counter
+    AFTER INSERT OR UPDATE OF title, content OR DELETE ON knowledge_entries
+    FOR EACH ROW EXECUTE FUNCTION entries_usage_counter();
+
+DELETE FROM usage_counters;
+INSERT INTO usage_counters (name, shard, value)
+VALUES
+    ('users', 0, (SELECT COUNT(*) FROM users)),
+    ('entries', 0, (SELECT COUNT(*) FROM knowledge_entries));
+
+DELETE FROM user_usage;
+INSERT INTO user_usage (user_id, entry_count, content_bytes)
+SELECT user_id, COUNT(*), SUM(octet_length(title) + octet_length(content))
+FROM knowledge_entries
+WHERE user_id IS NOT NULL
+GROUP BY user_id;
+
+COMMENT ON TABLE usage_counters IS 'Trigger-maintained row counts for users and knowledge_entries, sharded; SUM by name';
+COMMENT ON TABLE user_usage IS 'Trigger-maintained per-user entry count and stored bytes';
@@ -0,0 +1,184 @@
+-- Partitioned Audit Logs
+-- Converts audit_logs into a table range-partitioned by month on timestamp.
+-- Old data is dropped a whole partition at a time instead of DELETEd row by row.
+-- Safe to re-run: an already partitioned table is left alone.
+
+-- Create (or fill in) the partition for the month containing month_start.
+-- Rows that landed in the default partition for that month are moved over first.
+CREATE OR REPLACE FUNCTION audit_logs_create_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    range_start TIMESTAMP := date_trunc('month', month_start);
+    range_end TIMESTAMP := date_trunc('month', month_start) + INTERVAL '1 month';
+    partition_name TEXT := 'audit_logs_p' || to_char(month_start, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE audit_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        partition_name
+    );
+
+    IF to_regclass('audit_logs_default') IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (
+                 DELETE FROM audit_logs_default
+                 WHERE timestamp >= %L AND timestamp < %L
+                 RETURNING *
+             )
+             INSERT INTO %I SELECT * FROM moved',
+            range_start, range_end, partition_name
+        );
+    END IF;
+
+    EXECUTE format(
+        'ALTER TABLE audit_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, range_start, range_end
+    );
+
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Make sure partitions exist for the current month and the next months_ahead months
+CREATE OR REPLACE FUNCTION audit_logs_create_partitions(months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER AS $$
+DECLARE
+    created INTEGER := 0;
+    month_offset INTEGER;
+    month_start DATE;
+BEGIN
+    FOR month_offset IN 0..months_ahead LOOP
+        month_start := (date_trunc('month', LOCALTIMESTAMP) + make_interval(months => month_offset))::DATE;
+        IF to_regclass('audit_logs_p' || to_char(month_start, 'YYYY_MM')) IS NULL THEN
+            PERFORM audit_logs_create_partition(month_start);
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Drop every monthly partition that ends before the retention window
+CREATE OR REPLACE FUNCTION audit_logs_drop_partitions(retention_months INTEGER DEFAULT 12)
+RETURNS INTEGER AS $$
+DECLARE
+    cutoff DATE := (date_trunc('month', LOCALTIMESTAMP) - make_interval(months => retention_months))::DATE;
+    dropped INTEGER := 0;
+    part RECORD;
+BEGIN
+    FOR part IN
+        SELECT c.relname AS name,
+               to_date(substring(c.relname FROM 'audit_logs_p(\d{4}_\d{2})$'), 'YYYY_MM') AS month_start
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'audit_logs'::regclass
+        AND c.relname ~ '^audit_logs_p\d{4}_\d{2}$'
+    LOOP
+        IF part.month_start < cutoff THEN
+            EXECUTE format('DROP TABLE %I', part.name);
+            dropped := dropped + 1;
+        END IF;
+    END LOOP;
+
+    -- Stragglers in the default partition are few, so a DELETE is fine there
+    IF to_regclass('audit_logs_default') IS NOT NULL THEN
+        DELETE FROM audit_logs_default WHERE timestamp < cutoff;
+    END IF;
+
+    RETURN dropped;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Convert (or create) the table
+DO $$
+DECLARE
+    table_kind "char";
+    month_start DATE;
+BEGIN
+    SELECT relkind INTO table_kind FROM pg_class WHERE oid = to_regclass('audit_logs');
+
+    IF table_kind = 'p' THEN
+        RETURN;  -- already partitioned
+    END IF;
+
+    IF table_kind = 'r' THEN
+        -- Move the heap table aside and free up its index/constraint names
+        ALTER TABLE audit_logs RENAME TO audit_logs_legacy;
+        ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey;
+        ALTER TABLE audit_logs_legacy DROP CONSTRAINT IF EXISTS audit_logs_user_id_fkey;
+        DROP INDEX IF EXISTS idx_audit_logs_timestamp;
+        DROP INDEX IF EXISTS idx_audit_logs_user_id;
+        DROP INDEX IF EXISTS idx_audit_logs_event_type;
+        DROP INDEX IF EXISTS idx_audit_logs_severity;
+        DROP INDEX IF EXISTS idx_audit_logs_ip_address;
+        DROP INDEX IF EXISTS idx_audit_logs_category;
+        DROP INDEX IF EXISTS idx_audit_logs_user_time;
+    ELSE
+        CREATE SEQUENCE IF NOT EXISTS audit_logs_id_seq;
+    END IF;
+
+    -- The partition key must be part of the primary key
+    CREATE TABLE audit_logs (
+        id INTEGER NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+        timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+        user_email VARCHAR(255),
+        ip_address VARCHAR(45),  -- IPv6 support
+        event_type VARCHAR(50) NOT NULL,
+        event_category VARCHAR(20) NOT NULL,  -- auth, api, security, system
+        severity VARCHAR(10) NOT NULL,  -- info, warning, error, critical
+        resource VARCHAR(100),  -- e.g., 'entry:123', 'user:456'
+        action VARCHAR(50),  -- e.g., 'create', 'read', 'update', 'delete'
+        status VARCHAR(20),  -- success, failure, blocked
+        details JSONB,  -- Additional context
+        user_agent TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, timestamp)
+    ) PARTITION BY RANGE (timestamp);
+
+    ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id;
+
+    -- Catches anything outside the pre-created months so inserts never fail
+    CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+
+    -- Indexes are created on every partition. Low-cardinality single-column
+    -- indexes (severity, category) are replaced by time-ordered composites.
+    CREATE INDEX idx_audit_logs_timestamp ON audit_logs(timestamp DESC);
+    CREATE INDEX idx_audit_logs_user_time ON audit_logs(user_id, timestamp DESC);
+    CREATE INDEX idx_audit_logs_category_time ON audit_logs(event_category, timestamp DESC);
+    CREATE INDEX idx_audit_logs_event_type_time ON audit_logs(event_type, timestamp DESC);
+    CREATE INDEX idx_audit_logs_ip_time ON audit_logs(ip_address, timestamp DESC);
+
+    IF table_kind = 'r' THEN
+        FOR month_start IN
+            SELECT DISTINCT date_trunc('month', COALESCE(timestamp, created_at, LOCALTIMESTAMP))::DATE
+            FROM audit_logs_legacy
+        LOOP
+            PERFORM audit_logs_create_partition(month_start);
+        END LOOP;
+
+        INSERT INTO audit_logs (
+            id, timestamp, user_id, user_email, ip_address, event_type, event_category,
+            severity, resource, action, status, details, user_agent, created_at
+        )
+        SELECT
+            id, COALESCE(timestamp, created_at, LOCALTIMESTAMP), user_id, user_email, ip_address,
+            event_type, event_category, severity, resource, action, status, details,
+            user_agent, created_at
+        FROM audit_logs_legacy;
+
+        DROP TABLE audit_logs_legacy;
+    END IF;
+
+    PERFORM audit_logs_create_partitions(3);
+END;
+$$;
+
+COMMENT ON TABLE audit_logs IS 'Security audit trail for all important system events (partitioned monthly by timestamp)';
+COMMENT ON COLUMN audit_logs.event_type IS 'Specific event: login_success, login_failed, rate_limit_exceeded, etc.';
+COMMENT ON COLUMN audit_logs.event_category IS 'Broad category: auth, api, security, system';
+COMMENT ON COLUMN audit_logs.severity IS 'Severity level: info, warning, error, critical';
+COMMENT ON COLUMN audit_logs.details IS 'JSON object with additional context';
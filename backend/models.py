@@ -1,6 +1,9 @@
+from typing import Optional
 from pydantic import BaseModel, EmailStr, field_validator
-import re
-import html
+from validation import (
+    clean_title, clean_content, clean_message, normalize_tags,
+    check_password_strength, check_email
+)
 
 class UserRegister(BaseModel):
     """Model for user registration"""
@@ -10,35 +13,12 @@ class UserRegister(BaseModel):
 
     @field_validator('password')
     def validate_password(cls, v):
-        if len(v) < 8:
-            raise ValueError('Password must be at least 8 characters')
-        if len(v) > 72:
-            raise ValueError('Password cannot be longer than 72 characters (bcrypt limit)')
-        
-        # Password strength requirements
-        if not re.search(r'[A-Z]', v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        if not re.search(r'[a-z]', v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        if not re.search(r'\d', v):
-            raise ValueError('Password must contain at least one number')
-        if not re.search(r'[!@#$%^&*(),.?":{}|<>]', v):
-            raise ValueError('Password must contain at least one special character')
-        
-        return v
+        return check_password_strength(v)
     
     @field_validator('email')
     def validate_email(cls, v):
         # Additional email validation beyond EmailStr
-        if len(v) > 255:
-            raise ValueError('Email cannot be longer than 255 characters')
-        # Check for common SQL injection patterns in email
-        dangerous_patterns = ['--', ';', '/*', '*/', 'xp_', 'sp_', 'exec', 'execute']
-        email_lower = v.lower()
-        for pattern in dangerous_patterns:
-            if pattern in email_lower:
-                raise ValueError('Invalid email format')
-        return v
+        return check_email(v)
 
 class UserLogin(BaseModel):
     """Model for user login"""
@@ -65,54 +45,15 @@ class KnowledgeEntryCreate(BaseModel):
     
     @field_validator('title')
     def validate_title(cls, v):
-        if not v or len(v.strip()) < 1:
-            raise ValueError('Title cannot be empty')
-        if len(v) > 500:
-            raise ValueError('Title cannot be longer than 500 characters')
-        
-        # Sanitize HTML to prevent XSS
-        v = html.escape(v.strip())
-        
-        # Check for excessive whitespace or control characters
-        if re.search(r'[\x00-\x1F\x7F-\x9F]', v):
-            raise ValueError('Title contains invalid characters')
-        
-        return v
+        return clean_title(v)
     
     @field_validator('content')
     def validate_content(cls, v):
-        if not v or len(v.strip()) < 1:
-            raise ValueError('Content cannot be empty')
-        if len(v) > 50000:
-            raise ValueError('Content cannot be longer than 50,000 characters')
-        
-        # Sanitize HTML to prevent XSS (keep basic formatting)
-        v = html.escape(v.strip())
-        
-        return v
+        return clean_content(v)
     
     @field_validator('tags')
     def validate_tags(cls, v):
-        if len(v) > 10:
-            raise ValueError('Cannot have more than 10 tags')
-        
-        sanitized_tags = []
-        for tag in v:
-            if not tag or len(tag.strip()) == 0:
-                continue  # Skip empty tags
-            if len(tag) > 50:
-                raise ValueError('Each tag must be 50 characters or less')
-            
-            # Sanitize and normalize tag
-            clean_tag = html.escape(tag.strip().lower())
-            
-            # Check for invalid characters
-            if not re.match(r'^[a-z0-9\s\-_]+$', clean_tag):
-                raise ValueError(f'Tag "{tag}" contains invalid characters. Use only letters, numbers, spaces, hyphens, and underscores.')
-            
-            sanitized_tags.append(clean_tag)
-        
-        return sanitized_tags
+        return normalize_tags(v)
 
 class KnowledgeEntryUpdate(BaseModel):
     """Model for updating a knowledge entry"""
@@ -124,56 +65,19 @@ class KnowledgeEntryUpdate(BaseModel):
     def validate_title(cls, v):
         if v is None:
             return v
-        if len(v.strip()) < 1:
-            raise ValueError('Title cannot be empty')
-        if len(v) > 500:
-            raise ValueError('Title cannot be longer than 500 characters')
-        
-        # Sanitize HTML
-        v = html.escape(v.strip())
-        
-        # Check for control characters
-        if re.search(r'[\x00-\x1F\x7F-\x9F]', v):
-            raise ValueError('Title contains invalid characters')
-        
-        return v
+        return clean_title(v)
     
     @field_validator('content')
     def validate_content(cls, v):
         if v is None:
             return v
-        if len(v.strip()) < 1:
-            raise ValueError('Content cannot be empty')
-        if len(v) > 50000:
-            raise ValueError('Content cannot be longer than 50,000 characters')
-        
-        # Sanitize HTML
-        v = html.escape(v.strip())
-        
-        return v
+        return clean_content(v)
     
     @field_validator('tags')
     def validate_tags(cls, v):
         if v is None:
             return v
-        if len(v) > 10:
-            raise ValueError('Cannot have more than 10 tags')
-        
-        sanitized_tags = []
-        for tag in v:
-            if not tag or len(tag.strip()) == 0:
-                continue
-            if len(tag) > 50:
-                raise ValueError('Each tag must be 50 characters or less')
-            
-            clean_tag = html.escape(tag.strip().lower())
-            
-            if not re.match(r'^[a-z0-9\s\-_]+$', clean_tag):
-                raise ValueError(f'Tag "{tag}" contains invalid characters')
-            
-            sanitized_tags.append(clean_tag)
-        
-        return sanitized_tags
+        return normalize_tags(v)
 
 class KnowledgeEntryResponse(BaseModel):
     """Model for knowledge entry response"""
@@ -185,22 +89,40 @@ class KnowledgeEntryResponse(BaseModel):
     created_at: str
     updated_at: str
 
+    @classmethod
+    def from_row(cls, row) -> "KnowledgeEntryResponse":
+        """Build from a knowledge_entries row"""
+        return cls(
+            id=row['id'],
+            user_id=row['user_id'],
+            title=row['title'],
+            content=row['content'],
+            tags=row['tags'] or [],
+            created_at=str(row['created_at']),
+            updated_at=str(row['updated_at'])
+        )
+
+class KnowledgeEntryProjection(BaseModel):
+    """Entry list item with only the requested fields (GET /api/entries?fields=... or ?view=summary)"""
+    id: int
+    user_id: Optional[int] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+    tags: Optional[list[str]] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    content_length: Optional[int] = None
+    snippet: Optional[str] = None
+
+class TagCount(BaseModel):
+    """A tag and how many of the user's entries have it"""
+    tag: str
+    count: int
+
 class ChatMessage(BaseModel):
     """Model for chat messages"""
     message: str
     
     @field_validator('message')
     def validate_message(cls, v):
-        if not v or len(v.strip()) < 1:
-            raise ValueError('Message cannot be empty')
-        if len(v) > 2000:
-            raise ValueError('Message cannot be longer than 2,000 characters')
-        
-        # Sanitize HTML to prevent XSS
-        v = html.escape(v.strip())
-        
-        # Check for control characters
-        if re.search(r'[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F-\x9F]', v):
-            raise ValueError('Message contains invalid characters')
-        
-        return v
\ No newline at end of file
+        return clean_message(v)
@@ -0,0 +1,116 @@
+"""
+Password Hashing Executor
+Runs bcrypt on its own bounded worker pool so login/register floods
+cannot starve the threadpool that serves every other endpoint
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from fastapi import HTTPException, status
+import config  # noqa: F401  (loads .env)
+
+
+class PasswordHashExecutor:
+    """
+    Bounded executor for password hashing with admission control
+
+    At most `max_workers` hashes run at once and at most `max_queue` more
+    wait for a worker. Anything beyond that is rejected immediately with
+    a 503 instead of queueing behind a credential-stuffing wave.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16, wait_timeout: float = 10.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.wait_timeout = wait_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._in_flight = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def _timed(self, fn, *args):
+        """Run fn on a worker thread and record how long the hash took"""
+        with self._lock:
+            self._running += 1
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._total_seconds += elapsed
+                self._max_seconds = max(self._max_seconds, elapsed)
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def run(self, fn, *args):
+        """
+        Run a hashing function on the pool and wait for its result
+
+        Raises:
+            HTTPException: 503 if the pool and its queue are full
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy. Please try again shortly.",
+                headers={"Retry-After": "1"}
+            )
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(self._timed, fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.wait_timeout)
+        except FutureTimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy. Please try again shortly.",
+                headers={"Retry-After": "1"}
+            )
+
+    def get_stats(self) -> dict:
+        """Get queue depth and hash latency metrics"""
+        with self._lock:
+            in_flight = self._in_flight
+            running = self._running
+            completed = self._completed
+            avg_ms = (self._total_seconds / completed * 1000) if completed else 0.0
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": in_flight,
+                "running": running,
+                "queue_depth": max(0, in_flight - running),
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_hash_ms": round(avg_ms, 2),
+                "max_hash_ms": round(self._max_seconds * 1000, 2)
+            }
+
+
+# Global executor instance, sized via environment
+password_executor = PasswordHashExecutor(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", 4)),
+    max_queue=int(os.getenv("PASSWORD_HASH_QUEUE", 16))
+)
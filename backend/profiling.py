@@ -0,0 +1,349 @@
+"""
+Request Profiling
+On-demand sampling profiler for individual requests. A request is profiled when
+it carries `X-Profile: <PROFILING_TOKEN>` or is picked by PROFILE_SAMPLE_RATE.
+While it runs, a background thread samples the stacks of the threads serving
+it and attributes the time to validation, DB, Redis, bcrypt, JSON, Anthropic
+or app code. Profiles are stored in Redis and downloaded from
+/api/admin/profiles/{id} as speedscope JSON or collapsed stacks.
+
+Requests that are not profiled skip all of this: the middleware passes them
+straight through and the endpoint wrapper only reads a context variable.
+"""
+import asyncio
+import functools
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from cache_service import redis_client
+
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 2))
+PROFILE_TTL_SECONDS = int(os.getenv("PROFILE_TTL_SECONDS", 86400))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", 100))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_INDEX_KEY = "profiles:index"
+
+FORMATS = {
+    "speedscope": "application/json",
+    "collapsed": "text/plain",
+}
+
+# Checked in order: I/O categories win over the JSON/validation work done inside them
+CATEGORIES = (
+    ("bcrypt", ("/passlib/", "/bcrypt/", "/password_executor.py")),
+    ("anthropic", ("/anthropic/", "/httpx/", "/httpcore/")),
+    ("db", ("/psycopg2/", "/db.py")),
+    ("redis", ("/redis/",)),
+    ("json", ("/json/", "/fastapi/encoders.py", "/starlette/responses.py")),
+    ("validation", ("/pydantic/", "/pydantic_core/", "/fastapi/_compat", "/fastapi/dependencies/", "/validation.py", "/models.py")),
+)
+CATEGORY_ORDER = [name for name, _ in CATEGORIES] + ["app"]
+
+# Frames where a thread is parked waiting for work, not serving the request
+IDLE_FILES = ("/selectors.py",)
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+# code object -> (frame label, category); shared by all profiles
+_frame_cache = {}
+
+
+def _describe(code) -> tuple:
+    """Frame label and category for a code object"""
+    cached = _frame_cache.get(code)
+    if cached is None:
+        filename = code.co_filename.replace("\\", "/")
+        short = filename.split("site-packages/", 1)[-1] if "site-packages/" in filename else os.path.basename(filename)
+        category = None
+        for name, patterns in CATEGORIES:
+            if any(pattern in filename for pattern in patterns):
+                category = name
+                break
+        cached = _frame_cache[code] = (f"{code.co_name} ({short}:{code.co_firstlineno})", category)
+    return cached
+
+
+def classify(categories: set) -> str:
+    """Pick the category a sample counts towards"""
+    for name in CATEGORY_ORDER:
+        if name in categories:
+            return name
+    return "app"
+
+
+class RequestProfile:
+    """Stack samples and per-category time for one request"""
+
+    def __init__(self, method: str, path: str, trigger: str, interval: float):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.interval = interval
+        self.started_at = datetime.utcnow()
+        self.stacks = {}          # collapsed stack -> microseconds
+        self.breakdown = {}       # category -> seconds
+        self.samples = 0
+        self.route = None
+        self.status = None
+        self.duration = 0.0
+        self._loop_thread = threading.get_ident()
+        self._threads = {}        # thread ident -> nesting depth
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+
+    def enter_thread(self):
+        """Mark the calling worker thread as serving this request"""
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+
+    def exit_thread(self):
+        ident = threading.get_ident()
+        with self._lock:
+            depth = self._threads.get(ident, 0) - 1
+            if depth > 0:
+                self._threads[ident] = depth
+            else:
+                self._threads.pop(ident, None)
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._sampler.start()
+
+    def finish(self, route: Optional[str], status: Optional[int]):
+        """Stop sampling; the sampler thread stores the profile on its way out"""
+        self.duration = time.perf_counter() - self._start
+        self.route = route
+        self.status = status
+        self._stop.set()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+        save_profile(self)
+
+    def _sample(self, weight: float):
+        with self._lock:
+            # Worker threads while the endpoint runs, otherwise the event loop
+            idents = list(self._threads) or [self._loop_thread]
+        frames = sys._current_frames()
+
+        for ident in idents:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            labels = []
+            categories = set()
+            leaf = True
+            while frame is not None:
+                code = frame.f_code
+                if leaf and code.co_filename.endswith(IDLE_FILES):
+                    break
+                leaf = False
+                label, category = _describe(code)
+                labels.append(label)
+                if category:
+                    categories.add(category)
+                frame = frame.f_back
+            if not labels:
+                continue
+
+            stack = ";".join(reversed(labels))
+            micros = int(weight * 1_000_000)
+            category = classify(categories)
+            self.stacks[stack] = self.stacks.get(stack, 0) + micros
+            self.breakdown[category] = self.breakdown.get(category, 0.0) + weight
+            self.samples += 1
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 2),
+            "samples": self.samples,
+            "breakdown_ms": {
+                name: round(self.breakdown[name] * 1000, 2)
+                for name in CATEGORY_ORDER if name in self.breakdown
+            }
+        }
+
+
+# ============ STORAGE ============
+
+def save_profile(profile: RequestProfile):
+    """Store a finished profile in Redis, keeping the newest PROFILE_MAX_STORED"""
+    try:
+        pipe = redis_client.pipeline()
+        pipe.setex(f"profile:{profile.id}:summary", PROFILE_TTL_SECONDS, json.dumps(profile.summary()))
+        pipe.setex(f"profile:{profile.id}:stacks", PROFILE_TTL_SECONDS, json.dumps(profile.stacks))
+        pipe.zadd(PROFILE_INDEX_KEY, {profile.id: time.time()})
+        pipe.zremrangebyrank(PROFILE_INDEX_KEY, 0, -PROFILE_MAX_STORED - 1)
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️  Failed to store profile {profile.id}: {e}")
+
+
+def list_profiles(limit: int = 50) -> list:
+    """Summaries of the most recent profiles, newest first"""
+    ids = redis_client.zrevrange(PROFILE_INDEX_KEY, 0, limit - 1)
+    if not ids:
+        return []
+    summaries = redis_client.mget([f"profile:{profile_id}:summary" for profile_id in ids])
+    return [json.loads(summary) for summary in summaries if summary]
+
+
+def to_collapsed(stacks: dict) -> str:
+    """Brendan Gregg collapsed-stack format (values are microseconds)"""
+    return "".join(f"{stack} {value}\n" for stack, value in stacks.items())
+
+
+def to_speedscope(summary: dict, stacks: dict) -> dict:
+    """speedscope sampled profile (https://www.speedscope.app)"""
+    frames = []
+    frame_index = {}
+    samples = []
+    weights = []
+    for stack, value in stacks.items():
+        sample = []
+        for label in stack.split(";"):
+            if label not in frame_index:
+                frame_index[label] = len(frames)
+                frames.append({"name": label})
+            sample.append(frame_index[label])
+        samples.append(sample)
+        weights.append(value)
+
+    name = f"{summary['method']} {summary['path']} ({summary['id']})"
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "knowledge-base-api",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "microseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights
+        }]
+    }
+
+
+def load_profile(profile_id: str, fmt: str = "speedscope") -> Optional[str]:
+    """Render a stored profile, or None if it doesn't exist (or expired)"""
+    summary, stacks = redis_client.mget([f"profile:{profile_id}:summary", f"profile:{profile_id}:stacks"])
+    if not summary or stacks is None:
+        return None
+    stacks = json.loads(stacks)
+    if fmt == "collapsed":
+        return to_collapsed(stacks)
+    return json.dumps(to_speedscope(json.loads(summary), stacks))
+
+
+# ============ HOOKS ============
+
+def _mark_thread(endpoint):
+    """Wrap a sync endpoint so the worker thread running it is sampled"""
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        profile.enter_thread()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profile.exit_thread()
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute whose sync endpoints report their worker thread to the profiler
+    Install with `app.router.route_class = ProfiledRoute` before adding routes
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            endpoint = _mark_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware that decides which requests to profile"""
+
+    def __init__(self, app, token: Optional[str] = PROFILING_TOKEN,
+                 sample_rate: float = PROFILE_SAMPLE_RATE, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.app = app
+        self.token = token.encode() if token else None
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.enabled = bool(self.token) or sample_rate > 0
+
+    def _trigger(self, scope) -> Optional[str]:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    if hmac.compare_digest(value, self.token):
+                        return "header"
+                    break
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger = self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], trigger, self.interval)
+        status_holder = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        context_token = _current_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(context_token)
+            route = scope.get("route")
+            profile.finish(getattr(route, "path", None), status_holder[0])
@@ -0,0 +1,261 @@
+"""
+Query Log
+Per-shape statement statistics and a slow query log for the instrumented
+cursor in db.py. Statements are grouped by fingerprint: literals and bind
+parameters become '?' and IN lists collapse, so every call of the same
+query shape lands in one row with its count, total and max time.
+
+Statements slower than SLOW_QUERY_MS go to the slow log. A sample of them
+(SLOW_QUERY_EXPLAIN_RATE, at most once per shape per cooldown) also get a
+plan captured on the same connection: EXPLAIN (ANALYZE, BUFFERS) for reads,
+run in a read-only subtransaction that is rolled back, and plain EXPLAIN for
+writes and for reads that turn out to call a function that writes (such as
+audit_logs_create_partitions), so nothing is changed twice.
+
+Stats are per process, like the metrics registry.
+"""
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMS = re.compile(r"%\(\w+\)s|%s")
+_NUMBERS = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?(?![\w.])")
+_SPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\?(?:, \?)+\)")
+_VALUES_ROWS = re.compile(r"(\(\?(?:, \?)*\))(?:, \1)+")
+
+# Statement types run again under EXPLAIN ANALYZE, read-only
+_READS = ("SELECT", "WITH", "VALUES", "TABLE")
+_WRITES = ("INSERT", "UPDATE", "DELETE")
+
+SORT_KEYS = ("total", "mean", "max", "calls")
+
+
+def fingerprint(query: str) -> str:
+    """Normalize a statement so calls that differ only in values group together"""
+    query = _COMMENTS.sub(" ", query)
+    query = _STRINGS.sub("?", query)
+    query = _PARAMS.sub("?", query)
+    query = _NUMBERS.sub("?", query)
+    query = _SPACE.sub(" ", query).strip().rstrip(";")
+    query = re.sub(r"\( ", "(", re.sub(r" \)", ")", query))
+    query = _VALUES_ROWS.sub(r"\1, ...", query)
+    return _IN_LIST.sub("(?, ...)", query)
+
+
+class QueryShape:
+    """Running totals for one query fingerprint"""
+
+    __slots__ = ("id", "query", "operation", "calls", "total", "max", "rows", "slow_calls",
+                 "last_seen", "last_explained")
+
+    def __init__(self, query: str):
+        self.id = hashlib.sha1(query.encode()).hexdigest()[:12]
+        self.query = query
+        self.operation = query.split(" ", 1)[0].upper() if query else "UNKNOWN"
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+        self.last_seen = None
+        self.last_explained = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "query": self.query,
+            "operation": self.operation,
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 2),
+            "mean_ms": round(self.total / self.calls * 1000, 3) if self.calls else 0.0,
+            "max_ms": round(self.max * 1000, 2),
+            "rows": self.rows,
+            "slow_calls": self.slow_calls,
+            "last_seen": self.last_seen.isoformat() if self.last_seen else None
+        }
+
+
+class QueryLog:
+    """
+    Statement statistics keyed by fingerprint plus the recent slow statements
+
+    Args:
+        slow_ms: Statements at least this slow are logged
+        explain_rate: Fraction of slow statements that get a plan captured
+        explain_cooldown: Seconds between plans for the same query shape
+        max_shapes: Distinct fingerprints tracked before new ones are lumped together
+        slow_log_size: Slow statements kept for /api/admin/queries/slow
+    """
+
+    OVERFLOW_QUERY = "(other queries)"
+
+    def __init__(self, slow_ms: float = 200, explain_rate: float = 0.1, explain_cooldown: float = 60,
+                 max_shapes: int = 1000, slow_log_size: int = 100):
+        self.slow_seconds = slow_ms / 1000
+        self.explain_rate = explain_rate
+        self.explain_cooldown = explain_cooldown
+        self.max_shapes = max_shapes
+        self._shapes = {}
+        self._fingerprints = {}  # raw query text -> fingerprint
+        self._slow = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, query: str) -> str:
+        cached = self._fingerprints.get(query)
+        if cached is None:
+            cached = fingerprint(query)
+            if len(self._fingerprints) < self.max_shapes * 4:
+                self._fingerprints[query] = cached
+        return cached
+
+    def record(self, cursor, query, vars, elapsed: float, can_explain: bool = True):
+        """Record one executed statement; called by db.TimedCursor"""
+        if isinstance(query, bytes):
+            query = query.decode(errors="replace")
+        elif not isinstance(query, str):
+            # psycopg2.sql.Composed
+            query = query.as_string(cursor)
+
+        normalized = self._fingerprint(query)
+        slow = elapsed >= self.slow_seconds
+        explain = False
+
+        with self._lock:
+            shape = self._shapes.get(normalized)
+            if shape is None:
+                if len(self._shapes) >= self.max_shapes:
+                    normalized = self.OVERFLOW_QUERY
+                    shape = self._shapes.get(normalized)
+                if shape is None:
+                    shape = self._shapes[normalized] = QueryShape(normalized)
+            shape.calls += 1
+            shape.total += elapsed
+            shape.max = max(shape.max, elapsed)
+            if cursor.rowcount > 0:
+                shape.rows += cursor.rowcount
+            shape.last_seen = datetime.utcnow()
+
+            if slow:
+                shape.slow_calls += 1
+                now = time.monotonic()
+                if (can_explain and random.random() < self.explain_rate
+                        and now - shape.last_explained >= self.explain_cooldown):
+                    shape.last_explained = now
+                    explain = True
+
+        if not slow:
+            return
+
+        entry = {
+            "id": shape.id,
+            "query": shape.query,
+            "duration_ms": round(elapsed * 1000, 2),
+            "rows": cursor.rowcount,
+            "at": datetime.utcnow().isoformat(),
+            "plan": None,
+            "analyzed": False
+        }
+        if explain and not getattr(cursor, "name", None):
+            entry["plan"], entry["analyzed"] = explain_plan(cursor, query, vars)
+        self._slow.append(entry)
+        print(f"🐢 Slow query {entry['duration_ms']}ms [{shape.id}]: {shape.query[:200]}")
+
+    def top_queries(self, limit: int = 20, sort: str = "total") -> list:
+        """Most expensive query shapes, by total, mean or max time or call count"""
+        keys = {
+            "total": lambda shape: shape.total,
+            "mean": lambda shape: shape.total / shape.calls,
+            "max": lambda shape: shape.max,
+            "calls": lambda shape: shape.calls,
+        }
+        with self._lock:
+            shapes = sorted(self._shapes.values(), key=keys[sort], reverse=True)[:limit]
+            return [shape.to_dict() for shape in shapes]
+
+    def recent_slow(self, limit: int = 50) -> list:
+        """Most recent slow statements, newest first"""
+        with self._lock:
+            return list(self._slow)[::-1][:limit]
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+            self._slow.clear()
+
+
+def explain_plan(cursor, query: str, vars) -> tuple:
+    """
+    Capture the plan for a statement that just ran on `cursor`'s connection
+
+    Reads run again under EXPLAIN ANALYZE in a read-only subtransaction, so a
+    SELECT whose functions write fails instead of writing twice; it then gets
+    a plain EXPLAIN like writes do. Returns (plan text or None, analyzed).
+    """
+    operation = query.lstrip().split(None, 1)[0].upper() if query.strip() else ""
+    if operation not in _READS and operation not in _WRITES:
+        return None, False
+
+    try:
+        bound = cursor.mogrify(query, vars)
+        if operation in _READS:
+            try:
+                return _explain(cursor.connection, b"EXPLAIN (ANALYZE, BUFFERS) " + bound, read_only=True), True
+            except psycopg2.errors.ReadOnlySqlTransaction:
+                pass
+        return _explain(cursor.connection, b"EXPLAIN " + bound, read_only=False), False
+    except psycopg2.Error as e:
+        return f"EXPLAIN failed: {e}", False
+
+
+def _explain(conn, statement: bytes, read_only: bool) -> str:
+    """
+    Run one EXPLAIN in a savepoint (or its own transaction on an autocommit
+    connection) so a failure can't abort the caller's transaction. Read-only
+    runs are always rolled back, which also ends the read-only mode.
+    """
+    explain_cursor = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+    if conn.autocommit:
+        begin = ["BEGIN READ ONLY" if read_only else "BEGIN"]
+        done, undo = ["ROLLBACK"], ["ROLLBACK"]
+    else:
+        begin = ["SAVEPOINT query_log_explain"] + (["SET TRANSACTION READ ONLY"] if read_only else [])
+        undo = ["ROLLBACK TO SAVEPOINT query_log_explain", "RELEASE SAVEPOINT query_log_explain"]
+        done = undo if read_only else ["RELEASE SAVEPOINT query_log_explain"]
+    try:
+        for command in begin:
+            explain_cursor.execute(command)
+        try:
+            explain_cursor.execute(statement)
+            plan = "\n".join(row[0] for row in explain_cursor.fetchall())
+        except psycopg2.Error:
+            try:
+                for command in undo:
+                    explain_cursor.execute(command)
+            except psycopg2.Error:
+                pass
+            raise
+        for command in done:
+            explain_cursor.execute(command)
+        return plan
+    finally:
+        explain_cursor.close()
+
+
+# Global query log, configured via environment
+query_log = QueryLog(
+    slow_ms=float(os.getenv("SLOW_QUERY_MS", 200)),
+    explain_rate=float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", 0.1)),
+    explain_cooldown=float(os.getenv("SLOW_QUERY_EXPLAIN_COOLDOWN", 60))
+)
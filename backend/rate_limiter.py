@@ -1,78 +1,176 @@
-import redis
+import threading
 import time
 from fastapi import HTTPException, status
 
 # Use the same Redis client from cache_service
-from cache_service import redis_client
+from cache_service import redis_client, async_redis_client, REDIS_DOWN_ERRORS
+from circuit_breaker import CircuitOpenError
+from metrics import rate_limit_rejections_total, rate_limit_fallbacks_total
+
+# Redis unreachable, or the circuit breaker failing fast because it was
+REDIS_UNAVAILABLE = REDIS_DOWN_ERRORS + (CircuitOpenError,)
 
 class RateLimiter:
     """
     Token bucket rate limiter using Redis
     Default: 100 requests per minute per user
+    
+    While Redis is unavailable the same fixed windows are counted in process
+    memory instead. That is approximate (each worker counts on its own and the
+    counts restart when Redis comes back) but keeps limiting without failing
+    or slowing the request.
     """
     
-    def __init__(self, max_requests: int = 100, window_seconds: int = 60):
+    # In-process windows kept before expired ones are swept
+    LOCAL_MAX_KEYS = 10000
+    
+    def __init__(self, max_requests: int = 100, window_seconds: int = 60, name: str = "general",
+                 key_prefix: str = "rate_limit:user", key_suffix: str = ""):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
+        self.name = name  # label for rejection metrics
+        self.key_prefix = key_prefix
+        self.key_suffix = key_suffix
+        self._local = {}  # key -> [count, window_end], only used while Redis is down
+        self._local_lock = threading.Lock()
+    
+    def key(self, user_id) -> str:
+        """Redis key holding the counter for this user/identifier"""
+        return f"{self.key_prefix}:{user_id}{self.key_suffix}"
     
     def check_rate_limit(self, user_id: int) -> dict:
         """
         Check if user has exceeded rate limit
         Returns dict with: allowed (bool), remaining (int), reset_time (int)
         """
-        key = f"rate_limit:user:{user_id}"
+        key = self.key(user_id)
         current_time = int(time.time())
-        
+        try:
+            return self._check_redis(key, current_time)
+        except REDIS_UNAVAILABLE:
+            rate_limit_fallbacks_total.inc(self.name)
+            return self._check_local(key, current_time)
+    
+    async def check_rate_limit_async(self, user_id) -> dict:
+        """check_rate_limit on the asyncio Redis client, for callers on the event loop"""
+        key = self.key(user_id)
+        current_time = int(time.time())
+        try:
+            return await self._check_redis_async(key, current_time)
+        except REDIS_UNAVAILABLE:
+            rate_limit_fallbacks_total.inc(self.name)
+            return self._check_local(key, current_time)
+    
+    def _check_redis(self, key: str, current_time: int) -> dict:
         # Get current count
         pipe = redis_client.pipeline()
         pipe.get(key)
         pipe.ttl(key)
         results = pipe.execute()
         
-        current_count = int(results[0]) if results[0] else 0
-        ttl = results[1]
+        update, result = self._window(results[0], results[1], current_time)
+        if update == "start":
+            redis_client.setex(key, self.window_seconds, 1)
+        elif update == "incr":
+            redis_client.incr(key)
+        return result
+    
+    async def _check_redis_async(self, key: str, current_time: int) -> dict:
+        pipe = async_redis_client.pipeline()
+        pipe.get(key)
+        pipe.ttl(key)
+        results = await pipe.execute()
+        
+        update, result = self._window(results[0], results[1], current_time)
+        if update == "start":
+            await async_redis_client.setex(key, self.window_seconds, 1)
+        elif update == "incr":
+            await async_redis_client.incr(key)
+        return result
+    
+    def _window(self, count, ttl, current_time: int) -> tuple:
+        """
+        Decide on the window read from Redis
+        Returns (write to make: 'start', 'incr' or None, result)
+        """
+        current_count = int(count) if count else 0
         
         # If key doesn't exist or expired, start new window
         if current_count == 0 or ttl == -2:
-            redis_client.setex(key, self.window_seconds, 1)
-            return {
-                "allowed": True,
-                "remaining": self.max_requests - 1,
-                "reset_time": current_time + self.window_seconds,
-                "limit": self.max_requests
-            }
+            return "start", self._result(True, self.max_requests - 1, current_time + self.window_seconds)
         
         # Check if limit exceeded
         if current_count >= self.max_requests:
-            reset_time = current_time + ttl
-            return {
-                "allowed": False,
-                "remaining": 0,
-                "reset_time": reset_time,
-                "limit": self.max_requests
-            }
+            rate_limit_rejections_total.inc(self.name)
+            return None, self._result(False, 0, current_time + ttl)
         
         # Increment counter
-        redis_client.incr(key)
-        
+        return "incr", self._result(True, self.max_requests - current_count - 1, current_time + ttl)
+    
+    def _check_local(self, key: str, current_time: int) -> dict:
+        """Same fixed window as _check_redis, counted in this process"""
+        with self._local_lock:
+            window = self._local.get(key)
+            if window is None or window[1] <= current_time:
+                if len(self._local) >= self.LOCAL_MAX_KEYS:
+                    self._sweep_local(current_time)
+                self._local[key] = [1, current_time + self.window_seconds]
+                return self._result(True, self.max_requests - 1, current_time + self.window_seconds)
+            
+            count, window_end = window
+            if count >= self.max_requests:
+                rate_limit_rejections_total.inc(self.name)
+                return self._result(False, 0, window_end)
+            
+            window[0] = count + 1
+            return self._result(True, self.max_requests - count - 1, window_end)
+    
+    def _sweep_local(self, current_time: int):
+        """Drop expired local windows; caller holds the lock"""
+        self._local = {key: window for key, window in self._local.items() if window[1] > current_time}
+        if len(self._local) >= self.LOCAL_MAX_KEYS:
+            self._local.clear()
+    
+    def local_status(self, user_id) -> tuple:
+        """(count, seconds left) of the in-process window, for status reads while Redis is down"""
+        current_time = int(time.time())
+        with self._local_lock:
+            window = self._local.get(self.key(user_id))
+        if window is None or window[1] <= current_time:
+            return 0, -2
+        return window[0], window[1] - current_time
+    
+    def _result(self, allowed: bool, remaining: int, reset_time: int) -> dict:
         return {
-            "allowed": True,
-            "remaining": self.max_requests - current_count - 1,
-            "reset_time": current_time + ttl,
+            "allowed": allowed,
+            "remaining": remaining,
+            "reset_time": reset_time,
             "limit": self.max_requests
         }
 
 # Create rate limiter instances for different endpoints
-rate_limiter = RateLimiter(max_requests=100, window_seconds=60)
-auth_rate_limiter = RateLimiter(max_requests=5, window_seconds=900)  # 5 attempts per 15 min
-chat_rate_limiter = RateLimiter(max_requests=10, window_seconds=3600)  # 10 per hour
+rate_limiter = RateLimiter(max_requests=100, window_seconds=60, name="general")
+auth_rate_limiter = RateLimiter(max_requests=5, window_seconds=900, name="auth")  # 5 attempts per 15 min
+chat_rate_limiter = RateLimiter(
+    max_requests=10, window_seconds=3600, name="chat_hourly", key_prefix="rate_limit:user:chat:user"
+)  # 10 per hour
+ai_daily_limiter = RateLimiter(
+    max_requests=7, window_seconds=86400, name="ai_daily", key_prefix="ai_limit:user", key_suffix=":daily"
+)  # 7 AI requests per 24 hours
+autocomplete_rate_limiter = RateLimiter(
+    max_requests=600, window_seconds=60, name="autocomplete", key_prefix="rate_limit:user:autocomplete:user"
+)  # per keystroke, so its own budget instead of the general one
+ip_rate_limiter = RateLimiter(
+    max_requests=300, window_seconds=3600, name="ip_global", key_prefix="global_rate_limit:ip"
+)  # 300 per hour per IP, across the whole API
 
-def check_rate_limit(user_id: int):
+def check_rate_limit(user_id: int, limiter: RateLimiter = None):
     """
     Check rate limit and raise HTTPException if exceeded
     Use as: check_rate_limit(current_user['user_id'])
+    Pass `limiter` for endpoints with their own budget (default: rate_limiter)
     """
-    result = rate_limiter.check_rate_limit(user_id)
+    result = (limiter or rate_limiter).check_rate_limit(user_id)
     
     if not result["allowed"]:
         raise HTTPException(
@@ -88,66 +186,76 @@ def check_rate_limit(user_id: int):
     
     return result
 
-def check_daily_ai_limit(user_id: int, limit: int = 20):
+def check_daily_ai_limit(user_id: int):
     """
     Check daily AI request limit (separate from general rate limit)
-    Default: 20 AI requests per 24 hours
+    Limit comes from ai_daily_limiter (7 AI requests per 24 hours)
     
     Args:
         user_id: The user's ID
-        limit: Maximum AI requests per day (default 20)
     
     Raises:
         HTTPException: If daily limit is exceeded
     """
-    key = f"ai_limit:user:{user_id}:daily"
-    window_seconds = 86400  # 24 hours
-    current_time = int(time.time())
-    
-    # Get current count and TTL
-    pipe = redis_client.pipeline()
-    pipe.get(key)
-    pipe.ttl(key)
-    results = pipe.execute()
-    
-    current_count = int(results[0]) if results[0] else 0
-    ttl = results[1]
+    result = ai_daily_limiter.check_rate_limit(user_id)
     
-    # If key doesn't exist or expired, start new window
-    if current_count == 0 or ttl == -2:
-        redis_client.setex(key, window_seconds, 1)
-        return {
-            "allowed": True,
-            "remaining": limit - 1,
-            "reset_time": current_time + window_seconds
-        }
-    
-    # Check if limit exceeded
-    if current_count >= limit:
-        reset_time = current_time + ttl
+    if not result["allowed"]:
+        ttl = result["reset_time"] - int(time.time())
         hours_remaining = ttl // 3600
         minutes_remaining = (ttl % 3600) // 60
         
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Daily AI request limit exceeded ({limit} requests per day). "
+            detail=f"Daily AI request limit exceeded ({result['limit']} requests per day). "
                    f"Resets in {hours_remaining}h {minutes_remaining}m.",
             headers={
-                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Limit": str(result["limit"]),
                 "X-RateLimit-Remaining": "0",
-                "X-RateLimit-Reset": str(reset_time),
+                "X-RateLimit-Reset": str(result["reset_time"]),
                 "Retry-After": str(ttl)
             }
         )
     
-    # Increment counter
-    redis_client.incr(key)
+    return result
+
+def get_limit_status(checks: list) -> dict:
+    """
+    Read the state of several limiters in one pipelined round trip, without
+    counting a request against any of them
+    
+    Args:
+        checks: (limiter, identifier) pairs
     
-    return {
-        "allowed": True,
-        "remaining": limit - current_count - 1,
-        "reset_time": current_time + ttl
-    }
+    Returns:
+        Status per limiter name: used, remaining, limit, window and reset time
+    """
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for limiter, identifier in checks:
+            key = limiter.key(identifier)
+            pipe.get(key)
+            pipe.ttl(key)
+        results = pipe.execute()
+    except REDIS_UNAVAILABLE:
+        # Report the in-process windows the limiters are using meanwhile
+        results = [value for limiter, identifier in checks for value in limiter.local_status(identifier)]
+    
+    current_time = int(time.time())
+    limits = {}
+    for i, (limiter, _) in enumerate(checks):
+        count, ttl = results[2 * i], results[2 * i + 1]
+        used = int(count) if count else 0
+        # No key (or no expiry) means the next request starts a fresh window
+        resets_in = ttl if ttl > 0 else limiter.window_seconds
+        limits[limiter.name] = {
+            "used": used,
+            "remaining": max(0, limiter.max_requests - used),
+            "limit": limiter.max_requests,
+            "window_seconds": limiter.window_seconds,
+            "reset_time": current_time + resets_in,
+            "resets_in_seconds": resets_in
+        }
+    return limits
 
 def check_auth_rate_limit(identifier: str):
     """
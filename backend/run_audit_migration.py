@@ -1,15 +1,28 @@
 """
 Run the audit logs migration
-Creates the audit_logs table with proper indexes
+Creates the audit_logs table partitioned by month (converting an existing
+unpartitioned table and its data in place)
+
+Usage:
+    python run_audit_migration.py             # create / convert the table
+    python run_audit_migration.py --maintain  # create future partitions, drop expired ones
 """
 import psycopg2
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def run_migration():
-    """Run the audit logs migration"""
+# Applied in order, all are safe to re-run
+MIGRATIONS = [
+    'partition_audit_logs.sql',
+    'create_audit_rollups.sql',
+    'audit_logs_keyset_indexes.sql',
+]
+
+def get_connection():
+    """Get database connection"""
     database_url = os.getenv("DATABASE_URL")
     
     if database_url:
@@ -21,17 +34,23 @@ def run_migration():
             user="",
             password=""
         )
-    
+    return conn
+
+def run_migration():
+    """Run the audit logs migration"""
+    conn = get_connection()
     cursor = conn.cursor()
     
-    # Read migration file
-    with open('migrations/create_audit_logs.sql', 'r') as f:
-        migration_sql = f.read()
-    
     try:
-        cursor.execute(migration_sql)
+        for migration in MIGRATIONS:
+            # Read migration file
+            migration_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations', migration)
+            with open(migration_path, 'r') as f:
+                migration_sql = f.read()
+            cursor.execute(migration_sql)
+            print(f"  ▶ applied {migration}")
         conn.commit()
-        print("✅ Audit logs table created successfully!")
+        print("✅ Audit logs table is partitioned by month, with event rollups!")
         
         # Verify table was created
         cursor.execute("""
@@ -57,6 +76,8 @@ def run_migration():
         for idx in indexes:
             print(f"  - {idx[0]}")
         
+        print_partitions(cursor)
+        
     except Exception as e:
         conn.rollback()
         print(f"❌ Migration failed: {e}")
@@ -65,5 +86,51 @@ def run_migration():
         cursor.close()
         conn.close()
 
+def print_partitions(cursor):
+    """Print each partition of audit_logs with its row estimate"""
+    cursor.execute("""
+        SELECT c.relname, c.reltuples::BIGINT
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'audit_logs'::regclass
+        ORDER BY c.relname
+    """)
+    partitions = cursor.fetchall()
+    print(f"\n🗂️  {len(partitions)} partitions:")
+    for name, rows in partitions:
+        print(f"  - {name} (~{max(rows, 0)} rows)")
+
+def run_maintenance(months_ahead: int = 3, retention_months: int = None):
+    """
+    Create upcoming monthly partitions and drop ones past retention
+    Meant to be run daily from cron / a scheduled job
+    """
+    if retention_months is None:
+        retention_months = int(os.getenv("AUDIT_LOG_RETENTION_MONTHS", 12))
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT audit_logs_create_partitions(%s)", (months_ahead,))
+        created = cursor.fetchone()[0]
+        cursor.execute("SELECT audit_logs_drop_partitions(%s)", (retention_months,))
+        dropped = cursor.fetchone()[0]
+        cursor.execute("SELECT audit_event_rollups_prune(48, %s)", (retention_months,))
+        pruned = cursor.fetchone()[0]
+        conn.commit()
+        print(f"✅ Created {created} partitions, dropped {dropped} past {retention_months} month retention")
+        print(f"🧹 Pruned {pruned} expired rollup buckets")
+        print_partitions(cursor)
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Maintenance failed: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
 if __name__ == "__main__":
-    run_migration()
+    if "--maintain" in sys.argv:
+        run_maintenance()
+    else:
+        run_migration()
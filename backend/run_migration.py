@@ -0,0 +1,75 @@
+"""
+Run SQL migrations
+Applies migration files in one transaction, in the order given. Every file
+in migrations/ is safe to re-run; the counter migrations re-sync their
+counts from the source tables when they are.
+
+Usage:
+    python run_migration.py create_tag_counts.sql
+    python run_migration.py migrations/create_search_index.sql create_usage_counters.sql
+
+A bare file name is looked up in migrations/. The audit log tables have their
+own runner with partition maintenance (run_audit_migration.py).
+"""
+import os
+import sys
+
+import psycopg2
+from dotenv import load_dotenv
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+
+def migration_path(name: str) -> str:
+    """The file itself if it exists, otherwise migrations/<name>"""
+    if os.path.exists(name):
+        return name
+    return os.path.join(MIGRATIONS_DIR, name)
+
+
+def apply_migration(cursor, name: str):
+    """Execute one migration file on the cursor's connection; the caller commits"""
+    with open(migration_path(name), 'r') as f:
+        cursor.execute(f.read())
+
+
+def get_connection():
+    """Get database connection"""
+    database_url = os.getenv("DATABASE_URL")
+
+    if database_url:
+        return psycopg2.connect(database_url)
+    return psycopg2.connect(
+        host="localhost",
+        database="knowledge_base",
+        user="",
+        password=""
+    )
+
+
+def run_migrations(names: list):
+    """Apply each file in one transaction; nothing is kept if any fails"""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        for name in names:
+            apply_migration(cursor, name)
+            print(f"  ▶ applied {os.path.basename(name)}")
+        conn.commit()
+        print(f"✅ {len(names)} migration(s) applied!")
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Migration failed: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    load_dotenv()
+    run_migrations(sys.argv[1:])
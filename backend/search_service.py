@@ -0,0 +1,223 @@
+"""
+Search Service
+Entry search for GET /api/search: free text, tag filters and date ranges,
+ranked and paginated, in one SQL statement per request.
+
+Free text uses the search_vector column (title weighted above content, GIN
+indexed; migrations/create_search_index.sql) with websearch_to_tsquery, so
+"quoted phrases", OR and -exclusions work as users expect. Tag filters use
+the GIN index on tags. Highlighted snippets are built with ts_headline for
+the returned page only, not for every match.
+
+Results are cached per user and normalized query, tagged with the entry list
+version like the entry projections, so any write makes them a miss.
+"""
+import hashlib
+import json
+
+from cache_service import get_versioned_cache, set_versioned_cache
+from entry_views import SNIPPET_CHARS, make_snippet
+from db import get_db_connection
+from validation import normalize_tags, MESSAGE_MAX_LENGTH
+
+SEARCH_TTL = 300  # 5 minutes
+MAX_LIMIT = 50
+MAX_OFFSET = 1000
+SORTS = ("relevance", "updated", "created")
+
+# Content is HTML-escaped on write, so <mark> is the only markup in a snippet
+HEADLINE_OPTIONS = (
+    'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, '
+    'MaxFragments=2, FragmentDelimiter=" … "'
+)
+
+# Sort columns, all descending; id last so pages never overlap
+_ORDER_BY = {
+    "relevance": ("rank", "updated_at", "id"),
+    "updated": ("updated_at", "id"),
+    "created": ("created_at", "id"),
+}
+
+
+def _order_by(sort: str, table: str = "") -> str:
+    return ", ".join(f"{table}{column} DESC" for column in _ORDER_BY[sort])
+
+
+def normalize_search(q: str = None, tags: list = None, any_tags: list = None, exclude_tags: list = None,
+                     created_after=None, created_before=None, updated_after=None, updated_before=None,
+                     sort: str = None, page: int = 1, limit: int = 20) -> dict:
+    """
+    Validate search params into a canonical dict (also the cache key)
+
+    Raises:
+        ValueError: If a tag, the sort, the page or the text is invalid
+    """
+    q = " ".join((q or "").split())
+    if len(q) > MESSAGE_MAX_LENGTH:
+        raise ValueError(f"Search text cannot be longer than {MESSAGE_MAX_LENGTH:,} characters")
+    sort = sort or ("relevance" if q else "updated")
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(SORTS)}")
+    if sort == "relevance" and not q:
+        raise ValueError("sort=relevance needs search text (q)")
+    limit = max(1, min(limit, MAX_LIMIT))
+    if page < 1 or (page - 1) * limit > MAX_OFFSET:
+        raise ValueError(f"page must be between 1 and {MAX_OFFSET // limit + 1}")
+
+    return {
+        "q": q,
+        # Sorted so equivalent filters share a cache entry
+        "tags": sorted(normalize_tags(tags or [])),
+        "any_tags": sorted(normalize_tags(any_tags or [])),
+        "exclude_tags": sorted(normalize_tags(exclude_tags or [])),
+        "created_after": created_after.isoformat() if created_after else None,
+        "created_before": created_before.isoformat() if created_before else None,
+        "updated_after": updated_after.isoformat() if updated_after else None,
+        "updated_before": updated_before.isoformat() if updated_before else None,
+        "sort": sort,
+        "page": page,
+        "limit": limit,
+    }
+
+
+def _filters(user_id: int, search: dict) -> tuple:
+    """FROM clause, WHERE conditions and their params, shared by the page and count queries"""
+    conditions = ["user_id = %s"]
+    params = [user_id]
+
+    if search["q"]:
+        conditions.append("search_vector @@ query")
+    if search["tags"]:
+        conditions.append("tags @> %s::text[]")
+        params.append(search["tags"])
+    if search["any_tags"]:
+        conditions.append("tags && %s::text[]")
+        params.append(search["any_tags"])
+    if search["exclude_tags"]:
+        conditions.append("NOT (COALESCE(tags, '{}') && %s::text[])")
+        params.append(search["exclude_tags"])
+    for field, column, op in (("created_after", "created_at", ">="), ("created_before", "created_at", "<"),
+                              ("updated_after", "updated_at", ">="), ("updated_before", "updated_at", "<")):
+        if search[field]:
+            conditions.append(f"{column} {op} %s")
+            params.append(search[field])
+
+    if search["q"]:
+        source = "knowledge_entries, websearch_to_tsquery('english', %s) AS query"
+        params.insert(0, search["q"])
+    else:
+        source = "knowledge_entries"
+    return source, " AND ".join(conditions), params
+
+
+def build_search_sql(user_id: int, search: dict) -> tuple:
+    """
+    One statement for a page of results: the inner query filters, ranks and
+    paginates using only indexed/filter columns; the outer query reads content
+    for the page rows to build snippets. total comes from a window count.
+
+    Returns:
+        (sql, params)
+    """
+    source, where, params = _filters(user_id, search)
+    if search["q"]:
+        rank = "ts_rank_cd(search_vector, query)"
+        snippet = f"ts_headline('english', e.content, page.query, '{HEADLINE_OPTIONS}')"
+    else:
+        rank = "0::real"
+        snippet = f"left(e.content, {SNIPPET_CHARS + 1})"
+
+    offset = (search["page"] - 1) * search["limit"]
+    params += [search["limit"], offset]
+    query_column = ", query" if search["q"] else ""
+    sql = f"""WITH page AS (
+                  SELECT id, updated_at, created_at, {rank} AS rank, COUNT(*) OVER () AS total{query_column}
+                  FROM {source}
+                  WHERE {where}
+                  ORDER BY {_order_by(search['sort'])}
+                  LIMIT %s OFFSET %s
+              )
+              SELECT e.id, e.title, e.tags, e.created_at, e.updated_at, page.rank, page.total,
+                     {snippet} AS snippet
+              FROM page
+              JOIN knowledge_entries e ON e.id = page.id
+              ORDER BY {_order_by(search['sort'], 'page.')}"""
+    return sql, params
+
+
+def build_count_sql(user_id: int, search: dict) -> tuple:
+    """
+    The match count alone, for a page past the last result (which has no
+    row to carry the window count)
+
+    Returns:
+        (sql, params)
+    """
+    source, where, params = _filters(user_id, search)
+    return f"SELECT COUNT(*) AS total FROM {source} WHERE {where}", params
+
+
+def search_cache_key(user_id: int, search: dict) -> str:
+    digest = hashlib.sha1(json.dumps(search, sort_keys=True).encode()).hexdigest()[:16]
+    return f"search:user:{user_id}:{digest}"
+
+
+def _run_query(user_id: int, search: dict) -> list:
+    sql, params = build_search_sql(user_id, search)
+    conn = get_db_connection(readonly=True, user_id=user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return rows
+
+
+def _run_count(user_id: int, search: dict) -> int:
+    sql, params = build_count_sql(user_id, search)
+    conn = get_db_connection(readonly=True, user_id=user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        total = cursor.fetchone()['total']
+        cursor.close()
+    finally:
+        conn.close()
+    return total
+
+
+def search_entries(user_id: int, search: dict) -> dict:
+    """Run a normalized search (see normalize_search), from cache when nothing was written since"""
+    key = search_cache_key(user_id, search)
+    cached, version = get_versioned_cache(user_id, key)
+    if cached is not None:
+        return cached
+
+    rows = _run_query(user_id, search)
+    if rows:
+        total = rows[0]['total']
+    else:
+        # Past the last page there's no row to read the count from
+        total = _run_count(user_id, search) if search["page"] > 1 else 0
+    result = {
+        "total": total,
+        "page": search["page"],
+        "limit": search["limit"],
+        "has_more": search["page"] * search["limit"] < total,
+        "results": [
+            {
+                "id": row['id'],
+                "title": row['title'],
+                "tags": row['tags'] or [],
+                "created_at": str(row['created_at']),
+                "updated_at": str(row['updated_at']),
+                "rank": round(float(row['rank']), 4),
+                "snippet": row['snippet'] if search["q"] else make_snippet(row['snippet']),
+            }
+            for row in rows
+        ],
+    }
+    set_versioned_cache(user_id, key, result, version, ttl=SEARCH_TTL)
+    return result
@@ -0,0 +1,36 @@
+"""
+Tag Service
+Per-user tag counts for /api/tags and the AI list_tags tool, read from
+user_tag_counts. A trigger on knowledge_entries keeps that table current on
+every create/update/delete (migrations/create_tag_counts.sql), so nothing
+here scans or unnests the entries themselves.
+"""
+from db import get_db_connection
+
+MAX_TAGS_RETURNED = 500
+
+
+def get_tag_counts(user_id: int, limit: int = 100) -> list:
+    """
+    A user's tags with how many entries carry each, most used first
+
+    Returns:
+        [{"tag": str, "count": int}, ...]
+    """
+    limit = max(1, min(limit, MAX_TAGS_RETURNED))
+    conn = get_db_connection(readonly=True, user_id=user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT tag, entry_count
+               FROM user_tag_counts
+               WHERE user_id = %s
+               ORDER BY entry_count DESC, tag
+               LIMIT %s""",
+            (user_id, limit)
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return [{"tag": row['tag'], "count": row['entry_count']} for row in rows]
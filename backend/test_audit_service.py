@@ -0,0 +1,124 @@
+import pytest
+from datetime import datetime
+from audit_service import AuditLogger
+from testing.helpers import run_migration
+
+def test_cursor_round_trip():
+    """Test page cursors encode and decode the (timestamp, id) position"""
+    position = (datetime(2026, 3, 2, 10, 30, 15, 123456), 42)
+    cursor = AuditLogger.encode_cursor(*position)
+    assert AuditLogger.decode_cursor(cursor) == position
+
+def test_invalid_cursor_rejected():
+    """Test malformed cursors raise ValueError"""
+    with pytest.raises(ValueError):
+        AuditLogger.decode_cursor("not-a-cursor")
+
+def test_resolve_columns():
+    """Test column selection always keeps the cursor columns"""
+    logger = AuditLogger()
+    assert "details" not in logger.resolve_columns()
+    assert logger.resolve_columns(["event_type"]) == ["id", "timestamp", "event_type"]
+    assert "user_agent" in logger.resolve_columns(["all"])
+    with pytest.raises(ValueError):
+        logger.resolve_columns(["password_hash"])
+
+def test_export_formats_and_gzip():
+    """Test export chunks encode NDJSON/CSV and gzip round-trips"""
+    import gzip
+    import json
+    from audit_export import format_rows, gzip_chunks
+
+    rows = [
+        {"id": i, "timestamp": datetime(2026, 1, 1, 0, 0, i), "details": {"n": i}}
+        for i in range(3)
+    ]
+    columns = ["id", "timestamp", "details"]
+
+    ndjson = b"".join(format_rows(rows, columns, "ndjson"))
+    assert [json.loads(line)["id"] for line in ndjson.splitlines()] == [0, 1, 2]
+
+    csv_text = b"".join(format_rows(rows, columns, "csv")).decode()
+    assert csv_text.splitlines()[0] == "id,timestamp,details"
+    assert b"".join(format_rows(rows, columns, "csv", include_header=False)).decode().count("\n") == 3
+
+    compressed = b"".join(gzip_chunks(format_rows(rows, columns, "ndjson")))
+    assert gzip.decompress(compressed) == ndjson
+
+def test_security_summary_reads_raw_rows_past_minute_retention():
+    """Test the partial first hour comes from minute rollups only while they are retained"""
+    statements = []
+
+    class Cursor:
+        def execute(self, query, params=None):
+            statements.append(" ".join(query.split()))
+        def fetchall(self):
+            return []
+        def close(self):
+            pass
+
+    class Connection:
+        def cursor(self):
+            return Cursor()
+        def close(self):
+            pass
+
+    logger = AuditLogger()
+    logger._get_connection = lambda readonly=False: Connection()
+    logger.get_security_summary(hours=24)
+    logger.get_security_summary(hours=AuditLogger.MINUTE_ROLLUP_RETENTION_HOURS + 1)
+    assert "bucket_size = 'minute'" in statements[0] and "FROM audit_logs" not in statements[0]
+    assert "bucket_size = 'minute'" not in statements[1] and "FROM audit_logs l" in statements[1]
+
+def test_security_summary_matches_raw_rows(postgres):
+    """Test the rollup triggers and the summary query agree with counting audit_logs, on both first-hour paths"""
+    run_migration(postgres, "partition_audit_logs.sql")
+    run_migration(postgres, "create_audit_rollups.sql")
+    events = [
+        # minutes ago, type, category, severity
+        (5, "login_failed", "auth", "warning"),
+        (5, "login_failed", "auth", "warning"),
+        (90, "login_success", "auth", "info"),
+        (23 * 60 + 30, "rate_limit_exceeded", "security", "warning"),
+        (30 * 60, "login_failed", "auth", "warning"),
+        (49 * 60 - 20, "login_failed", "auth", "warning"),
+        (60 * 60, "login_failed", "auth", "warning"),
+        (10, "entry_created", "api", "info"),
+    ]
+    for minutes, event_type, category, severity in events:
+        postgres.execute(
+            """INSERT INTO audit_logs (timestamp, event_type, event_category, severity, status)
+               VALUES (LOCALTIMESTAMP - make_interval(mins => %s), %s, %s, %s, 'success')""",
+            (minutes, event_type, category, severity)
+        )
+
+    class Connection:
+        """The fixture's connection, left open for the rest of the test"""
+        def cursor(self):
+            return postgres.connection.cursor()
+        def close(self):
+            pass
+
+    logger = AuditLogger()
+    logger._get_connection = lambda readonly=False: Connection()
+
+    def raw_counts(hours):
+        postgres.execute(
+            """SELECT event_type, severity, COUNT(*) AS count FROM audit_logs
+               WHERE timestamp >= LOCALTIMESTAMP - make_interval(hours => %s)
+               AND event_category IN ('auth', 'security')
+               GROUP BY event_type, severity""",
+            (hours,)
+        )
+        return sorted((row["event_type"], row["severity"], row["count"]) for row in postgres.fetchall())
+
+    def summary(hours):
+        return sorted((row["event_type"], row["severity"], row["count"])
+                      for row in logger.get_security_summary(hours=hours))
+
+    assert summary(24) == raw_counts(24) == [
+        ("login_failed", "warning", 2), ("login_success", "info", 1), ("rate_limit_exceeded", "warning", 1)
+    ]
+    past_minute_retention = AuditLogger.MINUTE_ROLLUP_RETENTION_HOURS + 1
+    assert summary(past_minute_retention) == raw_counts(past_minute_retention)
+    assert ("login_failed", "warning", 4) in summary(past_minute_retention)
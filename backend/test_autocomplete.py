@@ -0,0 +1,101 @@
+import redis
+import autocomplete_service
+from autocomplete_service import autocomplete_keys, ranked_prefix_keys, rebuild_lock_key, MAX_CANDIDATES
+
+def test_autocomplete_ranks_and_follows_writes(api):
+    """Test suggestions are ranked, served from the prefix index, and rebuilt after a write"""
+    client, headers, backend = api
+
+    def create(title, tags):
+        return client.post("/api/entries", json={"title": title, "content": "c", "tags": tags}, headers=headers)
+
+    create("Redis pipelines", ["redis-cluster", "redis"])
+    create("Redis streams", ["redis-cluster"])
+    create("Postgres indexes", ["postgres"])
+
+    result = client.get("/api/autocomplete?q=Red", headers=headers).json()
+    assert result["tags"] == [{"tag": "redis-cluster", "count": 2}, {"tag": "redis", "count": 1}]
+    assert [t["title"] for t in result["titles"]] == ["Redis streams", "Redis pipelines"]
+    assert backend.redis.zrangebylex(autocomplete_keys(1)[0], "-", "+")
+
+    # Exact match first; served from Redis without touching Postgres
+    statements = backend.db.statements
+    result = client.get("/api/autocomplete?q=redis&type=tags", headers=headers).json()
+    assert result == {"query": "redis", "tags": [{"tag": "redis", "count": 1}, {"tag": "redis-cluster", "count": 2}]}
+    assert backend.db.statements == statements
+
+    create("Redis sentinel", ["redis"])
+    result = client.get("/api/autocomplete?q=redis&type=tags&limit=1", headers=headers).json()
+    assert result["tags"] == [{"tag": "redis", "count": 2}]
+    assert client.get("/api/autocomplete?q=post&type=titles", headers=headers).json()["titles"][0]["title"] == "Postgres indexes"
+
+    assert client.get("/api/autocomplete?q=r&type=body", headers=headers).status_code == 400
+
+def test_top_suggestions_outside_the_candidate_window(api):
+    """Test the most used tag wins even when more than MAX_CANDIDATES others sort before it"""
+    client, headers, backend = api
+    cursor = backend.db.connect().cursor()
+    for i in range(MAX_CANDIDATES + 10):
+        cursor.execute("INSERT INTO user_tag_counts (user_id, tag, entry_count) VALUES (%s, %s, %s)",
+                       (1, f"tag-a{i:03}", 1))
+    cursor.execute("INSERT INTO user_tag_counts (user_id, tag, entry_count) VALUES (%s, %s, %s)", (1, "tag-zz", 9))
+    for i in range(MAX_CANDIDATES + 10):
+        cursor.execute("INSERT INTO knowledge_entries (user_id, title, content) VALUES (%s, %s, %s)",
+                       (1, f"Note {i:03}", "c"))
+    for _ in range(3):
+        cursor.execute("INSERT INTO knowledge_entries (user_id, title, content) VALUES (%s, %s, %s)",
+                       (1, "Notes on Redis", "c"))
+
+    # A short prefix is answered from the ranked hash, a longer one by reading every match
+    for q in ("t", "tag", "tag-"):
+        first = client.get(f"/api/autocomplete?q={q}&limit=2", headers=headers).json()
+        assert first["tags"][0] == {"tag": "tag-zz", "count": 9}
+        assert first["titles"] == []
+        statements = backend.db.statements
+        assert client.get(f"/api/autocomplete?q={q}&limit=2", headers=headers).json() == first
+        assert backend.db.statements == statements
+    assert backend.redis.hget(ranked_prefix_keys(1)[0], "tag") is not None
+
+    for q in ("n", "note"):
+        result = client.get(f"/api/autocomplete?q={q}&type=titles&limit=1", headers=headers).json()
+        assert result["titles"][0]["title"] == "Notes on Redis"
+
+def test_one_caller_rebuilds_and_the_others_use_the_previous_index(api):
+    """Test a stale index is served without a query while another caller holds the rebuild lock"""
+    client, headers, backend = api
+    client.post("/api/entries", json={"title": "Redis", "content": "c", "tags": ["redis"]}, headers=headers)
+    assert client.get("/api/autocomplete?q=re&type=tags", headers=headers).json()["tags"] == [{"tag": "redis", "count": 1}]
+
+    client.post("/api/entries", json={"title": "Redis again", "content": "c", "tags": ["redis"]}, headers=headers)
+    backend.redis.set(rebuild_lock_key(1), "1", ex=10)
+    statements = backend.db.statements
+    result = client.get("/api/autocomplete?q=re&type=tags", headers=headers).json()
+    assert result["tags"] == [{"tag": "redis", "count": 1}]
+    assert backend.db.statements == statements
+
+    backend.redis.delete(rebuild_lock_key(1))
+    result = client.get("/api/autocomplete?q=re&type=tags", headers=headers).json()
+    assert result["tags"] == [{"tag": "redis", "count": 2}]
+    assert backend.redis.get(rebuild_lock_key(1)) is None
+
+def test_redis_down_uses_a_short_lived_copy_per_process(api, monkeypatch):
+    """Test typing while Redis is unreachable queries Postgres once per LOCAL_INDEX_SECONDS, not per keystroke"""
+    client, headers, backend = api
+    client.post("/api/entries", json={"title": "Redis", "content": "c", "tags": ["redis"]}, headers=headers)
+
+    class DownRedis:
+        def pipeline(self, *args, **kwargs):
+            raise redis.exceptions.ConnectionError("Connection refused")
+
+    monkeypatch.setattr(autocomplete_service, "redis_client", DownRedis())
+    monkeypatch.setattr(autocomplete_service, "_local_indexes", {})
+    statements = backend.db.statements
+    for q in ("r", "re", "red"):
+        assert client.get(f"/api/autocomplete?q={q}", headers=headers).json()["titles"][0]["title"] == "Redis"
+    assert backend.db.statements == statements + 2  # tags and titles, once
+
+    monkeypatch.setattr(autocomplete_service, "LOCAL_INDEX_SECONDS", 0)
+    monkeypatch.setattr(autocomplete_service, "_local_indexes", {})
+    client.get("/api/autocomplete?q=r", headers=headers)
+    client.get("/api/autocomplete?q=re", headers=headers)
+    assert backend.db.statements == statements + 6
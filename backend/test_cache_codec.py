@@ -0,0 +1,48 @@
+import json
+import cache_codec
+import cache_service
+from testing.fakes import FakeRedis
+from cache_codec import encode, decode, COMPRESSED
+from cache_service import get_cache, set_cache
+
+ENTRY = {"id": 1, "title": "Redis notes", "content": "pipelines batch round trips. " * 200,
+         "tags": ["redis"], "created_at": "2026-01-01 00:00:00"}
+
+def test_round_trip_and_compression():
+    """Test values round-trip, and only large ones are compressed"""
+    small = {"id": 2, "title": "short", "tags": []}
+    assert decode(encode(small)) == small
+    assert not encode(small)[0] & COMPRESSED
+
+    encoded = encode(ENTRY)
+    assert encoded[0] & COMPRESSED
+    assert len(encoded) < len(json.dumps(ENTRY)) / 5
+    assert decode(encoded) == ENTRY
+
+def test_json_fallback_and_legacy_values(monkeypatch):
+    """Test values are readable across codecs, including pre-header plain JSON"""
+    written_with_default = encode(ENTRY)
+    monkeypatch.setattr(cache_codec, "CACHE_CODEC", "json")
+    assert encode(ENTRY)[0] & ~COMPRESSED == cache_codec.JSON
+    assert decode(encode(ENTRY)) == ENTRY
+    assert decode(written_with_default) == ENTRY
+
+    legacy = json.dumps(ENTRY)
+    assert decode(legacy) == ENTRY
+    assert decode(legacy.encode()) == ENTRY
+
+def test_get_cache_reads_binary_and_legacy_values(monkeypatch):
+    """Test get_cache decodes what set_cache writes and values cached before the codec"""
+    redis = FakeRedis()
+    monkeypatch.setattr(cache_service, "redis_client", redis)
+    monkeypatch.setattr(cache_service, "redis_binary_client", redis)
+
+    set_cache("entry:1:user:1", ENTRY)
+    assert isinstance(redis.get("entry:1:user:1"), bytes)
+    assert get_cache("entry:1:user:1") == ENTRY
+
+    redis.setex("user:1:profile", 60, json.dumps({"id": 1}))
+    assert get_cache("user:1:profile") == {"id": 1}
+
+    redis.setex("user:2:profile", 60, b"\x7fgarbage")
+    assert get_cache("user:2:profile") is None
@@ -0,0 +1,44 @@
+import time
+import cache_warmer
+from testing.helpers import auth_headers
+from cache_service import get_cache, get_cached_entries
+
+def test_warm_user_fills_entry_list_and_profile(api):
+    """Test warming loads a user's entries and profile once, then finds them cached"""
+    _, _, backend = api
+    cursor = backend.db.connect().cursor()
+    cursor.execute("INSERT INTO users (email, password_hash) VALUES (%s, %s) RETURNING id", ("a@b.co", "x"))
+    user_id = cursor.fetchone()["id"]
+    cursor.execute(
+        "INSERT INTO knowledge_entries (user_id, title, content, tags) VALUES (%s, %s, %s, %s)",
+        (user_id, "Warm", "cache", ["redis"])
+    )
+
+    assert cache_warmer.warm_user(user_id)
+    entries, _ = get_cached_entries(user_id)
+    assert [entry["title"] for entry in entries] == ["Warm"]
+    assert get_cache(cache_warmer.profile_cache_key(user_id))["email"] == "a@b.co"
+    assert not cache_warmer.warm_user(user_id)
+
+def test_deploy_warm_is_rate_limited(monkeypatch):
+    """Test the deploy job warms recent users no faster than the given rate"""
+    warmed = []
+    monkeypatch.setattr(cache_warmer.audit_logger, "get_recently_active_users", lambda hours, limit: [3, 1, 2])
+    monkeypatch.setattr(cache_warmer, "warm_user", lambda user_id: warmed.append(user_id) or user_id != 2)
+
+    start = time.monotonic()
+    result = cache_warmer.warm_recent_users(hours=24, limit=10, rate=20)
+    assert time.monotonic() - start >= 0.1
+    assert warmed == [3, 1, 2]
+    assert result["loaded"] == 2 and result["already_cached"] == 1
+
+def test_me_loads_profile_on_cache_miss(api):
+    """Test /api/auth/me reads the user from Postgres when the profile isn't cached"""
+    client, _, backend = api
+    cursor = backend.db.connect().cursor()
+    cursor.execute("INSERT INTO users (email, password_hash) VALUES (%s, %s) RETURNING id", ("me@b.co", "x"))
+    user_id = cursor.fetchone()["id"]
+
+    response = client.get("/api/auth/me", headers=auth_headers(user_id, "me@b.co"))
+    assert response.status_code == 200
+    assert response.json()["email"] == "me@b.co"
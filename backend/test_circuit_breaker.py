@@ -0,0 +1,140 @@
+import time
+import redis
+import cache_service
+import rate_limiter
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, HALF_OPEN, OPEN
+from rate_limiter import RateLimiter
+
+class DownRedis:
+    """Redis client whose every call fails like an unreachable server"""
+
+    def pipeline(self, *args, **kwargs):
+        return self
+
+    def get(self, key):
+        pass
+
+    def ttl(self, key):
+        pass
+
+    def execute(self):
+        raise redis.exceptions.ConnectionError("Connection refused")
+
+def test_breaker_opens_fails_fast_and_recovers():
+    """Test the closed -> open -> half-open -> closed cycle"""
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    try:
+        breaker.before_call()
+        assert False, "open circuit should fail fast"
+    except CircuitOpenError:
+        pass
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()  # the probe
+    try:
+        breaker.before_call()
+        assert False, "only one probe at a time"
+    except CircuitOpenError:
+        pass
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    closed = []
+    breaker.on_close(lambda: closed.append(True))
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.record_success()
+    assert closed == [True]
+
+def test_cache_skips_redis_while_open():
+    """Test an unreachable Redis opens the shared breaker and cache reads stop waiting on it"""
+    client = cache_service.TimedRedis(host="127.0.0.1", port=1, **cache_service.REDIS_CONNECTION_OPTIONS)
+    original = cache_service.redis_client
+    cache_service.redis_client = client
+    cache_service.redis_breaker.reset()
+    try:
+        for _ in range(cache_service.redis_breaker.failure_threshold):
+            assert cache_service.get_cache("entries:user:1:all") is None
+        assert cache_service.redis_breaker.state == OPEN
+
+        start = time.perf_counter()
+        assert cache_service.get_cache("entries:user:1:all") is None
+        assert not cache_service.set_cache("entries:user:1:all", [])
+        assert time.perf_counter() - start < 0.01
+    finally:
+        cache_service.redis_client = original
+        cache_service.redis_breaker.reset()
+
+def test_rate_limiter_falls_back_to_local_windows(monkeypatch):
+    """Test limiters keep counting in process while Redis is down"""
+    monkeypatch.setattr(rate_limiter, "redis_client", DownRedis())
+    limiter = RateLimiter(max_requests=2, window_seconds=60, name="test")
+    assert limiter.check_rate_limit(1)["remaining"] == 1
+    assert limiter.check_rate_limit(1)["allowed"]
+    result = limiter.check_rate_limit(1)
+    assert not result["allowed"]
+    assert result["reset_time"] > time.time()
+    assert limiter.check_rate_limit(2)["allowed"]
+
+    status = rate_limiter.get_limit_status([(limiter, 1)])["test"]
+    assert status["used"] == 2
+    assert status["remaining"] == 0
+
+def test_writes_during_outage_are_invalidated_on_recovery(monkeypatch):
+    """Test entries cached before an outage aren't served as fresh after a write that couldn't reach Redis"""
+    from testing.fakes import FakeRedis
+
+    class FailingPipelineRedis(DownRedis):
+        def __getattr__(self, command):
+            return lambda *args, **kwargs: None
+
+        def execute(self, *args, **kwargs):
+            raise cache_service.CircuitOpenError("redis circuit is open")
+
+        evalsha = execute
+
+    redis_up = FakeRedis()
+    monkeypatch.setattr(cache_service, "redis_client", redis_up)
+    monkeypatch.setattr(cache_service, "redis_binary_client", redis_up)
+    entry = {"id": 1, "user_id": 1, "title": "before", "content": "", "tags": [],
+             "created_at": "2026-01-01 00:00:00", "updated_at": "2026-01-01 00:00:00"}
+    cache_service.cache_entries(1, [entry], cache_service.get_cached_entries(1)[1])
+    redis_up.set(cache_service.entry_cache_key(1, 1), cache_service.encode(entry))
+
+    monkeypatch.setattr(cache_service, "redis_client", FailingPipelineRedis())
+    assert not cache_service.cache_entry_saved(1, {**entry, "title": "after"})
+    assert 1 in cache_service._dirty_users
+
+    monkeypatch.setattr(cache_service, "redis_client", redis_up)
+    assert cache_service.get_cached_entries(1)[0] is None
+    assert cache_service.get_cache(cache_service.entry_cache_key(1, 1)) is None
+    assert cache_service._dirty_users == {}
+
+def test_dirty_users_are_flushed_without_a_request(monkeypatch):
+    """Test an idle worker still invalidates what it couldn't write, once Redis is back"""
+    from testing.fakes import FakeRedis
+
+    redis_up = FakeRedis()
+    monkeypatch.setattr(cache_service, "redis_client", DownRedis())
+    monkeypatch.setattr(cache_service, "DIRTY_RETRY_SECONDS", 0.05)
+    redis_up.set(cache_service.entry_cache_key(1, 7), "cached before the outage")
+
+    assert not cache_service.invalidate_entries(1, 7)
+    time.sleep(0.1)
+    assert cache_service._dirty_users == {1: {7}}
+
+    monkeypatch.setattr(cache_service, "redis_client", redis_up)
+    deadline = time.monotonic() + 2
+    while cache_service._dirty_users and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert cache_service._dirty_users == {}
+    assert redis_up.get(cache_service.entry_cache_key(1, 7)) is None
@@ -0,0 +1,76 @@
+import psycopg2
+import db
+from testing.fakes import FakeRedis
+from db import ReplicaRouter
+
+class StubConnection:
+    """Stands in for a psycopg2 connection to one server"""
+
+    def __init__(self, dsn, lag=0.0):
+        self.dsn = dsn
+        self.lag = lag
+        self.readonly = False
+        self.pin_user_id = None
+        self.closed = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, vars=None):
+        pass
+
+    def fetchone(self):
+        return {"lag": self.lag}
+
+    def set_session(self, readonly=False):
+        self.readonly = readonly
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+def install(monkeypatch, urls, down=(), lag=None):
+    router = ReplicaRouter(urls, pin_seconds=5, health_interval=5, retry_seconds=30)
+    monkeypatch.setattr(db, "replica_router", router)
+    monkeypatch.setattr(db, "redis_client", FakeRedis())
+    monkeypatch.setattr(db, "_connect_primary", lambda: StubConnection("primary"))
+
+    def connect(dsn, **kwargs):
+        if dsn in down:
+            raise psycopg2.OperationalError("connection refused")
+        return StubConnection(dsn, lag=(lag or {}).get(dsn, 0.0))
+    monkeypatch.setattr(db.psycopg2, "connect", connect)
+    return router
+
+def test_reads_round_robin_over_replicas(monkeypatch):
+    """Test read-only connections alternate replicas and writes stay on the primary"""
+    install(monkeypatch, ["replica-a", "replica-b"])
+    reads = [db.get_db_connection(readonly=True, user_id=1) for _ in range(4)]
+    assert [conn.dsn for conn in reads] == ["replica-a", "replica-b", "replica-a", "replica-b"]
+    assert all(conn.readonly for conn in reads)
+
+    write = db.get_db_connection(user_id=1)
+    assert write.dsn == "primary"
+    assert write.pin_user_id == 1
+
+def test_user_is_pinned_to_primary_after_writing(monkeypatch):
+    """Test read-your-writes: the writer reads from the primary, other users don't"""
+    router = install(monkeypatch, ["replica-a"])
+    router.pin(1)
+    assert db.get_db_connection(readonly=True, user_id=1).dsn == "primary"
+    assert db.get_db_connection(readonly=True, user_id=2).dsn == "replica-a"
+
+    # Pins are shared through Redis, so another worker sees them too
+    other_worker = ReplicaRouter(["replica-a"], pin_seconds=5)
+    assert other_worker.is_pinned(1)
+    assert not other_worker.is_pinned(2)
+
+def test_unhealthy_replicas_are_skipped(monkeypatch):
+    """Test down or lagging replicas are skipped and the primary is the last resort"""
+    router = install(monkeypatch, ["replica-a", "replica-b"], down={"replica-a"}, lag={"replica-b": 60.0})
+    assert db.get_db_connection(readonly=True).dsn == "primary"
+    status = router.status()
+    assert [replica["healthy"] for replica in status] == [False, False]
+    assert status[1]["lag_seconds"] == 60.0
@@ -0,0 +1,154 @@
+import json
+import ai_service
+import cache_service
+from cache_codec import decode
+from ai_service import process_tool_call
+from entry_views import make_snippet, SNIPPET_CHARS
+from testing.helpers import auth_headers
+from cache_service import (
+    get_cached_entries, cache_entries, cache_entry_saved, cache_entry_deleted, entry_cache_key,
+    get_cached_entry_batch, cache_entry_batch
+)
+
+def entry(entry_id, title="note"):
+    return {"id": entry_id, "user_id": 1, "title": title, "content": "", "tags": [],
+            "created_at": "2026-01-01 00:00:00", "updated_at": "2026-01-01 00:00:00"}
+
+def test_writes_patch_the_cached_list(redis):
+    """Test create/update/delete patch the cached list instead of dropping it"""
+    cached, version = get_cached_entries(1)
+    assert cached is None
+    cache_entries(1, [entry(2), entry(1)], version)
+    assert [e["id"] for e in get_cached_entries(1)[0]] == [2, 1]
+
+    cache_entry_saved(1, entry(3), created=True)
+    cache_entry_saved(1, entry(1, title="renamed"))
+    cache_entry_deleted(1, 2)
+
+    cached, _ = get_cached_entries(1)
+    assert [(e["id"], e["title"]) for e in cached] == [(3, "note"), (1, "renamed")]
+    assert redis.get(entry_cache_key(1, 3)) is not None
+    assert redis.get(entry_cache_key(1, 2)) is None
+
+    cache_entry_deleted(1, 3)
+    cache_entry_deleted(1, 1)
+    assert get_cached_entries(1)[0] == []
+
+def test_write_during_rebuild_is_not_lost(redis):
+    """Test a list built before a concurrent write is treated as a miss"""
+    _, version = get_cached_entries(1)      # rebuild starts, queries Postgres...
+    cache_entry_saved(1, entry(5), created=True)  # ...a write lands (list not cached: no-op)
+    cache_entries(1, [entry(4)], version)   # rebuild stores what it read
+    cached, version = get_cached_entries(1)
+    assert cached is None
+
+    cache_entries(1, [entry(5), entry(4)], version)
+    assert [e["id"] for e in get_cached_entries(1)[0]] == [5, 4]
+
+def test_out_of_order_saves_invalidate_instead_of_overwriting(redis):
+    """Test an older save landing after a newer one, or after a delete, drops the cached copies"""
+    _, version = get_cached_entries(1)
+    cache_entries(1, [entry(1)], version)
+    newer = dict(entry(1, title="newer"), updated_at="2026-01-01 00:00:02")
+    older = dict(entry(1, title="older"), updated_at="2026-01-01 00:00:01")
+
+    cache_entry_saved(1, newer)
+    assert get_cached_entries(1)[0][0]["title"] == "newer"
+    cache_entry_saved(1, older)
+    assert get_cached_entries(1)[0] is None
+    assert redis.get(entry_cache_key(1, 1)) is None
+
+    cache_entry_saved(1, dict(newer, updated_at="2026-01-01 00:00:03"))
+    assert decode(redis.get(entry_cache_key(1, 1)))["title"] == "newer"
+
+    cache_entry_deleted(1, 1)
+    cache_entry_saved(1, newer)
+    assert redis.get(entry_cache_key(1, 1)) is None
+
+def test_summary_view_and_field_projection(api):
+    """Test ?view=summary and ?fields= return only those fields, cached until the next write"""
+    client, headers, backend = api
+    long_text = " ".join(["word"] * 500)
+    client.post("/api/entries", json={"title": "Long", "content": long_text, "tags": ["redis"]}, headers=headers)
+
+    summary = client.get("/api/entries?view=summary", headers=headers).json()
+    assert set(summary[0]) == {"id", "title", "tags", "created_at", "updated_at", "content_length", "snippet"}
+    assert summary[0]["content_length"] == len(long_text)
+    assert summary[0]["snippet"] == make_snippet(long_text[:SNIPPET_CHARS + 1])
+    assert len(summary[0]["snippet"]) <= SNIPPET_CHARS + 1 and summary[0]["snippet"].endswith("…")
+
+    statements = backend.db.statements
+    assert client.get("/api/entries?view=summary", headers=headers).json() == summary
+    assert backend.db.statements == statements
+
+    client.post("/api/entries", json={"title": "Short", "content": "hi", "tags": []}, headers=headers)
+    titles = client.get("/api/entries?fields=title", headers=headers).json()
+    assert titles == [{"id": 2, "title": "Short"}, {"id": 1, "title": "Long"}]
+    assert [e["title"] for e in client.get("/api/entries?view=summary", headers=headers).json()] == ["Short", "Long"]
+
+    assert client.get("/api/entries?fields=password_hash", headers=headers).status_code == 400
+
+def test_summary_after_a_write_is_built_from_the_cached_list(api):
+    """Test a write's projection miss is rebuilt from the patched full list, equal to the Postgres build"""
+    client, headers, backend = api
+    client.post("/api/entries", json={"title": "Long", "content": "é " * 300, "tags": ["redis"]}, headers=headers)
+    from_postgres = client.get("/api/entries?view=summary", headers=headers).json()
+    client.get("/api/entries", headers=headers)
+
+    client.put("/api/entries/1", json={"title": "Renamed"}, headers=headers)
+    client.post("/api/entries", json={"title": "Short", "content": "hi", "tags": []}, headers=headers)
+    statements = backend.db.statements
+    summary = client.get("/api/entries?view=summary", headers=headers).json()
+    assert backend.db.statements == statements
+    assert [e["title"] for e in summary] == ["Short", "Renamed"]
+    assert {k: v for k, v in summary[1].items() if k not in ("title", "updated_at")} == \
+        {k: v for k, v in from_postgres[0].items() if k not in ("title", "updated_at")}
+
+def test_get_entries_by_ids_reads_cache_then_one_query(api):
+    """Test the batch tool serves cached entries and fetches the rest in a single query"""
+    client, headers, backend = api
+    other = auth_headers(2, "c@d.co")
+    for title in ("a", "b", "c"):
+        client.post("/api/entries", json={"title": title, "content": f"{title} text"}, headers=headers)
+    client.post("/api/entries", json={"title": "private", "content": "x"}, headers=other)
+    backend.redis.delete(entry_cache_key(1, 1), entry_cache_key(1, 3))
+
+    statements = backend.db.statements
+    result = json.loads(process_tool_call("get_entries_by_ids", {"ids": [3, 2, 1, 4, 99, 3]}, 1))
+    assert backend.db.statements == statements + 1
+    assert [(e["id"], e["content"]) for e in result["entries"]] == [(3, "c text"), (2, "b text"), (1, "a text")]
+    assert result["not_found"] == [4, 99]
+
+    process_tool_call("get_entries_by_ids", {"ids": [1, 3]}, 1)
+    assert backend.db.statements == statements + 1
+    assert client.get("/api/entries/1", headers=headers).json()["content"] == "a text"
+
+    assert process_tool_call("get_entries_by_ids", {"ids": list(range(21))}, 1).startswith("At most 20")
+
+def test_refill_skips_entries_written_meanwhile(redis):
+    """Test a row read before a write doesn't replace what the write-through cached"""
+    found, version = get_cached_entry_batch(1, [1])
+    assert found == {}
+    cache_entry_saved(1, entry(1, title="saved"))
+    cache_entry_batch(1, [entry(1, title="read before the save")], version)
+    assert get_cached_entry_batch(1, [1])[0][1]["title"] == "saved"
+
+    found, version = get_cached_entry_batch(1, [2])
+    cache_entry_batch(1, [entry(2)], version)
+    assert get_cached_entry_batch(1, [2])[0] == {2: entry(2)}
+
+def test_get_entries_by_ids_reports_a_database_failure(api, monkeypatch):
+    """Test a failed query is a tool error, not every id reported as not found, and the connection is closed"""
+    closed = []
+
+    class BrokenConnection:
+        def cursor(self):
+            raise RuntimeError("connection lost")
+
+        def close(self):
+            closed.append(True)
+
+    monkeypatch.setattr(ai_service, "get_db_connection", lambda **kwargs: BrokenConnection())
+    result = process_tool_call("get_entries_by_ids", {"ids": [1, 2]}, 1)
+    assert result == "Error fetching entries: connection lost"
+    assert closed == [True]
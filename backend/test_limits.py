@@ -0,0 +1,28 @@
+import rate_limiter
+from testing.fakes import FakeRedis
+from rate_limiter import RateLimiter, get_limit_status
+
+def test_limit_status_is_read_only_and_pipelined(monkeypatch):
+    """Test every limiter is read in one pipeline without consuming a request"""
+    redis = FakeRedis()
+    monkeypatch.setattr(rate_limiter, "redis_client", redis)
+    hourly = RateLimiter(max_requests=10, window_seconds=3600, name="chat_hourly", key_prefix="rate_limit:user:chat:user")
+    daily = RateLimiter(max_requests=7, window_seconds=86400, name="ai_daily", key_prefix="ai_limit:user", key_suffix=":daily")
+    for _ in range(3):
+        hourly.check_rate_limit(42)
+    daily.check_rate_limit(42)
+    assert redis.get("rate_limit:user:chat:user:42") == "3"
+    assert redis.get("ai_limit:user:42:daily") == "1"
+
+    pipelines = []
+    pipeline = redis.pipeline
+    monkeypatch.setattr(redis, "pipeline", lambda *args, **kwargs: pipelines.append(1) or pipeline(*args, **kwargs))
+    limits = get_limit_status([(hourly, 42), (daily, 42)])
+
+    assert len(pipelines) == 1
+    assert limits["chat_hourly"]["used"] == 3
+    assert limits["chat_hourly"]["remaining"] == 7
+    assert limits["chat_hourly"]["resets_in_seconds"] == 3600
+    assert limits["ai_daily"]["used"] == 1
+    assert limits["ai_daily"]["limit"] == 7
+    assert redis.get("rate_limit:user:chat:user:42") == "3"
@@ -0,0 +1,56 @@
+import asyncio
+from argparse import Namespace
+from testing.fakes import FakeDatabase, FakeRedis
+from benchmarks.load_test import percentile, run_load
+
+def test_fake_database_sql():
+    """Test the fake database runs the API's single-table statements"""
+    db = FakeDatabase()
+    cursor = db.connect().cursor()
+    cursor.execute(
+        "INSERT INTO knowledge_entries (user_id, title, content, tags) VALUES (%s, %s, %s, %s) RETURNING id, tags",
+        (1, "Redis notes", "pipelines", ["redis"])
+    )
+    assert cursor.fetchone() == {"id": 1, "tags": ["redis"]}
+
+    cursor.execute(
+        """SELECT id, title FROM knowledge_entries
+           WHERE user_id = %s AND (title ILIKE %s OR content ILIKE %s)
+           ORDER BY created_at DESC LIMIT 5""",
+        (1, "%redis%", "%redis%")
+    )
+    assert cursor.fetchall() == [{"id": 1, "title": "Redis notes"}]
+
+    cursor.execute("DELETE FROM knowledge_entries WHERE id = %s AND user_id = %s RETURNING id", (1, 1))
+    assert cursor.fetchone() == {"id": 1}
+    assert db.unsupported == set()
+
+def test_fake_redis_pipeline_and_ttl():
+    """Test the fake Redis keeps counters, TTLs and pipelines like redis-py"""
+    redis = FakeRedis()
+    redis.setex("rate_limit:user:1", 60, 1)
+    redis.incr("rate_limit:user:1")
+    pipe = redis.pipeline()
+    pipe.get("rate_limit:user:1")
+    pipe.ttl("rate_limit:user:1")
+    pipe.ttl("missing")
+    assert pipe.execute() == ["2", 60, -2]
+
+def test_load_run_in_memory():
+    """Test a short in-memory run exercises every endpoint without errors"""
+    args = Namespace(
+        url=None, backend="memory", concurrency=2, duration=1, requests=None, mix=None,
+        ai_latency_ms=0, db_latency_ms=0, redis_latency_ms=0, keep_limits=False, timeout=30
+    )
+    results = asyncio.run(run_load(args))
+    assert results["totals"]["requests"] > 0
+    assert results["totals"]["errors"] == 0
+    assert "unsupported_sql" not in results
+    assert results["totals"]["p50_ms"] <= results["totals"]["p99_ms"]
+
+def test_percentile():
+    """Test nearest-rank percentiles"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
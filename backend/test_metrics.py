@@ -0,0 +1,23 @@
+import pytest
+from metrics import Metric, Counter, Gauge, REGISTRY
+
+def test_scrape_time_counter_renders_as_a_counter():
+    """Test a Counter with a callback reports the running total under TYPE counter"""
+    total = [3]
+    counter = Counter("test_rejected_total", "Rejected in a test", callback=lambda: total[0])
+    gauge = Gauge("test_depth", "Depth in a test", callback=lambda: 1)
+    total[0] = 5
+
+    rendered = REGISTRY.render()
+    REGISTRY._metrics.remove(counter)
+    REGISTRY._metrics.remove(gauge)
+    assert "# TYPE test_rejected_total counter\ntest_rejected_total 5\n" in rendered
+    assert "# TYPE test_depth gauge\ntest_depth 1\n" in rendered
+
+def test_metric_subclasses_must_render_samples():
+    """Test Metric can't be instantiated without _samples"""
+    class Incomplete(Metric):
+        kind = "untyped"
+
+    with pytest.raises(TypeError):
+        Incomplete("test_incomplete", "Missing _samples")
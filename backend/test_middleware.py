@@ -0,0 +1,101 @@
+import asyncio
+from middleware import SecurityHeadersMiddleware, GlobalRateLimitMiddleware, SECURITY_HEADERS
+
+def run_asgi(app, path="/api/entries", method="GET"):
+    """Call an ASGI app once and collect the messages it sends"""
+    sent = []
+    scope = {"type": "http", "method": method, "path": path, "headers": [], "client": ("10.0.0.1", 5000)}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"x-frame-options", b"SAMEORIGIN")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+class StubLimiter:
+    def __init__(self, allowed):
+        self.allowed = allowed
+        self.calls = []
+
+    async def check_rate_limit_async(self, identifier):
+        self.calls.append(identifier)
+        return {"allowed": self.allowed, "remaining": 0, "reset_time": 0, "limit": 300}
+
+def test_security_headers_added_once():
+    """Test precomputed security headers are added and replace endpoint values"""
+    start = run_asgi(SecurityHeadersMiddleware(endpoint))[0]
+    headers = start["headers"]
+    names = [name for name, _ in headers]
+    assert len(names) == len(set(names))
+    assert (b"x-frame-options", b"DENY") in headers
+    assert (b"content-type", b"application/json") in headers
+    assert {name.lower().encode() for name in SECURITY_HEADERS} <= set(names)
+
+def test_rate_limit_short_circuits(monkeypatch):
+    """Test over-limit requests get a 429 without reaching the app"""
+    import middleware
+    monkeypatch.setattr(middleware.audit_logger, "log_rate_limit", lambda **kwargs: None)
+
+    reached = []
+
+    async def app(scope, receive, send):
+        reached.append(scope["path"])
+        await endpoint(scope, receive, send)
+
+    limiter = StubLimiter(allowed=False)
+    sent = run_asgi(GlobalRateLimitMiddleware(app, limiter=limiter))
+    assert sent[0]["status"] == 429
+    assert dict(sent[0]["headers"])[b"retry-after"] == b"1"
+    assert reached == []
+    assert limiter.calls == ["10.0.0.1"]
+
+    # Exempt paths and CORS preflights skip the limiter
+    run_asgi(GlobalRateLimitMiddleware(app, limiter=limiter), path="/api/health")
+    run_asgi(GlobalRateLimitMiddleware(app, limiter=limiter), method="OPTIONS")
+    assert reached == ["/api/health", "/api/entries"]
+    assert limiter.calls == ["10.0.0.1"]
+
+def test_rate_limit_check_stays_on_the_event_loop():
+    """Test the limiter is awaited on the loop's thread, so it never takes a threadpool worker"""
+    import threading
+
+    class ThreadRecordingLimiter(StubLimiter):
+        async def check_rate_limit_async(self, identifier):
+            self.thread = threading.current_thread()
+            return await super().check_rate_limit_async(identifier)
+
+    limiter = ThreadRecordingLimiter(allowed=True)
+    sent = run_asgi(GlobalRateLimitMiddleware(endpoint, limiter=limiter))
+    assert sent[0]["status"] == 200
+    assert limiter.thread is threading.main_thread()
+
+def test_async_limiter_counts_like_the_sync_one(monkeypatch):
+    """Test check_rate_limit_async shares windows with check_rate_limit and falls back the same way"""
+    import rate_limiter
+    from testing.fakes import FakeRedis, FakeAsyncRedis
+
+    redis = FakeRedis()
+    monkeypatch.setattr(rate_limiter, "redis_client", redis)
+    monkeypatch.setattr(rate_limiter, "async_redis_client", FakeAsyncRedis(redis))
+    limiter = rate_limiter.RateLimiter(max_requests=3, window_seconds=60, name="test")
+
+    assert asyncio.run(limiter.check_rate_limit_async("10.0.0.1"))["remaining"] == 2
+    assert limiter.check_rate_limit("10.0.0.1")["remaining"] == 1
+    assert asyncio.run(limiter.check_rate_limit_async("10.0.0.1"))["remaining"] == 0
+    assert not asyncio.run(limiter.check_rate_limit_async("10.0.0.1"))["allowed"]
+
+    class DownAsyncRedis:
+        def pipeline(self):
+            raise rate_limiter.CircuitOpenError("redis circuit is open")
+
+    monkeypatch.setattr(rate_limiter, "async_redis_client", DownAsyncRedis())
+    assert asyncio.run(limiter.check_rate_limit_async("10.0.0.2"))["remaining"] == 2
+    assert limiter.local_status("10.0.0.2")[0] == 1
@@ -0,0 +1,36 @@
+import threading
+import pytest
+from fastapi import HTTPException
+from password_executor import PasswordHashExecutor
+
+def test_run_returns_result_and_records_latency():
+    """Test hashes run on the pool and are counted"""
+    executor = PasswordHashExecutor(max_workers=1, max_queue=0)
+    assert executor.run(lambda a, b: a + b, 2, 3) == 5
+    stats = executor.get_stats()
+    assert stats["completed"] == 1
+    assert stats["in_flight"] == 0
+
+def test_rejects_with_503_when_saturated():
+    """Test saturated pool fails fast instead of queueing"""
+    executor = PasswordHashExecutor(max_workers=1, max_queue=0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+        return "hash"
+
+    worker = threading.Thread(target=executor.run, args=(slow_hash,))
+    worker.start()
+    started.wait(5)
+
+    with pytest.raises(HTTPException) as exc:
+        executor.run(lambda: "other")
+    assert exc.value.status_code == 503
+
+    release.set()
+    worker.join(5)
+    assert executor.get_stats()["rejected"] == 1
+    assert executor.run(lambda: "ok") == "ok"
@@ -0,0 +1,59 @@
+import threading
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import profiling
+from profiling import ProfilingMiddleware, ProfiledRoute, to_collapsed, to_speedscope
+
+def make_app():
+    app = FastAPI()
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(ProfilingMiddleware, token="secret", sample_rate=0, interval_ms=1)
+
+    @app.get("/slow/{item_id}")
+    def slow(item_id: int):
+        time.sleep(0.05)
+        return {"item_id": item_id}
+
+    return app
+
+def test_profiled_request(monkeypatch):
+    """Test the X-Profile header profiles the worker thread running the endpoint"""
+    saved = []
+    done = threading.Event()
+    monkeypatch.setattr(profiling, "save_profile", lambda profile: (saved.append(profile), done.set()))
+    client = TestClient(make_app())
+
+    # Sync endpoints keep their signature for request validation
+    assert client.get("/slow/abc").status_code == 422
+
+    response = client.get("/slow/7", headers={"X-Profile": "wrong"})
+    assert response.json() == {"item_id": 7}
+    assert "x-profile-id" not in response.headers
+    assert saved == []
+
+    response = client.get("/slow/7", headers={"X-Profile": "secret"})
+    assert done.wait(2)
+    profile = saved[0]
+    assert response.headers["x-profile-id"] == profile.id
+    assert profile.route == "/slow/{item_id}"
+    assert profile.status == 200
+    assert profile.samples > 0
+    assert any("slow (test_profiling.py" in stack for stack in profile.stacks)
+    assert profile.summary()["breakdown_ms"]["app"] > 0
+
+def test_profile_formats():
+    """Test collapsed stacks and speedscope output share frames"""
+    stacks = {"main (app.py:1);handler (app.py:5)": 300, "main (app.py:1);execute (db.py:29)": 700}
+    assert to_collapsed(stacks).splitlines() == [
+        "main (app.py:1);handler (app.py:5) 300",
+        "main (app.py:1);execute (db.py:29) 700",
+    ]
+
+    summary = {"id": "abc", "method": "GET", "path": "/api/entries"}
+    speedscope = to_speedscope(summary, stacks)
+    frames = [frame["name"] for frame in speedscope["shared"]["frames"]]
+    assert frames == ["main (app.py:1)", "handler (app.py:5)", "execute (db.py:29)"]
+    profile = speedscope["profiles"][0]
+    assert profile["samples"] == [[0, 1], [0, 2]]
+    assert profile["endValue"] == 1000
@@ -0,0 +1,112 @@
+from query_log import QueryLog, explain_plan, fingerprint
+
+class StubCursor:
+    """Just enough of a psycopg2 cursor for the query log"""
+
+    def __init__(self, connection=None, rowcount=1):
+        self.connection = connection
+        self.rowcount = rowcount
+        self.name = None
+        self.executed = []
+        self._rows = []
+
+    def mogrify(self, query, vars=None):
+        return (query % tuple(repr(v) for v in vars or ())).encode()
+
+    def execute(self, query, vars=None):
+        self.executed.append(query.decode() if isinstance(query, bytes) else query)
+        self._rows = [("Index Scan using idx_entries_user_id",), ("Buffers: shared hit=3",)]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+class StubConnection:
+    autocommit = False
+
+    def __init__(self):
+        self.explain_cursor = StubCursor()
+
+    def cursor(self, cursor_factory=None):
+        return self.explain_cursor
+
+def test_fingerprint_groups_query_shapes():
+    """Test literals, bind params and IN lists normalize to one shape"""
+    a = fingerprint("SELECT * FROM knowledge_entries WHERE user_id = %s AND id IN (1, 2, 3)")
+    b = fingerprint("select * from knowledge_entries\n  WHERE user_id = 42 AND id IN (7)  -- cached")
+    assert a == "SELECT * FROM knowledge_entries WHERE user_id = ? AND id IN (?, ...)"
+    assert b == "select * from knowledge_entries WHERE user_id = ? AND id IN (?)"
+    assert fingerprint("SELECT * FROM audit_logs_p2026_01 WHERE email = 'a@b.c'") == \
+        "SELECT * FROM audit_logs_p2026_01 WHERE email = ?"
+
+def test_top_queries_and_slow_log():
+    """Test shapes aggregate count/total/max and slow statements get a sampled plan"""
+    log = QueryLog(slow_ms=100, explain_rate=1.0, explain_cooldown=60)
+    conn = StubConnection()
+    query = "SELECT id FROM knowledge_entries WHERE user_id = %s"
+
+    log.record(StubCursor(conn), query, (1,), 0.010)
+    log.record(StubCursor(conn), query, (2,), 0.250)
+    log.record(StubCursor(conn), query, (3,), 0.300)
+    log.record(StubCursor(conn), "UPDATE users SET email = %s WHERE id = %s", ("x", 1), 0.005)
+
+    top = log.top_queries(limit=1)
+    assert top[0]["calls"] == 3
+    assert top[0]["max_ms"] == 300.0
+    assert top[0]["slow_calls"] == 2
+    assert log.top_queries(sort="calls")[1]["operation"] == "UPDATE"
+
+    slow = log.recent_slow()
+    assert [entry["duration_ms"] for entry in slow] == [300.0, 250.0]
+    # Only one plan per shape per cooldown
+    assert slow[1]["analyzed"] and "Index Scan" in slow[1]["plan"]
+    assert slow[0]["plan"] is None
+
+def test_explain_never_analyzes_writes():
+    """Test writes get a plain EXPLAIN inside a savepoint"""
+    conn = StubConnection()
+    plan, analyzed = explain_plan(StubCursor(conn), "DELETE FROM knowledge_entries WHERE id = %s", (5,))
+    assert not analyzed
+    executed = conn.explain_cursor.executed
+    assert executed[0] == "SAVEPOINT query_log_explain"
+    assert executed[1] == "EXPLAIN DELETE FROM knowledge_entries WHERE id = 5"
+    assert executed[2] == "RELEASE SAVEPOINT query_log_explain"
+
+    assert explain_plan(StubCursor(conn), "CREATE INDEX foo ON bar (baz)", None) == (None, False)
+
+def test_reads_are_analyzed_read_only_and_rolled_back():
+    """Test a read is re-run read-only and undone, and one that writes gets a plain EXPLAIN instead"""
+    import psycopg2.errors
+
+    conn = StubConnection()
+    plan, analyzed = explain_plan(StubCursor(conn), "SELECT * FROM knowledge_entries WHERE id = %s", (5,))
+    assert analyzed and "Index Scan" in plan
+    assert conn.explain_cursor.executed == [
+        "SAVEPOINT query_log_explain",
+        "SET TRANSACTION READ ONLY",
+        "EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM knowledge_entries WHERE id = 5",
+        "ROLLBACK TO SAVEPOINT query_log_explain",
+        "RELEASE SAVEPOINT query_log_explain",
+    ]
+
+    class PartitionCursor(StubCursor):
+        def execute(self, query, vars=None):
+            super().execute(query, vars)
+            if self.executed[-1].startswith("EXPLAIN (ANALYZE"):
+                raise psycopg2.errors.ReadOnlySqlTransaction("cannot execute CREATE TABLE in a read-only transaction")
+
+    conn.explain_cursor = PartitionCursor()
+    plan, analyzed = explain_plan(StubCursor(conn), "SELECT audit_logs_create_partitions(%s)", (3,))
+    assert not analyzed and "Index Scan" in plan
+    assert conn.explain_cursor.executed[-3:] == [
+        "SAVEPOINT query_log_explain",
+        "EXPLAIN SELECT audit_logs_create_partitions(3)",
+        "RELEASE SAVEPOINT query_log_explain",
+    ]
+
+    conn.autocommit = True
+    conn.explain_cursor = StubCursor()
+    explain_plan(StubCursor(conn), "SELECT 1", None)
+    assert conn.explain_cursor.executed == ["BEGIN READ ONLY", "EXPLAIN (ANALYZE, BUFFERS) SELECT 1", "ROLLBACK"]
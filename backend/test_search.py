@@ -0,0 +1,102 @@
+from datetime import datetime
+import pytest
+import search_service
+from testing.helpers import run_migration
+from search_service import normalize_search, build_search_sql, build_count_sql, search_cache_key
+
+def test_filters_build_one_parameterized_query():
+    """Test every filter becomes a placeholder, in order, in a single statement"""
+    search = normalize_search(
+        q='  "redis cache"  -memcached ', tags=["Redis", "python"], any_tags=["a", "b"], exclude_tags=["Draft"],
+        created_after=datetime(2026, 1, 1), updated_before=datetime(2026, 6, 1), page=3, limit=10
+    )
+    sql, params = build_search_sql(7, search)
+
+    assert sql.count("%s") == len(params)
+    assert params == ['"redis cache" -memcached', 7, ["python", "redis"], ["a", "b"], ["draft"],
+                      "2026-01-01T00:00:00", "2026-06-01T00:00:00", 10, 20]
+    assert "websearch_to_tsquery" in sql and "search_vector @@ query" in sql
+    assert "tags @> %s::text[]" in sql and "tags && %s::text[]" in sql
+    assert "ORDER BY rank DESC" in sql and "ts_headline" in sql
+
+    browse = normalize_search(tags=["redis"])
+    sql, params = build_search_sql(7, browse)
+    assert browse["sort"] == "updated"
+    assert "tsquery" not in sql and "ts_headline" not in sql
+    assert params == [7, ["redis"], 20, 0]
+
+def test_invalid_params_are_rejected():
+    """Test bad sorts, pages and tags raise ValueError (400 at the API)"""
+    for kwargs in ({"sort": "title"}, {"sort": "relevance"}, {"page": 0}, {"page": 500}, {"tags": ["x" * 51]}):
+        with pytest.raises(ValueError):
+            normalize_search(**kwargs)
+    assert search_cache_key(1, normalize_search(q="a  b", tags=["y", "X"])) == \
+        search_cache_key(1, normalize_search(q="a b", tags=["x", "y"]))
+
+def test_results_are_cached_until_the_next_write(api, monkeypatch):
+    """Test a repeated search is served from Redis and a write makes it a miss"""
+    client, headers, _ = api
+    calls = []
+
+    def run_query(user_id, search):
+        calls.append(search)
+        return [{"id": 1, "title": "Redis", "tags": ["redis"], "created_at": "2026-01-01 00:00:00",
+                 "updated_at": "2026-01-01 00:00:00", "rank": 0.5, "total": 21,
+                 "snippet": "<mark>Redis</mark> pipelines"}]
+
+    monkeypatch.setattr(search_service, "_run_query", run_query)
+    first = client.get("/api/search?q=redis&tags=Redis", headers=headers).json()
+    assert first["total"] == 21 and first["has_more"] is True
+    assert first["results"][0]["snippet"] == "<mark>Redis</mark> pipelines"
+    assert client.get("/api/search?q=redis&tags=redis", headers=headers).json() == first
+    assert len(calls) == 1
+
+    client.post("/api/entries", json={"title": "t", "content": "c"}, headers=headers)
+    client.get("/api/search?q=redis&tags=redis", headers=headers)
+    assert len(calls) == 2
+
+    assert client.get("/api/search?sort=relevance", headers=headers).status_code == 400
+
+def test_page_past_the_end_still_reports_the_total(api, monkeypatch):
+    """Test an empty page after the last result counts the matches instead of reporting 0"""
+    client, headers, _ = api
+    counted = []
+    monkeypatch.setattr(search_service, "_run_query", lambda user_id, search: [])
+    monkeypatch.setattr(search_service, "_run_count", lambda user_id, search: counted.append(search) or 21)
+
+    result = client.get("/api/search?q=redis&page=4&limit=10", headers=headers).json()
+    assert (result["total"], result["has_more"], result["results"]) == (21, False, [])
+    assert client.get("/api/search?q=nothing", headers=headers).json()["total"] == 0
+    assert len(counted) == 1
+
+def test_search_sql_on_postgres(postgres):
+    """Test the generated statements against the real search index: filters, ranking, snippets, totals"""
+    run_migration(postgres, "create_search_index.sql")
+    postgres.execute("INSERT INTO users (email, password_hash) VALUES ('a@b.co', 'x'), ('c@d.co', 'x') RETURNING id")
+    user_id, other_id = [row["id"] for row in postgres.fetchall()]
+    for owner, title, content, tags in (
+        (user_id, "Redis pipelines", "Batch commands to cut round trips", ["redis", "perf"]),
+        (user_id, "Caching notes", "Redis is used as a cache in front of Postgres", ["redis"]),
+        (user_id, "Memcached", "Redis alternative without persistence", ["draft"]),
+        (user_id, "Postgres indexes", "GIN indexes for arrays", ["postgres"]),
+        (other_id, "Redis elsewhere", "Another user's redis note", ["redis"]),
+    ):
+        postgres.execute("INSERT INTO knowledge_entries (user_id, title, content, tags) VALUES (%s, %s, %s, %s)",
+                         (owner, title, content, tags))
+
+    def run(build, **kwargs):
+        sql, params = build(user_id, normalize_search(**kwargs))
+        postgres.execute(sql, params)
+        return postgres.fetchall()
+
+    rows = run(build_search_sql, q="redis", exclude_tags=["draft"])
+    assert [row["title"] for row in rows] == ["Redis pipelines", "Caching notes"]
+    assert rows[0]["total"] == 2 and rows[0]["rank"] > rows[1]["rank"]
+    assert "<mark>Redis</mark>" in rows[1]["snippet"]
+
+    assert [row["title"] for row in run(build_search_sql, tags=["redis"], any_tags=["perf", "postgres"])] == \
+        ["Redis pipelines"]
+    assert run(build_search_sql, q='"round trips" -memcached', limit=1)[0]["title"] == "Redis pipelines"
+
+    assert run(build_search_sql, q="redis", page=4, limit=1) == []
+    assert run(build_count_sql, q="redis", page=4, limit=1)[0]["total"] == 3
@@ -0,0 +1,22 @@
+import subprocess
+import sys
+from benchmarks.bench_startup import parse_importtime, top_level_packages
+
+def test_heavy_clients_are_not_imported_at_startup():
+    """Test importing the app leaves the Anthropic SDK, passlib and jose for first use"""
+    check = "import sys, main; print(sorted(m for m in ('anthropic', 'passlib', 'jose') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+def test_parse_importtime():
+    """Test -X importtime output is parsed into per-package totals"""
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     redis.utils\n"
+        "import time:       300 |        420 |   redis\n"
+        "import time:        50 |        470 | rate_limiter\n"
+    )
+    rows = parse_importtime(stderr)
+    assert rows[0] == ("redis.utils", 120, 120, 2)
+    assert top_level_packages(rows) == {"redis": 420, "rate_limiter": 470}
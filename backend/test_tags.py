@@ -0,0 +1,92 @@
+import json
+from ai_service import process_tool_call
+from testing import fakes
+from testing.helpers import auth_headers, run_migration
+
+def test_tag_counts_follow_writes(api):
+    """Test /api/tags counts change with create, update and delete, and list_tags returns them"""
+    client, headers, _ = api
+    other = auth_headers(2, "c@d.co")
+
+    def create(tags, auth=headers):
+        return client.post("/api/entries", json={"title": "t", "content": "c", "tags": tags}, headers=auth).json()["id"]
+
+    first = create(["Redis", "caching"])
+    create(["redis"])
+    create(["postgres"], auth=other)
+    assert client.get("/api/tags", headers=headers).json() == [
+        {"tag": "redis", "count": 2}, {"tag": "caching", "count": 1}
+    ]
+
+    client.put(f"/api/entries/{first}", json={"tags": ["caching", "python"]}, headers=headers)
+    assert client.get("/api/tags", headers=headers).json() == [
+        {"tag": "caching", "count": 1}, {"tag": "python", "count": 1}, {"tag": "redis", "count": 1}
+    ]
+
+    client.delete(f"/api/entries/{first}", headers=headers)
+    assert client.get("/api/tags?limit=5", headers=headers).json() == [{"tag": "redis", "count": 1}]
+
+    assert json.loads(process_tool_call("list_tags", {}, 2)) == {
+        "total": 1, "tags": [{"tag": "postgres", "count": 1}]
+    }
+    # Models sometimes send numbers as strings
+    assert json.loads(process_tool_call("list_tags", {"limit": "5"}, 1)) == {
+        "total": 1, "tags": [{"tag": "redis", "count": 1}]
+    }
+    assert process_tool_call("list_tags", {"limit": "all"}, 1) == "limit must be a whole number of tags"
+
+def tag_counts(cursor) -> list:
+    cursor.execute("SELECT user_id, tag, entry_count FROM user_tag_counts ORDER BY user_id, tag")
+    return [(row["user_id"], row["tag"], row["entry_count"]) for row in cursor.fetchall()]
+
+def check_tag_counter(cursor):
+    """
+    The cases the API doesn't produce but direct writes can: a tag listed
+    twice counts once, NULL tags and NULL elements are ignored, and entries
+    without a user count for no one
+    """
+    cursor.execute("INSERT INTO users (email, password_hash) VALUES (%s, %s) RETURNING id", ("a@b.co", "x"))
+    user_id = cursor.fetchone()["id"]
+
+    def insert(tags):
+        cursor.execute(
+            "INSERT INTO knowledge_entries (user_id, title, content, tags) VALUES (%s, %s, %s, %s) RETURNING id",
+            (user_id, "t", "c", tags)
+        )
+        return cursor.fetchone()["id"]
+
+    first = insert(["redis", "redis", "cache"])
+    second = insert(["redis", None])
+    insert(None)
+    assert tag_counts(cursor) == [(user_id, "cache", 1), (user_id, "redis", 2)]
+
+    cursor.execute("UPDATE knowledge_entries SET tags = %s WHERE id = %s", (["redis", "python", "python"], first))
+    cursor.execute("UPDATE knowledge_entries SET tags = %s WHERE id = %s", (["redis", None, "cache"], second))
+    assert tag_counts(cursor) == [(user_id, "cache", 1), (user_id, "python", 1), (user_id, "redis", 2)]
+
+    cursor.execute("DELETE FROM knowledge_entries WHERE id = %s", (first,))
+    assert tag_counts(cursor) == [(user_id, "cache", 1), (user_id, "redis", 1)]
+
+    cursor.execute(
+        "INSERT INTO knowledge_entries (user_id, title, content, tags) VALUES (%s, %s, %s, %s) RETURNING id",
+        (None, "t", "c", ["redis", "orphan"])
+    )
+    orphan = cursor.fetchone()["id"]
+    cursor.execute("UPDATE knowledge_entries SET tags = %s WHERE id = %s", (["orphan"], orphan))
+    cursor.execute("DELETE FROM knowledge_entries WHERE id = %s", (orphan,))
+    assert tag_counts(cursor) == [(user_id, "cache", 1), (user_id, "redis", 1)]
+    return user_id
+
+def test_fake_tag_counter_follows_the_trigger():
+    """Test testing/fakes.py counts duplicate and NULL tags like create_tag_counts.sql"""
+    check_tag_counter(fakes.FakeDatabase().connect().cursor())
+
+def test_tag_counter_trigger(postgres):
+    """Test the trigger itself on the same cases, then a user delete cascading through it"""
+    run_migration(postgres, "create_tag_counts.sql")
+    user_id = check_tag_counter(postgres)
+
+    postgres.execute("INSERT INTO knowledge_entries (user_id, title, content, tags) VALUES (%s, 't', 'c', %s)",
+                     (user_id, ["redis"]))
+    postgres.execute("DELETE FROM users WHERE id = %s", (user_id,))
+    assert tag_counts(postgres) == []
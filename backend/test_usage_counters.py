@@ -0,0 +1,33 @@
+from testing.helpers import run_migration
+
+def usage(cursor) -> tuple:
+    cursor.execute("SELECT name, SUM(value) AS total FROM usage_counters GROUP BY name ORDER BY name")
+    totals = {row["name"]: row["total"] for row in cursor.fetchall()}
+    cursor.execute("SELECT user_id, entry_count, content_bytes FROM user_usage ORDER BY user_id")
+    return totals, [(row["user_id"], row["entry_count"], row["content_bytes"]) for row in cursor.fetchall()]
+
+def test_usage_counter_triggers(postgres):
+    """Test create_usage_counters.sql's triggers follow inserts, updates and deletes, including entries without a user"""
+    postgres.execute("INSERT INTO users (email, password_hash) VALUES ('a@b.co', 'x') RETURNING id")
+    user_id = postgres.fetchone()["id"]
+    postgres.execute("INSERT INTO knowledge_entries (user_id, title, content) VALUES (%s, 'ab', 'cdé')", (user_id,))
+    run_migration(postgres, "create_usage_counters.sql")
+    assert usage(postgres) == ({"entries": 1, "users": 1}, [(user_id, 1, 6)])
+
+    postgres.execute("INSERT INTO knowledge_entries (user_id, title, content) VALUES (%s, 't', 'c') RETURNING id",
+                     (user_id,))
+    second = postgres.fetchone()["id"]
+    postgres.execute("INSERT INTO knowledge_entries (user_id, title, content) VALUES (NULL, 'orphan', 'c') RETURNING id")
+    orphan = postgres.fetchone()["id"]
+    assert usage(postgres) == ({"entries": 3, "users": 1}, [(user_id, 2, 8)])
+
+    postgres.execute("UPDATE knowledge_entries SET content = 'longer' WHERE id = %s", (second,))
+    postgres.execute("UPDATE knowledge_entries SET content = 'longer' WHERE id = %s", (orphan,))
+    assert usage(postgres) == ({"entries": 3, "users": 1}, [(user_id, 2, 13)])
+
+    postgres.execute("DELETE FROM knowledge_entries WHERE id = %s", (orphan,))
+    postgres.execute("DELETE FROM knowledge_entries WHERE id = %s", (second,))
+    assert usage(postgres) == ({"entries": 1, "users": 1}, [(user_id, 1, 6)])
+
+    postgres.execute("DELETE FROM users WHERE id = %s", (user_id,))
+    assert usage(postgres) == ({"entries": 0, "users": 0}, [])
@@ -0,0 +1,52 @@
+import pytest
+from pydantic import ValidationError
+from models import KnowledgeEntryCreate, KnowledgeEntryUpdate, ChatMessage, UserRegister
+from validation import clean_content, clean_title, normalize_tags
+
+def test_content_is_stripped_and_escaped():
+    """Test content sanitization matches html.escape of the stripped text"""
+    assert clean_content("  <b>bold</b> & co  ") == "&lt;b&gt;bold&lt;/b&gt; &amp; co"
+    assert clean_content("plain\ntext\twith tabs") == "plain\ntext\twith tabs"
+
+def test_content_limits_and_control_chars():
+    """Test content length and control character checks"""
+    assert len(clean_content("x" * 50000)) == 50000
+    with pytest.raises(ValueError, match="50,000"):
+        clean_content("x" * 50001)
+    with pytest.raises(ValueError, match="invalid characters"):
+        clean_content("bad \x07 bell")
+    with pytest.raises(ValueError, match="invalid characters"):
+        clean_content("bad \x85 next line")
+    with pytest.raises(ValueError, match="empty"):
+        clean_content("   ")
+
+def test_title_rejects_newlines():
+    """Test titles reject all control characters"""
+    assert clean_title(" My <Title> ") == "My &lt;Title&gt;"
+    with pytest.raises(ValueError, match="invalid characters"):
+        clean_title("two\nlines")
+
+def test_tags_normalized_once():
+    """Test tags are stripped, lowercased, de-duplicated and validated"""
+    assert normalize_tags([" Python ", "", "python", "Fast-API_2"]) == ["python", "fast-api_2"]
+    with pytest.raises(ValueError, match="invalid characters"):
+        normalize_tags(["<script>"])
+    with pytest.raises(ValueError, match="more than 10"):
+        normalize_tags([f"t{i}" for i in range(11)])
+
+def test_models_share_validators():
+    """Test Create, Update and Chat models use the shared validators"""
+    entry = KnowledgeEntryCreate(title="T", content="a < b", tags=["X"])
+    assert entry.content == "a &lt; b" and entry.tags == ["x"]
+
+    update = KnowledgeEntryUpdate(content="a < b")
+    assert update.content == "a &lt; b" and update.title is None
+
+    with pytest.raises(ValidationError):
+        ChatMessage(message="x" * 2001)
+
+def test_register_password_rules():
+    """Test password strength rules"""
+    UserRegister(email="dev@example.com", password="Str0ng!pass")
+    with pytest.raises(ValidationError, match="uppercase"):
+        UserRegister(email="dev@example.com", password="weak!pass1")
@@ -0,0 +1,810 @@
+"""
+In-Memory Stand-ins
+Fake Redis, PostgreSQL and Anthropic clients for the tests and the load test,
+so the API runs without any services. install() swaps them into every loaded
+module that uses redis_client / get_db_connection, and patches
+ai_service.client.
+
+The fake database understands the simple single-table SQL the API issues
+(SELECT/INSERT/UPDATE/DELETE with `col = %s` filters, ILIKE, tags @>,
+= ANY(%s), ORDER BY, LIMIT, RETURNING). Anything else raises
+NotImplementedError and is recorded in FakeDatabase.unsupported, which the
+api fixture and the load test check.
+
+Not supported, so tests of these need TEST_DATABASE_URL / REDIS_URL:
+- Joins, GROUP BY, aggregates other than octet_length/left, subqueries,
+  full-text search (tsvector, ts_rank), window functions, ON CONFLICT
+- Constraints, column defaults other than timestamps, transactions (commit
+  and rollback do nothing) and isolation between connections
+- Triggers and functions from migrations/, except the tag counter
+  (create_tag_counts.sql), which _count_tags copies
+- Lua: only the scripts the app loads, as Python copies
+  (_script_save_entry, _script_fill_entries) that must be kept in step
+- Redis commands the app doesn't use, WATCH, pub/sub, and eviction (keys
+  only go when their TTL runs out)
+"""
+import asyncio
+import fnmatch
+import hashlib
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from redis.exceptions import NoScriptError
+
+
+# ============ REDIS ============
+
+class FakeResponseError(Exception):
+    """An error reply from a command, like redis.exceptions.ResponseError"""
+
+
+def _value(value):
+    """Store values like Redis returns them: text, or bytes for binary (cache_codec) values"""
+    return value if isinstance(value, bytes) else str(value)
+
+
+class FakeRedis:
+    """
+    Thread-safe in-memory subset of the redis-py API (decode_responses=True)
+    Binary values are returned as bytes, so one instance also stands in for
+    cache_service.redis_binary_client.
+    """
+
+    def __init__(self, latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._commands = 0
+        self._scripts = {}
+
+    def _round_trip(self):
+        self._commands += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _alive(self, key) -> bool:
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    # Strings
+    def _get(self, key):
+        if self._alive(key):
+            self._hits += 1
+            return self._data[key]
+        self._misses += 1
+        return None
+
+    def _set(self, key, value, ex=None, nx=False):
+        if nx and self._alive(key):
+            return None
+        self._data[key] = _value(value)
+        self._expires.pop(key, None)
+        if ex is not None:
+            self._expires[key] = time.monotonic() + ex
+        return True
+
+    def _incr(self, key, amount=1):
+        value = int(self._data[key]) + amount if self._alive(key) else amount
+        self._data[key] = str(value)
+        return value
+
+    def _ttl(self, key):
+        if not self._alive(key):
+            return -2
+        deadline = self._expires.get(key)
+        return -1 if deadline is None else max(0, int(round(deadline - time.monotonic())))
+
+    def _expire(self, key, seconds):
+        if not self._alive(key):
+            return False
+        self._expires[key] = time.monotonic() + seconds
+        return True
+
+    def _delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                removed += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return removed
+
+    def _keys(self, pattern="*"):
+        return [key for key in list(self._data) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    def _mget(self, keys, *more):
+        keys = list(keys) if isinstance(keys, (list, tuple)) else [keys]
+        return [self._get(key) for key in keys + list(more)]
+
+    # Lists
+    def _list(self, key):
+        if not self._alive(key):
+            self._data[key] = []
+        return self._data[key]
+
+    def _rpush(self, key, *values):
+        items = self._list(key)
+        items.extend(str(value) for value in values)
+        return len(items)
+
+    def _lpushx(self, key, *values):
+        if not self._alive(key):
+            return 0
+        items = self._data[key]
+        for value in values:
+            items.insert(0, str(value))
+        return len(items)
+
+    def _lrange(self, key, start, end):
+        items = self._data[key] if self._alive(key) else []
+        return list(items[start:None if end == -1 else end + 1])
+
+    def _lrem(self, key, count, value):
+        if not self._alive(key):
+            return 0
+        items = self._data[key]
+        kept = [item for item in items if item != str(value)]
+        removed = len(items) - len(kept)
+        self._data[key] = kept
+        return removed
+
+    def _lset(self, key, index, value):
+        if not self._alive(key):
+            raise FakeResponseError("ERR no such key")
+        self._data[key][index] = str(value)
+        return True
+
+    # Hashes
+    def _hash(self, key):
+        if not self._alive(key):
+            self._data[key] = {}
+        return self._data[key]
+
+    def _hset(self, key, field=None, value=None, mapping=None):
+        fields = dict(mapping or {})
+        if field is not None:
+            fields[field] = value
+        data = self._hash(key)
+        added = sum(1 for name in fields if str(name) not in data)
+        data.update({str(name): _value(value) for name, value in fields.items()})
+        return added
+
+    def _hget(self, key, field):
+        return self._data[key].get(str(field)) if self._alive(key) else None
+
+    def _hgetall(self, key):
+        return dict(self._data[key]) if self._alive(key) else {}
+
+    def _hdel(self, key, *fields):
+        if not self._alive(key):
+            return 0
+        data = self._data[key]
+        return sum(1 for name in fields if data.pop(str(name), None) is not None)
+
+    # Sorted sets
+    def _zset(self, key):
+        if not self._alive(key):
+            self._data[key] = {}
+        return self._data[key]
+
+    def _zadd(self, key, mapping):
+        zset = self._zset(key)
+        added = sum(1 for member in mapping if member not in zset)
+        zset.update({member: float(score) for member, score in mapping.items()})
+        return added
+
+    def _zsorted(self, key):
+        return sorted(self._zset(key).items(), key=lambda item: (item[1], item[0]))
+
+    def _zrevrange(self, key, start, end):
+        members = [member for member, _ in reversed(self._zsorted(key))]
+        return members[start:None if end == -1 else end + 1]
+
+    def _zrangebylex(self, key, min, max, start=None, num=None):
+        """Members in byte order between lex bounds ('[a' inclusive, '(a' exclusive, '-', '+')"""
+        def bound(value, inclusive_op, exclusive_op):
+            value = value if isinstance(value, bytes) else value.encode()
+            if value in (b"-", b"+"):
+                return lambda member: True
+            op = inclusive_op if value[:1] == b"[" else exclusive_op
+            return lambda member: op(member, value[1:])
+
+        above = bound(min, bytes.__ge__, bytes.__gt__)
+        below = bound(max, bytes.__le__, bytes.__lt__)
+        members = sorted(self._data[key] if self._alive(key) else {}, key=str.encode)
+        matched = [member for member in members if above(member.encode()) and below(member.encode())]
+        if start is not None:
+            matched = matched[start:start + num if num is not None and num >= 0 else None]
+        return matched
+
+    def _zremrangebyrank(self, key, start, end):
+        members = self._zsorted(key)
+        doomed = members[start:None if end == -1 else end + 1]
+        for member, _ in doomed:
+            del self._data[key][member]
+        return len(doomed)
+
+    # Scripts: Lua doesn't run here, so each script is dispatched by the name
+    # on its first line ("-- save_entry") to a _script_<name> mirror
+    def _script_load(self, script):
+        script = script.decode() if isinstance(script, bytes) else script
+        sha = hashlib.sha1(script.encode()).hexdigest()
+        self._scripts[sha] = re.match(r"-- (\w+)", script).group(1)
+        return sha
+
+    def _evalsha(self, sha, numkeys, *args):
+        if sha not in self._scripts:
+            raise NoScriptError("NOSCRIPT No matching script")
+        keys, argv = list(args[:numkeys]), list(args[numkeys:])
+        return getattr(self, "_script_" + self._scripts[sha])(keys, argv)
+
+    def _script_save_entry(self, keys, argv):
+        """cache_service.SAVE_ENTRY_SCRIPT"""
+        ids_key, data_key, version_key, stamps_key, entry_key = keys
+        entry_id, value, stamp, version, created, list_ttl, entry_ttl, sentinel = argv
+        self._set(version_key, version, ex=int(list_ttl) * 2)
+        current = self._hget(stamps_key, entry_id)
+        if current is not None and (current == "deleted" or int(current) > int(stamp)):
+            self._hdel(data_key, entry_id)
+            self._delete(entry_key)
+            return 0
+        self._hset(stamps_key, entry_id, stamp)
+        self._expire(stamps_key, int(list_ttl) * 2)
+        if str(created) == "1":
+            self._lrem(ids_key, 0, entry_id)
+            self._lpushx(ids_key, entry_id)
+        self._hset(data_key, entry_id, value)
+        self._expire(data_key, int(list_ttl))
+        if self._alive(ids_key):
+            self._lset(ids_key, -1, f"{sentinel}{version}")
+        self._set(entry_key, value, ex=int(entry_ttl))
+        return 1
+
+    def _script_fill_entries(self, keys, argv):
+        """cache_service.FILL_ENTRIES_SCRIPT (mcp-server/cache.py runs the same script)"""
+        version_key, entry_keys = keys[0], keys[1:]
+        version, ttl, values = argv[0], argv[1], argv[2:]
+        current = self._get(version_key)
+        if (current.decode() if isinstance(current, bytes) else current or "") != str(version):
+            return 0
+        for key, value in zip(entry_keys, values):
+            self._set(key, value, ex=int(ttl))
+        return 1
+
+    def _run(self, command, *args, **kwargs):
+        with self._lock:
+            return getattr(self, "_" + command)(*args, **kwargs)
+
+    def _call(self, command, *args, **kwargs):
+        self._round_trip()
+        return self._run(command, *args, **kwargs)
+
+    def get(self, key):
+        return self._call("get", key)
+
+    def set(self, key, value, ex=None, nx=False):
+        return self._call("set", key, value, ex=ex, nx=nx)
+
+    def setex(self, key, seconds, value):
+        return self._call("set", key, value, ex=seconds)
+
+    def incr(self, key, amount=1):
+        return self._call("incr", key, amount)
+
+    def ttl(self, key):
+        return self._call("ttl", key)
+
+    def expire(self, key, seconds):
+        return self._call("expire", key, seconds)
+
+    def delete(self, *keys):
+        return self._call("delete", *keys)
+
+    def keys(self, pattern="*"):
+        return self._call("keys", pattern)
+
+    def mget(self, keys, *more):
+        return self._call("mget", keys, *more)
+
+    def zadd(self, key, mapping):
+        return self._call("zadd", key, mapping)
+
+    def zrevrange(self, key, start, end):
+        return self._call("zrevrange", key, start, end)
+
+    def zrangebylex(self, key, min, max, start=None, num=None):
+        return self._call("zrangebylex", key, min, max, start, num)
+
+    def zremrangebyrank(self, key, start, end):
+        return self._call("zremrangebyrank", key, start, end)
+
+    def hget(self, key, field):
+        return self._call("hget", key, field)
+
+    def script_load(self, script):
+        return self._call("script_load", script)
+
+    def evalsha(self, sha, numkeys, *args):
+        return self._call("evalsha", sha, numkeys, *args)
+
+    def ping(self):
+        self._round_trip()
+        return True
+
+    def info(self):
+        self._round_trip()
+        return {
+            "used_memory_human": f"{len(self._data)} keys",
+            "connected_clients": 1,
+            "total_commands_processed": self._commands,
+            "keyspace_hits": self._hits,
+            "keyspace_misses": self._misses,
+        }
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues commands and runs them in one round trip on execute()"""
+
+    def __init__(self, redis: FakeRedis):
+        self._redis = redis
+        self._queue = []
+
+    def __getattr__(self, command):
+        if not hasattr(self._redis, "_" + command):
+            raise AttributeError(command)
+
+        def queue(*args, **kwargs):
+            self._queue.append((command, args, kwargs))
+            return self
+        return queue
+
+    def setex(self, key, seconds, value):
+        self._queue.append(("set", (key, value), {"ex": seconds}))
+        return self
+
+    def execute(self, raise_on_error: bool = True):
+        self._redis._round_trip()
+        return self._execute_queued(raise_on_error)
+
+    def _execute_queued(self, raise_on_error: bool) -> list:
+        results = []
+        with self._redis._lock:
+            for command, args, kwargs in self._queue:
+                try:
+                    results.append(self._redis._run(command, *args, **kwargs))
+                except FakeResponseError as e:
+                    results.append(e)
+        self._queue = []
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, FakeResponseError):
+                    raise result
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._queue = []
+        return False
+
+
+class FakeAsyncRedis:
+    """redis.asyncio look-alike sharing a FakeRedis's data; latency is awaited instead of slept"""
+
+    def __init__(self, redis: FakeRedis):
+        self._redis = redis
+
+    async def _round_trip(self):
+        self._redis._commands += 1
+        if self._redis.latency:
+            await asyncio.sleep(self._redis.latency)
+
+    def __getattr__(self, command):
+        if not hasattr(self._redis, "_" + command):
+            raise AttributeError(command)
+
+        async def call(*args, **kwargs):
+            await self._round_trip()
+            return self._redis._run(command, *args, **kwargs)
+        return call
+
+    async def setex(self, key, seconds, value):
+        await self._round_trip()
+        return self._redis._run("set", key, value, ex=seconds)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return FakeAsyncPipeline(self)
+
+
+class FakeAsyncPipeline(FakePipeline):
+    """FakePipeline whose execute() is awaited"""
+
+    def __init__(self, redis: FakeAsyncRedis):
+        super().__init__(redis._redis)
+        self._async = redis
+
+    async def execute(self, raise_on_error: bool = True):
+        await self._async._round_trip()
+        return self._execute_queued(raise_on_error)
+
+
+# ============ POSTGRES ============
+
+SELECT_RE = re.compile(
+    r"^SELECT (?P<cols>.+?)(?: FROM (?P<table>\w+)(?: WHERE (?P<where>.+?))?"
+    r"(?: ORDER BY (?P<order>\w+(?: (?:ASC|DESC))?(?:, \w+(?: (?:ASC|DESC))?)*))?(?: LIMIT (?P<limit>\d+|%s))?)?$",
+    re.IGNORECASE
+)
+INSERT_RE = re.compile(
+    r"^INSERT INTO (?P<table>\w+) \((?P<cols>[^)]+)\) VALUES \((?P<vals>[^)]+)\)(?: RETURNING (?P<ret>.+))?$",
+    re.IGNORECASE
+)
+UPDATE_RE = re.compile(
+    r"^UPDATE (?P<table>\w+) SET (?P<set>.+?) WHERE (?P<where>.+?)(?: RETURNING (?P<ret>.+))?$",
+    re.IGNORECASE
+)
+DELETE_RE = re.compile(
+    r"^DELETE FROM (?P<table>\w+) WHERE (?P<where>.+?)(?: RETURNING (?P<ret>.+))?$",
+    re.IGNORECASE
+)
+AND_RE = re.compile(r" AND (?![^(]*\))", re.IGNORECASE)
+EQ_RE = re.compile(r"^(\w+) = %s$")
+ILIKE_RE = re.compile(r"^\((\w+) ILIKE %s OR (\w+) ILIKE %s\)$", re.IGNORECASE)
+CONTAINS_RE = re.compile(r"^(\w+) @> %s(?:::text\[\])?$")
+ANY_RE = re.compile(r"^(\w+) = ANY\(%s\)$", re.IGNORECASE)
+COMMA_RE = re.compile(r",(?![^(]*\))")
+# Select-list expressions: func(col[, n]) AS alias
+EXPR_RE = re.compile(r"^(\w+)\((\w+)(?:, (\d+))?\) AS (\w+)$", re.IGNORECASE)
+FUNCTIONS = {
+    "octet_length": lambda value, n: len(value.encode()),
+    "left": lambda value, n: value[:n],
+}
+NOW = "CURRENT_TIMESTAMP"
+
+# Columns filled in on INSERT when not given
+TIMESTAMP_DEFAULTS = ("created_at", "updated_at", "timestamp")
+
+
+def normalize_sql(query) -> str:
+    """Collapse whitespace so statements can be matched with simple patterns"""
+    if isinstance(query, bytes):
+        query = query.decode()
+    query = " ".join(query.split()).rstrip(";")
+    return re.sub(r"\s+\)", ")", re.sub(r"\(\s+", "(", query))
+
+
+def _like(pattern: str) -> re.Pattern:
+    parts = (re.escape(part).replace("_", ".") for part in pattern.split("%"))
+    return re.compile("^" + ".*".join(parts) + "$", re.IGNORECASE | re.DOTALL)
+
+
+class FakeDatabase:
+    """Tables kept as lists of dicts, shared by every FakeConnection"""
+
+    def __init__(self, latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self.tables = {}
+        self.sequences = {}
+        self.unsupported = set()
+        self.statements = 0
+        self._lock = threading.RLock()
+        # table -> [fn(old_row, new_row)], run after each row write like AFTER ... FOR EACH ROW
+        self.triggers = {"knowledge_entries": [self._count_tags]}
+
+    def _count_tags(self, old, new):
+        """migrations/create_tag_counts.sql: per-user entry count for each tag"""
+        user_id = (new or old)["user_id"]
+        if user_id is None:
+            return
+        old_tags = set((old or {}).get("tags") or []) - {None}
+        new_tags = set((new or {}).get("tags") or []) - {None}
+        counts = self.tables.setdefault("user_tag_counts", [])
+        rows = {row["tag"]: row for row in counts if row["user_id"] == user_id}
+        for tag in new_tags - old_tags:
+            if tag in rows:
+                rows[tag]["entry_count"] += 1
+                rows[tag]["last_used_at"] = datetime.now()
+            else:
+                counts.append({"user_id": user_id, "tag": tag, "entry_count": 1, "last_used_at": datetime.now()})
+        for tag in old_tags - new_tags:
+            if tag in rows:
+                rows[tag]["entry_count"] -= 1
+                if rows[tag]["entry_count"] <= 0:
+                    counts.remove(rows[tag])
+
+    def _fire(self, table: str, old, new):
+        for trigger in self.triggers.get(table, ()):
+            trigger(old, new)
+
+    def connect(self, *args, **kwargs):
+        return FakeConnection(self)
+
+    def _columns(self, spec: str) -> list:
+        return [col.strip() for col in COMMA_RE.split(spec)]
+
+    def _conditions(self, where: str, params) -> list:
+        checks = []
+        for cond in AND_RE.split(where):
+            if match := EQ_RE.match(cond):
+                col, value = match.group(1), next(params)
+                checks.append(lambda row, col=col, value=value: row.get(col) == value)
+            elif match := ILIKE_RE.match(cond):
+                cols = match.groups()
+                patterns = [_like(next(params)) for _ in cols]
+                checks.append(lambda row, cols=cols, patterns=patterns: any(
+                    pattern.match(row.get(col) or "") for col, pattern in zip(cols, patterns)
+                ))
+            elif match := ANY_RE.match(cond):
+                col, values = match.group(1), set(next(params))
+                checks.append(lambda row, col=col, values=values: row.get(col) in values)
+            elif match := CONTAINS_RE.match(cond):
+                col, wanted = match.group(1), set(next(params))
+                checks.append(lambda row, col=col, wanted=wanted: wanted <= set(row.get(col) or []))
+            else:
+                raise NotImplementedError(cond)
+        return checks
+
+    def _project(self, rows, cols: list) -> list:
+        if cols == ["*"]:
+            return [dict(row) for row in rows]
+        getters = []
+        for col in cols:
+            if match := EXPR_RE.match(col):
+                func, source, n, alias = match.groups()
+                if func.lower() not in FUNCTIONS:
+                    raise NotImplementedError(col)
+                fn = FUNCTIONS[func.lower()]
+                getters.append((alias, lambda row, fn=fn, source=source, n=int(n or 0):
+                                None if row.get(source) is None else fn(row[source], n)))
+            else:
+                getters.append((col, lambda row, col=col: row.get(col)))
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+    def execute(self, query, params=None) -> list:
+        """Run a statement and return the rows it produces"""
+        sql = normalize_sql(query)
+        params = iter(params or ())
+        self.statements += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        try:
+            with self._lock:
+                return self._execute(sql, params)
+        except (NotImplementedError, StopIteration):
+            self.unsupported.add(sql)
+            raise NotImplementedError(f"Fake database does not support: {sql}")
+
+    def _execute(self, sql: str, params) -> list:
+        if match := INSERT_RE.match(sql):
+            table = self.tables.setdefault(match["table"], [])
+            now = datetime.now()
+            row = {col: now for col in TIMESTAMP_DEFAULTS}
+            for col, value in zip(self._columns(match["cols"]), self._columns(match["vals"])):
+                row[col] = now if value.upper() == NOW else next(params)
+            self.sequences[match["table"]] = self.sequences.get(match["table"], 0) + 1
+            row["id"] = self.sequences[match["table"]]
+            table.append(row)
+            self._fire(match["table"], None, row)
+            return self._project([row], self._columns(match["ret"])) if match["ret"] else []
+
+        if match := UPDATE_RE.match(sql):
+            changes = {}
+            for assignment in self._columns(match["set"]):
+                col, value = (part.strip() for part in assignment.split("=", 1))
+                changes[col] = datetime.now() if value.upper() == NOW else next(params)
+            checks = self._conditions(match["where"], params)
+            rows = [row for row in self.tables.get(match["table"], []) if all(check(row) for check in checks)]
+            for row in rows:
+                old = dict(row)
+                row.update(changes)
+                self._fire(match["table"], old, row)
+            return self._project(rows, self._columns(match["ret"])) if match["ret"] else []
+
+        if match := DELETE_RE.match(sql):
+            checks = self._conditions(match["where"], params)
+            table = self.tables.get(match["table"], [])
+            rows = [row for row in table if all(check(row) for check in checks)]
+            self.tables[match["table"]] = [row for row in table if row not in rows]
+            for row in rows:
+                self._fire(match["table"], row, None)
+            return self._project(rows, self._columns(match["ret"])) if match["ret"] else []
+
+        if match := SELECT_RE.match(sql):
+            if not match["table"]:
+                # SELECT 1 health checks
+                return [{"?column?": match["cols"]}]
+            rows = self.tables.get(match["table"], [])
+            if match["where"]:
+                checks = self._conditions(match["where"], params)
+                rows = [row for row in rows if all(check(row) for check in checks)]
+            if match["order"]:
+                # Stable sorts from the last key to the first; id breaks remaining ties
+                rows = sorted(rows, key=lambda row: row.get("id") or 0)
+                for term in reversed(self._columns(match["order"])):
+                    col, _, direction = term.partition(" ")
+                    rows = sorted(rows, key=lambda row, col=col: row.get(col),
+                                  reverse=direction.upper() == "DESC")
+            if match["limit"]:
+                rows = rows[:int(next(params) if match["limit"] == "%s" else match["limit"])]
+            return self._project(rows, self._columns(match["cols"]))
+
+        raise NotImplementedError(sql)
+
+
+class FakeCursor:
+    """RealDictCursor look-alike"""
+
+    def __init__(self, db: FakeDatabase):
+        self._db = db
+        self._rows = []
+        self.rowcount = -1
+
+    def execute(self, query, vars=None):
+        self._rows = self._db.execute(query, vars)
+        self.rowcount = len(self._rows)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class FakeConnection:
+    """Connection whose statements apply immediately (no transactions)"""
+
+    def __init__(self, db: FakeDatabase):
+        self._db = db
+        self.closed = 0
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self._db)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def set_session(self, **kwargs):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+# ============ ANTHROPIC ============
+
+class FakeMessages:
+    """
+    messages.create stand-in: the first turn asks for a search_knowledge tool
+    call, the turn after the tool result answers with text
+    """
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        messages = kwargs.get("messages", [])
+        last = messages[-1]["content"] if messages else ""
+        usage = SimpleNamespace(input_tokens=len(str(messages)) // 4, output_tokens=40)
+
+        if isinstance(last, str):
+            words = [word for word in re.findall(r"\w+", last) if len(word) > 3] or ["notes"]
+            block = SimpleNamespace(
+                type="tool_use", id=f"toolu_fake_{self.calls}",
+                name="search_knowledge", input={"query": words[0]}
+            )
+            return SimpleNamespace(stop_reason="tool_use", content=[block], usage=usage)
+
+        text = SimpleNamespace(type="text", text="Here is what your knowledge base says.")
+        return SimpleNamespace(stop_reason="end_turn", content=[text], usage=usage)
+
+
+class FakeAnthropic:
+    def __init__(self, latency_ms: float = 800):
+        self.messages = FakeMessages(latency_ms)
+
+
+# ============ INSTALL ============
+
+class FakeBackend:
+    """Patches installed by install(); call uninstall() to restore"""
+
+    def __init__(self):
+        self.redis = None
+        self.db = None
+        self.anthropic = None
+        self._patches = []
+
+    def _patch(self, module, name, value):
+        self._patches.append((module, name, getattr(module, name)))
+        setattr(module, name, value)
+
+    def _patch_everywhere(self, original, name, value):
+        for module in list(sys.modules.values()):
+            try:
+                found = getattr(module, name, None) is original
+            except Exception:
+                continue
+            if found:
+                self._patch(module, name, value)
+
+    def uninstall(self):
+        for module, name, original in reversed(self._patches):
+            setattr(module, name, original)
+        self._patches = []
+
+
+def install(memory: bool = True, ai_latency_ms: float = 800,
+            db_latency_ms: float = 0, redis_latency_ms: float = 0) -> FakeBackend:
+    """
+    Swap in the stand-ins. Call before or after importing main: every loaded
+    module holding the real redis_client / get_db_connection is patched.
+
+    Args:
+        memory: Replace Redis and PostgreSQL (False keeps the real services)
+        ai_latency_ms: Simulated Anthropic response time
+        db_latency_ms / redis_latency_ms: Simulated round trip per statement / command
+    """
+    import cache_service
+    import db
+    import ai_service
+
+    backend = FakeBackend()
+    if memory:
+        backend.redis = FakeRedis(redis_latency_ms)
+        backend.db = FakeDatabase(db_latency_ms)
+        backend._patch_everywhere(cache_service.redis_client, "redis_client", backend.redis)
+        backend._patch_everywhere(cache_service.redis_binary_client, "redis_binary_client", backend.redis)
+        backend._patch_everywhere(cache_service.async_redis_client, "async_redis_client",
+                                  FakeAsyncRedis(backend.redis))
+        backend._patch_everywhere(db.get_db_connection, "get_db_connection", backend.db.connect)
+
+    backend.anthropic = FakeAnthropic(ai_latency_ms)
+    backend._patch(ai_service, "client", backend.anthropic)
+    return backend
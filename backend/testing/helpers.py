@@ -0,0 +1,53 @@
+"""
+Test Helpers
+Shared by the tests and conftest.py's fixtures.
+"""
+import os
+import pytest
+import redis
+from auth import create_access_token
+from run_migration import apply_migration
+
+# The tables from setup_db.py that migrations build on
+BASE_SCHEMA = """
+CREATE TABLE users (
+    id SERIAL PRIMARY KEY,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE knowledge_entries (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    title VARCHAR(500) NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT[],
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+def auth_headers(user_id: int, email: str = "a@b.co") -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': email, 'user_id': user_id})}"}
+
+
+def run_migration(cursor, name: str):
+    """Apply migrations/<name> on the cursor's connection"""
+    apply_migration(cursor, name)
+
+
+def scratch_redis():
+    """
+    Clients on TEST_REDIS_URL with its database flushed: (text, binary), like
+    cache_service.redis_client and redis_binary_client
+    Point it at a database nothing else uses (e.g. redis://localhost:6379/15);
+    skips the test when TEST_REDIS_URL isn't set.
+    """
+    url = os.getenv("TEST_REDIS_URL")
+    if not url:
+        pytest.skip("TEST_REDIS_URL not set")
+    binary = redis.Redis.from_url(url)
+    binary.flushdb()
+    return redis.Redis.from_url(url, decode_responses=True), binary
@@ -15,11 +15,22 @@ interface KnowledgeEntry {
   updated_at: string;
 }
 
+// List item from GET /api/entries?view=summary; full content loads on edit
+interface KnowledgeEntrySummary {
+  id: number;
+  title: string;
+  tags: string[];
+  created_at: string;
+  updated_at: string;
+  content_length: number;
+  snippet: string;
+}
+
 export default function DashboardPage() {
   const { user, token, logout, loading } = useAuth();
   const router = useRouter();
 
-  const [entries, setEntries] = useState<KnowledgeEntry[]>([]);
+  const [entries, setEntries] = useState<KnowledgeEntrySummary[]>([]);
   const [showForm, setShowForm] = useState(false);
   const [editingEntry, setEditingEntry] = useState<KnowledgeEntry | null>(null);
 
@@ -49,7 +60,7 @@ export default function DashboardPage() {
 
   const fetchEntries = async () => {
     try {
-      const response = await fetch(`${API_URL}/api/entries`, {
+      const response = await fetch(`${API_URL}/api/entries?view=summary`, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
@@ -118,12 +129,28 @@ export default function DashboardPage() {
     }
   };
 
-  const handleEdit = (entry: KnowledgeEntry) => {
-    setEditingEntry(entry);
-    setTitle(entry.title);
-    setContent(entry.content);
-    setTags(entry.tags.join(', '));
-    setShowForm(true);
+  const handleEdit = async (summary: KnowledgeEntrySummary) => {
+    try {
+      const response = await fetch(`${API_URL}/api/entries/${summary.id}`, {
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      });
+
+      if (!response.ok) {
+        console.error('Failed to load entry, status:', response.status);
+        return;
+      }
+
+      const entry: KnowledgeEntry = await response.json();
+      setEditingEntry(entry);
+      setTitle(entry.title);
+      setContent(entry.content);
+      setTags(entry.tags.join(', '));
+      setShowForm(true);
+    } catch (error) {
+      console.error('Failed to load entry:', error);
+    }
   };
 
   const handleDelete = async (id: number) => {
@@ -343,7 +370,7 @@ export default function DashboardPage() {
                     </div>
                   </div>
 
-                  <p className="text-gray-700 whitespace-pre-wrap mb-3">{entry.content}</p>
+                  <p className="text-gray-700 whitespace-pre-wrap mb-3">{entry.snippet}</p>
 
                   {entry.tags.length > 0 && (
                     <div className="flex gap-2 flex-wrap mb-2">
@@ -0,0 +1,190 @@
+"""
+Result cache for the MCP server, in the backend's Redis.
+
+Keys follow backend/cache_service.py so both processes share one cache:
+  entry:{entry_id}:user:{user_id}    single entries, read and filled like GET /api/entries/{id}
+  entries:user:{user_id}:version     token the backend replaces on every write
+  mcp:user:{user_id}:{tool}:{hash}   tool results, stored with that version
+
+A tool result is a miss once the backend has written since it was stored, the
+same way the backend treats its projections and search results, so agents
+never see an entry list older than their last save. MCP_CACHE_TTL only bounds
+how long unused results stay in Redis. Entry refills check that version in
+Redis (FILL_ENTRIES_SCRIPT), so a row read before a backend write never
+replaces what that write cached.
+
+Values use backend/cache_codec.py's format: a header byte, then JSON or
+msgpack, optionally zlib-compressed. Results are written as JSON so the
+backend can read them whether or not msgpack is installed.
+
+Redis is optional: when it is unreachable every call goes to Postgres, and
+Redis isn't retried for REDIS_RETRY_SECONDS so calls don't each wait out a
+connect timeout.
+"""
+import hashlib
+import json
+import os
+import time
+import zlib
+
+import redis
+
+try:
+    import msgpack
+except ImportError:  # backend values written as msgpack are then a miss
+    msgpack = None
+
+MCP_CACHE_TTL = int(os.getenv("MCP_CACHE_TTL", 60))
+ENTRY_TTL = 300  # backend/cache_service.py ENTRY_TTL
+REDIS_RETRY_SECONDS = float(os.getenv("REDIS_RETRY_SECONDS", 30))
+
+JSON = 0x01
+MSGPACK = 0x02
+COMPRESSED = 0x10
+
+# KEYS: entries version, then one entry key per value
+# ARGV: version read before the query, TTL, values
+# backend/testing/fakes.py mirrors this script; keep the two in step.
+FILL_ENTRIES_SCRIPT = """-- fill_entries
+if (redis.call('GET', KEYS[1]) or '') ~= ARGV[1] then
+  return 0
+end
+for i = 2, #KEYS do
+  redis.call('SET', KEYS[i], ARGV[i + 1], 'EX', ARGV[2])
+end
+return 1
+"""
+
+_options = {
+    "socket_connect_timeout": float(os.getenv("REDIS_CONNECT_TIMEOUT", 1)),
+    "socket_timeout": float(os.getenv("REDIS_SOCKET_TIMEOUT", 2)),
+}
+if os.getenv("REDIS_URL"):
+    redis_client = redis.Redis.from_url(os.getenv("REDIS_URL"), **_options)
+else:
+    redis_client = redis.Redis(
+        host=os.getenv("REDISHOST", "localhost"),
+        port=int(os.getenv("REDISPORT", 6379)),
+        db=0,
+        **_options
+    )
+
+_fill_entries = redis_client.register_script(FILL_ENTRIES_SCRIPT)
+
+_unavailable_until = 0.0
+
+
+def entry_cache_key(user_id: int, entry_id: int) -> str:
+    return f"entry:{entry_id}:user:{user_id}"
+
+
+def entries_version_key(user_id: int) -> str:
+    return f"entries:user:{user_id}:version"
+
+
+def result_cache_key(user_id: int, tool: str, **args) -> str:
+    digest = hashlib.sha1(json.dumps(args, sort_keys=True).encode()).hexdigest()[:16]
+    return f"mcp:user:{user_id}:{tool}:{digest}"
+
+
+def encode(value) -> bytes:
+    return bytes((JSON,)) + json.dumps(value, default=str, separators=(",", ":")).encode()
+
+
+def decode(data):
+    """Read a value written by either process; None if it can't be read here"""
+    header = data[0]
+    if header >= 0x20:  # written before the header byte existed
+        return json.loads(data)
+    payload = data[1:]
+    if header & COMPRESSED:
+        payload = zlib.decompress(payload)
+    codec = header & ~COMPRESSED
+    if codec == JSON:
+        return json.loads(payload)
+    if codec == MSGPACK and msgpack is not None:
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    return None
+
+
+def _available() -> bool:
+    return time.monotonic() >= _unavailable_until
+
+
+def _failed():
+    global _unavailable_until
+    _unavailable_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+
+def get_result(user_id: int, key: str) -> tuple:
+    """
+    Read a cached tool result in one round trip
+    Returns (value or None on a miss, version token to pass to set_result)
+    """
+    if not _available():
+        return None, None
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.get(entries_version_key(user_id))
+        value, version = pipe.execute()
+        cached = decode(value) if value else None
+    except Exception:
+        _failed()
+        return None, None
+
+    version = _text(version)
+    if not cached or cached.get("version") != version or "value" not in cached:
+        return None, version
+    return cached["value"], version
+
+
+def set_result(key: str, value, version: str):
+    """Store a tool result built from Postgres, tagged with the version read before the query"""
+    if version is None or not _available():
+        return
+    try:
+        redis_client.set(key, encode({"version": version, "value": value}), ex=MCP_CACHE_TTL)
+    except Exception:
+        _failed()
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else (value or "")
+
+
+def get_entries(user_id: int, entry_ids: list) -> tuple:
+    """
+    Entries from the backend's entry cache in one round trip
+    Returns ({entry_id: entry} for the hits, version token to pass to set_entries)
+    """
+    if not entry_ids or not _available():
+        return {}, None
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.mget([entry_cache_key(user_id, entry_id) for entry_id in entry_ids])
+        pipe.get(entries_version_key(user_id))
+        values, version = pipe.execute()
+    except Exception:
+        _failed()
+        return {}, None
+    found = {}
+    for entry_id, value in zip(entry_ids, values):
+        entry = decode(value) if value else None
+        if entry is not None:
+            found[entry_id] = entry
+    return found, _text(version)
+
+
+def set_entries(user_id: int, entries: list, version: str):
+    """Refill entries read from Postgres, unless the backend has written since `version` was read"""
+    if not entries or version is None or not _available():
+        return
+    try:
+        _fill_entries(
+            keys=[entries_version_key(user_id)] + [entry_cache_key(user_id, entry["id"]) for entry in entries],
+            args=[version, ENTRY_TTL] + [encode(entry) for entry in entries],
+            client=redis_client,
+        )
+    except Exception:
+        _failed()
@@ -0,0 +1,38 @@
+"""
+Shared fixtures. The backend's modules (cache_codec, cache_service and
+testing/fakes.py) are imported from ../backend, so these tests hold the
+server to the backend's cache format and keys rather than to copies.
+With TEST_REDIS_URL set, the cache tests also run on a real Redis.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import cache  # noqa: E402
+import cache_service  # noqa: E402
+from testing.fakes import FakeRedis  # noqa: E402
+from testing.helpers import scratch_redis  # noqa: E402
+
+
+@pytest.fixture(params=["fake", "real"])
+def redis(request, monkeypatch):
+    """
+    One Redis shared by this server's cache and the backend's: in-memory,
+    then TEST_REDIS_URL (skipped when unset), where the Lua scripts run for real
+    """
+    if request.param == "fake":
+        text = client = FakeRedis()
+    else:
+        text, client = scratch_redis()
+    monkeypatch.setattr(cache, "redis_client", client)
+    monkeypatch.setattr(cache, "_unavailable_until", 0.0)
+    monkeypatch.setattr(cache_service, "redis_client", text)
+    monkeypatch.setattr(cache_service, "redis_binary_client", client)
+    yield client
+    if request.param == "real":
+        client.flushdb()
+        text.close()
+        client.close()
@@ -1,24 +1,104 @@
-import psycopg2
+import os
+import threading
+from contextlib import contextmanager
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
 import json
 
 load_dotenv()
 
+import cache  # noqa: E402  (reads REDIS_URL, so after load_dotenv)
+
 # Initialize FastMCP server
 mcp = FastMCP("knowledge-base")
 
-def get_db_connection():
-    """Create database connection"""
-    conn = psycopg2.connect(
-        host="localhost",
-        database="knowledge_base",
-        user="",  # Your Mac username
-        password="",
-        cursor_factory=RealDictCursor
-    )
-    return conn
+# Same DATABASE_URL as the backend; the default is the local development database
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost:5432/knowledge_base")
+DB_POOL_MIN = int(os.getenv("MCP_DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("MCP_DB_POOL_MAX", 5))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ThreadedConnectionPool:
+    """Connection pool, opened on first use so the server starts without a database"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    DB_POOL_MIN, DB_POOL_MAX, DATABASE_URL, cursor_factory=RealDictCursor
+                )
+    return _pool
+
+@contextmanager
+def db_cursor():
+    """
+    Cursor on a pooled read-only connection
+    Autocommit, so connections don't sit idle in a transaction between tool calls
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        if not conn.autocommit:
+            conn.set_session(readonly=True, autocommit=True)
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+    finally:
+        # A connection the server dropped is discarded instead of handed out again
+        pool.putconn(conn, close=bool(conn.closed))
+
+def fetch_all(query: str, params: tuple) -> list:
+    with db_cursor() as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+MAX_ENTRIES_PER_FETCH = 20
+
+def load_entries(user_id: int, entry_ids: list) -> dict:
+    """
+    Full entries by id: the backend's single-entry cache first (its writes keep
+    it current), then one query for the rest, which refills the cache unless
+    the backend wrote in the meantime
+    Returns {entry_id: entry} for the ids that exist and belong to the user
+    """
+    found, version = cache.get_entries(user_id, entry_ids)
+    missing = [entry_id for entry_id in entry_ids if entry_id not in found]
+    if missing:
+        rows = fetch_all(
+            """SELECT id, user_id, title, content, tags, created_at, updated_at
+               FROM knowledge_entries
+               WHERE user_id = %s AND id = ANY(%s)""",
+            (user_id, missing)
+        )
+        # Same shape as the backend's KnowledgeEntryResponse, which reads these keys too
+        entries = [{
+            "id": row['id'],
+            "user_id": row['user_id'],
+            "title": row['title'],
+            "content": row['content'],
+            "tags": row['tags'] or [],
+            "created_at": str(row['created_at']),
+            "updated_at": str(row['updated_at'])
+        } for row in rows]
+        cache.set_entries(user_id, entries, version)
+        found.update((entry['id'], entry) for entry in entries)
+    return found
+
+def format_entry(entry: dict) -> dict:
+    return {
+        "id": entry['id'],
+        "title": entry['title'],
+        "content": entry['content'],
+        "tags": entry['tags'] if entry['tags'] else [],
+        "created_at": str(entry['created_at']),
+        "updated_at": str(entry['updated_at'])
+    }
 
 # ============ MCP TOOLS ============
 
@@ -26,10 +106,12 @@ def get_db_connection():
 def search_knowledge(query: str, user_id: int) -> str:
     """Search through the knowledge base entries by keyword or topic"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        key = cache.result_cache_key(user_id, "search_knowledge", query=query)
+        cached, version = cache.get_result(user_id, key)
+        if cached is not None:
+            return cached
         
-        cursor.execute(
+        entries = fetch_all(
             """SELECT id, title, content, tags, created_at
                FROM knowledge_entries
                WHERE user_id = %s 
@@ -41,12 +123,11 @@ def search_knowledge(query: str, user_id: int) -> str:
                LIMIT 5""",
             (user_id, f"%{query}%", f"%{query}%")
         )
-        entries = cursor.fetchall()
-        cursor.close()
-        conn.close()
         
         if not entries:
-            return f"No entries found matching '{query}'"
+            result = f"No entries found matching '{query}'"
+            cache.set_result(key, result, version)
+            return result
         
         results = []
         for entry in entries:
@@ -59,11 +140,13 @@ def search_knowledge(query: str, user_id: int) -> str:
                 "created_at": str(entry['created_at'])
             })
         
-        return json.dumps({
+        result = json.dumps({
             "found": len(results),
             "query": query,
             "results": results
         }, indent=2)
+        cache.set_result(key, result, version)
+        return result
     
     except Exception as e:
         return f"Error searching knowledge base: {str(e)}"
@@ -72,22 +155,23 @@ def search_knowledge(query: str, user_id: int) -> str:
 def get_all_entries(user_id: int) -> str:
     """Get all knowledge base entries for a specific user"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        key = cache.result_cache_key(user_id, "get_all_entries")
+        cached, version = cache.get_result(user_id, key)
+        if cached is not None:
+            return cached
         
-        cursor.execute(
+        entries = fetch_all(
             """SELECT id, title, content, tags, created_at
                FROM knowledge_entries
                WHERE user_id = %s
                ORDER BY created_at DESC""",
             (user_id,)
         )
-        entries = cursor.fetchall()
-        cursor.close()
-        conn.close()
         
         if not entries:
-            return "No entries found in knowledge base"
+            result = "No entries found in knowledge base"
+            cache.set_result(key, result, version)
+            return result
         
         results = []
         for entry in entries:
@@ -100,10 +184,12 @@ def get_all_entries(user_id: int) -> str:
                 "created_at": str(entry['created_at'])
             })
         
-        return json.dumps({
+        result = json.dumps({
             "total": len(results),
             "entries": results
         }, indent=2)
+        cache.set_result(key, result, version)
+        return result
     
     except Exception as e:
         return f"Error fetching entries: {str(e)}"
@@ -112,44 +198,47 @@ def get_all_entries(user_id: int) -> str:
 def get_entry_by_id(entry_id: int, user_id: int) -> str:
     """Get a specific knowledge entry by its ID"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            """SELECT id, title, content, tags, created_at, updated_at
-               FROM knowledge_entries
-               WHERE id = %s AND user_id = %s""",
-            (entry_id, user_id)
-        )
-        entry = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        
+        entry = load_entries(user_id, [entry_id]).get(entry_id)
         if not entry:
             return f"Entry {entry_id} not found"
         
-        tags = entry['tags'] if entry['tags'] else []
+        return json.dumps(format_entry(entry), indent=2)
+    
+    except Exception as e:
+        return f"Error fetching entry: {str(e)}"
+
+@mcp.tool()
+def get_entries_by_ids(entry_ids: list[int], user_id: int) -> str:
+    """Get the full content of several knowledge entries by ID in one call (up to 20)"""
+    try:
+        entry_ids = list(dict.fromkeys(entry_ids))
+        if not entry_ids:
+            return "No entry ids given"
+        if len(entry_ids) > MAX_ENTRIES_PER_FETCH:
+            return f"At most {MAX_ENTRIES_PER_FETCH} ids per call"
+        
+        found = load_entries(user_id, entry_ids)
+        results = [format_entry(found[entry_id]) for entry_id in entry_ids if entry_id in found]
         
         return json.dumps({
-            "id": entry['id'],
-            "title": entry['title'],
-            "content": entry['content'],
-            "tags": tags,
-            "created_at": str(entry['created_at']),
-            "updated_at": str(entry['updated_at'])
+            "found": len(results),
+            "entries": results,
+            "not_found": [entry_id for entry_id in entry_ids if entry_id not in found]
         }, indent=2)
     
     except Exception as e:
-        return f"Error fetching entry: {str(e)}"
+        return f"Error fetching entries: {str(e)}"
 
 @mcp.tool()
 def search_by_tag(tag: str, user_id: int) -> str:
     """Find knowledge entries that have a specific tag"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        key = cache.result_cache_key(user_id, "search_by_tag", tag=tag)
+        cached, version = cache.get_result(user_id, key)
+        if cached is not None:
+            return cached
         
-        cursor.execute(
+        entries = fetch_all(
             """SELECT id, title, content, tags, created_at
                FROM knowledge_entries
                WHERE user_id = %s
@@ -157,12 +246,11 @@ def search_by_tag(tag: str, user_id: int) -> str:
                ORDER BY created_at DESC""",
             (user_id, [tag])
         )
-        entries = cursor.fetchall()
-        cursor.close()
-        conn.close()
         
         if not entries:
-            return f"No entries found with tag '{tag}'"
+            result = f"No entries found with tag '{tag}'"
+            cache.set_result(key, result, version)
+            return result
         
         results = []
         for entry in entries:
@@ -175,11 +263,13 @@ def search_by_tag(tag: str, user_id: int) -> str:
                 "created_at": str(entry['created_at'])
             })
         
-        return json.dumps({
+        result = json.dumps({
             "tag": tag,
             "found": len(results),
             "results": results
         }, indent=2)
+        cache.set_result(key, result, version)
+        return result
     
     except Exception as e:
         return f"Error searching by tag: {str(e)}"
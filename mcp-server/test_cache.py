@@ -0,0 +1,48 @@
+import cache
+import cache_codec
+import cache_service
+
+
+def entry(entry_id, title="note"):
+    return {"id": entry_id, "user_id": 1, "title": title, "content": "c", "tags": [],
+            "created_at": "2026-01-01 00:00:00", "updated_at": "2026-01-01 00:00:00"}
+
+
+def test_header_bytes_match_the_backend(monkeypatch):
+    """Test the header constants and both directions of encoding agree with backend/cache_codec.py"""
+    assert (cache.JSON, cache.MSGPACK, cache.COMPRESSED) == \
+        (cache_codec.JSON, cache_codec.MSGPACK, cache_codec.COMPRESSED)
+
+    value = {"id": 1, "content": "redis " * 500}
+    for codec in ("json", "msgpack"):
+        monkeypatch.setattr(cache_codec, "CACHE_CODEC", codec)
+        for min_bytes in (10 ** 6, 0):
+            assert cache.decode(cache_codec.encode(value, compress_min_bytes=min_bytes)) == value
+    assert cache_codec.decode(cache.encode(value)) == value
+    assert cache.entry_cache_key(1, 2) == cache_service.entry_cache_key(1, 2)
+    assert cache.entries_version_key(1) == cache_service.entry_list_keys(1)[2]
+
+
+def test_refill_skips_entries_the_backend_wrote_meanwhile(redis):
+    """Test a row read before a backend write doesn't replace what the write cached"""
+    found, version = cache.get_entries(1, [1])
+    assert found == {}
+    cache_service.cache_entry_saved(1, entry(1, title="saved by the backend"))
+    cache.set_entries(1, [entry(1, title="read before the save")], version)
+    assert cache.get_entries(1, [1])[0][1]["title"] == "saved by the backend"
+
+    found, version = cache.get_entries(1, [2])
+    cache.set_entries(1, [entry(2)], version)
+    assert cache.get_entries(1, [2])[0] == {2: entry(2)}
+
+
+def test_results_are_tagged_with_the_entry_list_version(redis):
+    """Test a stored tool result is a hit until the backend writes"""
+    key = cache.result_cache_key(1, "get_all_entries")
+    value, version = cache.get_result(1, key)
+    assert value is None
+    cache.set_result(key, "result", version)
+    assert cache.get_result(1, key)[0] == "result"
+
+    cache_service.cache_entry_saved(1, entry(1), created=True)
+    assert cache.get_result(1, key)[0] is None
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+import redis as redis_py
+
+pytest.importorskip("mcp")
+
+import cache  # noqa: E402
+import cache_service  # noqa: E402
+import knowledge_base_server as server  # noqa: E402
+from testing.fakes import FakeDatabase  # noqa: E402
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """The fake Postgres behind fetch_all, with two entries for user 1"""
+    fake = FakeDatabase()
+    cursor = fake.connect().cursor()
+    cursor.execute("INSERT INTO users (email, password_hash) VALUES (%s, %s) RETURNING id", ("a@b.co", "x"))
+    for title in ("first", "second"):
+        cursor.execute("INSERT INTO knowledge_entries (user_id, title, content, tags) VALUES (%s, %s, %s, %s)",
+                       (1, title, f"{title} text", ["redis"]))
+    monkeypatch.setattr(server, "fetch_all", fake.execute)
+    return fake
+
+
+class DownRedis:
+    """Redis client whose every call fails like an unreachable server"""
+
+    def __getattr__(self, command):
+        def fail(*args, **kwargs):
+            raise redis_py.exceptions.ConnectionError("Connection refused")
+        return fail
+
+    def pipeline(self, *args, **kwargs):
+        return self
+
+
+def test_repeated_tool_calls_are_cache_hits(redis, db):
+    """Test a repeated call is served from Redis, including entries the first call cached"""
+    first = server.get_all_entries(1)
+    assert json.loads(first)["total"] == 2
+    assert json.loads(server.get_entries_by_ids([1, 2, 3], 1))["not_found"] == [3]
+
+    statements = db.statements
+    assert server.get_all_entries(1) == first
+    assert json.loads(server.get_entry_by_id(2, 1))["title"] == "second"
+    assert db.statements == statements
+    assert db.unsupported == set()
+
+
+def test_backend_write_makes_results_a_miss(redis, db):
+    """Test a backend write-through retires cached results and refreshes the entry"""
+    server.get_all_entries(1)
+    server.get_entry_by_id(1, 1)
+
+    db.execute("UPDATE knowledge_entries SET title = %s WHERE id = %s", ("renamed", 1))
+    row = db.execute("SELECT * FROM knowledge_entries WHERE id = %s", (1,))[0]
+    cache_service.cache_entry_saved(1, {**row, "tags": row["tags"] or []})
+
+    statements = db.statements
+    assert "renamed" in server.get_all_entries(1)
+    assert db.statements == statements + 1
+    assert json.loads(server.get_entry_by_id(1, 1))["title"] == "renamed"
+    assert db.statements == statements + 1
+
+
+def test_unreachable_redis_falls_through_to_postgres(monkeypatch, db):
+    """Test tools answer from Postgres when Redis is down, and skip Redis after the first failure"""
+    down = DownRedis()
+    monkeypatch.setattr(cache, "redis_client", down)
+    monkeypatch.setattr(cache, "_unavailable_until", 0.0)
+
+    assert json.loads(server.get_all_entries(1))["total"] == 2
+    assert not cache._available()
+    assert json.loads(server.get_entries_by_ids([1, 2], 1))["found"] == 2
@@ -1,14 +1,15 @@
+import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+
+load_dotenv()
 
 def test_db_connection():
     """Test database connection directly"""
     try:
         conn = psycopg2.connect(
-            host="localhost",
-            database="knowledge_base",
-            user="",  # Your Mac username
-            password="",
+            os.getenv("DATABASE_URL", "postgresql://localhost:5432/knowledge_base"),
             cursor_factory=RealDictCursor
         )
         cursor = conn.cursor()